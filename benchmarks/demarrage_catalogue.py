@@ -0,0 +1,47 @@
+"""
+Mesure le démarrage sur un gros catalogue : charger() puis ce qu'affiche le premier maj_tout()
+(première page du tableau par ISBN et premier livre disponible), avec livres.txt seul
+puis avec l'instantané binaire livres.bin projeté en mémoire.
+
+Usage : python -m benchmarks.demarrage_catalogue [nombre_de_livres]
+"""
+import sys
+import time
+import random
+import tempfile
+from src.bibliotheque import Bibliotheque
+
+
+def creer_catalogue(dossier, n, graine=42):
+    rnd = random.Random(graine)
+    genres = [f"Genre {i}" for i in range(40)]
+    auteurs = [f"Auteur {i}" for i in range(n // 20 + 1)]
+    biblio = Bibliotheque(data_dir=dossier, instantane_binaire=True)
+    biblio.charger()
+    biblio.ajouter_livres(
+        Bibliotheque.Livre(f"978{i:010d}", f"Titre du livre {i}", rnd.choice(auteurs), str(rnd.randint(1800, 2024)),
+                           rnd.choice(genres))
+        for i in range(n)
+    )
+    biblio.sauvegarder()
+
+
+def demarrer(dossier, instantane_binaire):
+    debut = time.perf_counter()
+    biblio = Bibliotheque(data_dir=dossier, instantane_binaire=instantane_binaire)
+    biblio.charger()
+    charge = time.perf_counter()
+    biblio.livres_page(0, 30, "isbn")
+    next(livre for livre in biblio.livres.values() if livre.statut == "disponible")
+    fin = time.perf_counter()
+    return charge - debut, fin - charge
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    with tempfile.TemporaryDirectory() as dossier:
+        creer_catalogue(dossier, n)
+        print(f"{n} livres")
+        for nom, binaire in (("livres.txt", False), ("livres.bin", True)):
+            chargement, affichage = demarrer(dossier, binaire)
+            print(f"{nom:10} : charger() {chargement:.3f} s, première page {affichage:.3f} s")
@@ -0,0 +1,42 @@
+"""
+Mesure le temps jusqu'à la première image de l'interface : lancement de src/main.py jusqu'à
+l'affichage de la fenêtre (signalé par main.py quand BIBLIO_MESURE_DEMARRAGE est défini).
+Le premier lancement avec --sans-cache vide d'abord le cache des icônes (assets/.cache).
+Nécessite un affichage (X11, Windows ou macOS).
+
+Usage : python -m benchmarks.demarrage_interface [nombre_de_lancements] [--sans-cache]
+"""
+import os
+import sys
+import time
+import shutil
+import statistics
+import subprocess
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def lancer():
+    env = dict(os.environ, BIBLIO_MESURE_DEMARRAGE="1", PYTHONPATH=RACINE)
+    debut = time.perf_counter()
+    processus = subprocess.Popen([sys.executable, os.path.join(RACINE, "src", "main.py")], cwd=RACINE, env=env,
+                                 stdout=subprocess.PIPE, text=True)
+    for ligne in processus.stdout:
+        if ligne.strip() == "premiere_image":
+            duree = time.perf_counter() - debut
+            break
+    else:
+        processus.wait()
+        raise RuntimeError("L'interface s'est arrêtée sans afficher de fenêtre.")
+    processus.wait()
+    return duree
+
+
+if __name__ == "__main__":
+    arguments = [a for a in sys.argv[1:] if not a.startswith("--")]
+    n = int(arguments[0]) if arguments else 5
+    if "--sans-cache" in sys.argv:
+        shutil.rmtree(os.path.join(RACINE, "assets", ".cache"), ignore_errors=True)
+        print(f"premier lancement (cache d'icônes vide) : {lancer():.3f} s")
+    durees = [lancer() for _ in range(n)]
+    print(f"{n} lancements : médiane {statistics.median(durees):.3f} s, minimum {min(durees):.3f} s")
@@ -0,0 +1,91 @@
+"""
+Génère un jeu de données synthétique reproductible (graine fixe) au format de data/ :
+livres.txt, membres.txt, prets.txt et historique.csv, écrits directement sans passer par Bibliotheque.
+L'historique couvre l'année écoulée ; les emprunts en cours en sont les derniers emprunts,
+certains déjà en retard.
+
+Usage : python -m benchmarks.generateur dossier [--livres 100000] [--membres N] [--historique N] [--graine 42]
+"""
+import os
+import csv
+import random
+import argparse
+from datetime import datetime, timedelta
+from src.prets import FORMAT_DATE, echeance_depuis
+
+
+def generer(dossier, nb_livres, nb_membres=None, nb_historique=None, graine=42, maintenant=None):
+    """
+    Écrit les fichiers d'une bibliothèque synthétique dans dossier.
+    :param nb_membres: nombre de membres (par défaut un pour dix livres)
+    :param nb_historique: nombre de lignes d'historique (par défaut autant que de livres)
+    :param maintenant: date de référence de l'historique (par défaut maintenant)
+    :return: (nombre de livres, de membres, de lignes d'historique, d'emprunts en cours)
+    """
+    rnd = random.Random(graine)
+    nb_membres = nb_membres if nb_membres is not None else max(1, nb_livres // 10)
+    nb_historique = nb_historique if nb_historique is not None else nb_livres
+    maintenant = maintenant or datetime.now().replace(microsecond=0)
+    os.makedirs(dossier, exist_ok=True)
+
+    genres = [f"Genre {i}" for i in range(40)]
+    auteurs = [f"Auteur {i}" for i in range(nb_livres // 20 + 1)]
+    isbns = [f"978{i:010d}" for i in range(nb_livres)]
+    membres = [f"M{i:07d}" for i in range(nb_membres)]
+
+    # Emprunts en cours : un membre sur quatre a entre 1 et 3 livres, empruntés dans les 30 derniers jours
+    # (un sur dix environ est en retard)
+    empruntes = {}
+    livres_libres = rnd.sample(range(nb_livres), min(nb_livres, nb_membres))
+    for id_membre in membres[::4]:
+        for _ in range(rnd.randint(1, 3)):
+            if not livres_libres:
+                break
+            date = maintenant - timedelta(days=rnd.choice([rnd.uniform(0, 14), rnd.uniform(0, 30)]))
+            empruntes[isbns[livres_libres.pop()]] = (id_membre, date.strftime(FORMAT_DATE))
+
+    # Emprunts terminés : une paire emprunt/retour pour deux lignes restantes, sur l'année écoulée
+    lignes = []
+    for _ in range(max(0, nb_historique - len(empruntes)) // 2):
+        isbn, id_membre = isbns[rnd.randrange(nb_livres)], membres[rnd.randrange(nb_membres)]
+        depart = maintenant - timedelta(days=rnd.uniform(61, 365))  # Rendu avant les emprunts en cours
+        retour = depart + timedelta(days=rnd.uniform(1, 30))
+        lignes.append((depart.strftime(FORMAT_DATE), isbn, id_membre, "emprunt"))
+        lignes.append((retour.strftime(FORMAT_DATE), isbn, id_membre, "retour"))
+    lignes.extend((date, isbn, id_membre, "emprunt") for isbn, (id_membre, date) in empruntes.items())
+    lignes.sort()
+
+    with open(os.path.join(dossier, "livres.txt"), "w", encoding="utf-8") as f:
+        for isbn in isbns:
+            f.write(";".join([isbn, f"Titre du livre {isbn[3:]}", rnd.choice(auteurs), str(rnd.randint(1800, 2024)),
+                              rnd.choice(genres), "emprunte" if isbn in empruntes else "disponible"]) + "\n")
+    par_membre = {}
+    for isbn, (id_membre, _) in empruntes.items():
+        par_membre.setdefault(id_membre, []).append(isbn)
+    with open(os.path.join(dossier, "membres.txt"), "w", encoding="utf-8") as f:
+        for id_membre in membres:
+            f.write(f"{id_membre};Membre {id_membre[1:]};{','.join(sorted(par_membre.get(id_membre, [])))}\n")
+    with open(os.path.join(dossier, "prets.txt"), "w", encoding="utf-8") as f:
+        for isbn, (id_membre, date) in empruntes.items():
+            f.write(f"{isbn};{id_membre};{date};{echeance_depuis(date)};0;{isbn}\n")
+    with open(os.path.join(dossier, "historique.csv"), "w", encoding="utf-8", newline="") as f:
+        csv.writer(f).writerows(lignes)
+    return nb_livres, nb_membres, len(lignes), len(empruntes)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Jeu de données synthétique pour les mesures de performance.")
+    parser.add_argument("dossier")
+    parser.add_argument("--livres", type=int, default=100000)
+    parser.add_argument("--membres", type=int, default=None, help="par défaut un membre pour dix livres")
+    parser.add_argument("--historique", type=int, default=None, help="lignes d'historique (par défaut autant que de livres)")
+    parser.add_argument("--graine", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    livres, membres, historique, emprunts = generer(args.dossier, args.livres, args.membres, args.historique, args.graine)
+    print(f"{livres} livres, {membres} membres, {historique} lignes d'historique, {emprunts} emprunts en cours "
+          f"écrits dans {args.dossier}.")
+
+
+if __name__ == "__main__":
+    main()
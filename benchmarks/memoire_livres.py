@@ -0,0 +1,54 @@
+"""
+Mesure la mémoire occupée par livre : ancienne représentation (__dict__, tout en chaînes)
+contre Bibliotheque.Livre (__slots__, valeurs internées, année entière, compteurs d'exemplaires).
+
+Usage : python -m benchmarks.memoire_livres [nombre_de_livres]
+"""
+import sys
+import random
+import tracemalloc
+from src.bibliotheque import Bibliotheque
+
+
+# Réplique de l'ancienne classe Livre, pour comparaison
+class LivreDict:
+    def __init__(self, isbn, titre, auteur, annee, genre, statut="disponible"):
+        self.isbn = isbn
+        self.titre = titre
+        self.auteur = auteur
+        self.annee = annee
+        self.genre = genre
+        self.statut = statut
+
+
+# Lignes de livres.txt synthétiques ; les champs sont reconstruits pour chaque ligne
+# comme lors de la lecture du fichier (aucun partage de chaînes entre lignes)
+def lignes_synthetiques(n, graine=42):
+    rnd = random.Random(graine)
+    genres = [f"Genre {i}" for i in range(40)]
+    auteurs = [f"Auteur {i}" for i in range(n // 20 + 1)]
+    for i in range(n):
+        yield ";".join([
+            f"978{i:010d}", f"Titre du livre {i}", rnd.choice(auteurs), str(rnd.randint(1800, 2024)),
+            rnd.choice(genres), rnd.choice(["disponible", "emprunte"])
+        ])
+
+
+def mesurer(classe, n):
+    tracemalloc.start()
+    livres = {}
+    for ligne in lignes_synthetiques(n):
+        parts = ligne.split(";")
+        livres[parts[0]] = classe(*parts)
+    taille, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return taille / n
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    avant = mesurer(LivreDict, n)
+    apres = mesurer(Bibliotheque.Livre, n)
+    print(f"{n} livres")
+    print(f"avant (__dict__)  : {avant:.0f} octets/livre")
+    print(f"après (__slots__) : {apres:.0f} octets/livre ({100 * (1 - apres / avant):.0f}% de moins)")
@@ -0,0 +1,204 @@
+"""
+Suite de mesures des chemins critiques de Bibliotheque sur des jeux synthétiques reproductibles
+(benchmarks.generateur) : charger() et sauvegarder(), débit des emprunts et retours,
+la recherche des emprunteurs faite par maj_tout() (sans Tk) et les agrégations des graphiques.
+Les résultats sont écrits en JSON pour comparer deux commits.
+
+Usage : python -m benchmarks.suite [--echelles 10000 100000 1000000] [--repetitions 3] [--sortie resultats.json]
+        python -m benchmarks.suite --echelles 100000 --comparer ancien.json [--seuil 10]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime
+from src.bibliotheque import Bibliotheque
+from src.analyses import Analyses, np
+from src.visualisation import GRAPHIQUES
+from benchmarks.generateur import generer
+
+LIGNES_PAGE = 50  # Lignes visibles du tableau en mode virtuel
+# Date de référence de l'historique généré, fixe pour que deux exécutions mesurent les mêmes données
+# (par défaut le générateur part de l'heure courante) ; les graphiques sont calculés jusqu'à ce jour
+REFERENCE = datetime(2025, 1, 1, 12, 0, 0)
+
+
+def mesurer(fonction, repetitions):
+    """
+    Exécute fonction plusieurs fois.
+    :return: (meilleure durée, durée médiane) en secondes
+    """
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction()
+        durees.append(time.perf_counter() - debut)
+    return min(durees), statistics.median(durees)
+
+
+def charger(dossier, **options):
+    biblio = Bibliotheque(data_dir=dossier, **options)
+    biblio.charger()
+    return biblio
+
+
+# Ce que valeurs_ligne() (src/main.py) calcule pour chaque ligne du tableau
+def lignes_tableau(biblio, livres):
+    lignes = []
+    for livre in livres:
+        membre = biblio.emprunteur(livre.isbn) if livre.statut == "emprunte" else None
+        lignes.append((livre.isbn, livre.titre, livre.auteur, livre.annee_texte, livre.genre, livre.statut,
+                       membre.id_membre if membre else "", membre.nom if membre else ""))
+    return lignes
+
+
+# maj_tout() sans interface : tableau complet (ou sa première page en mode virtuel) et premier livre disponible
+def maj_tout(biblio, lignes=None):
+    _, livres = biblio.livres_page(0, lignes, "isbn")
+    lignes_tableau(biblio, livres)
+    biblio.premier_disponible()
+
+
+def debit_emprunts(dossier, nombre):
+    """
+    Emprunte puis rend nombre livres disponibles (trois par membre sans emprunt), en mode journalisé
+    comme l'application. Modifie les données du dossier : à mesurer en dernier.
+    :return: (emprunts par seconde, retours par seconde)
+    """
+    biblio = charger(dossier, journalise=True)
+    libres = [isbn for isbn, livre in biblio.livres.items() if livre.statut == "disponible"][:nombre]
+    membres = [id_membre for id_membre, membre in biblio.membres.items() if not membre.livres_empruntes]
+    prets = [(isbn, membres[i // 3]) for i, isbn in enumerate(libres[:3 * len(membres)])]
+
+    debut = time.perf_counter()
+    for isbn, id_membre in prets:
+        biblio.emprunter_livre(isbn, id_membre)
+    emprunts = time.perf_counter() - debut
+    debut = time.perf_counter()
+    for isbn, id_membre in prets:
+        biblio.retourner_livre(isbn, id_membre)
+    retours = time.perf_counter() - debut
+    biblio.sauvegarder()
+    return len(prets) / emprunts, len(prets) / retours
+
+
+def mesurer_echelle(nb_livres, repetitions, graine):
+    """
+    Génère un jeu de nb_livres livres dans un dossier temporaire et y mesure chaque chemin critique.
+    :return: {métrique: valeur} ; durées en secondes (meilleure des répétitions), débits en opérations par seconde
+    """
+    resultats = {}
+
+    def noter(nom, fonction):
+        meilleure, mediane = mesurer(fonction, repetitions)
+        resultats[f"{nom}_s"] = meilleure
+        resultats[f"{nom}_mediane_s"] = mediane
+
+    with tempfile.TemporaryDirectory() as dossier:
+        debut = time.perf_counter()
+        _, nb_membres, nb_historique, nb_emprunts = generer(dossier, nb_livres, graine=graine, maintenant=REFERENCE)
+        resultats.update(livres=nb_livres, membres=nb_membres, historique=nb_historique, emprunts_en_cours=nb_emprunts,
+                         generation_s=time.perf_counter() - debut)
+
+        noter("charger_texte", lambda: charger(dossier))
+        biblio = charger(dossier, instantane_binaire=True)
+        noter("sauvegarder", biblio.sauvegarder)
+        noter("charger_binaire", lambda: charger(dossier, instantane_binaire=True))
+
+        biblio = charger(dossier)
+        noter("maj_tout_complet", lambda: maj_tout(biblio))
+        noter("maj_tout_page", lambda: maj_tout(biblio, LIGNES_PAGE))
+
+        # Analyses neuves à chaque répétition : ni résultat mémorisé ni colonnes d'historique en cache
+        for nom, (donnees_de, _, _) in GRAPHIQUES.items():
+            noter(f"graphique_{nom}", lambda donnees_de=donnees_de: donnees_de(Analyses(biblio), None, REFERENCE.date()))
+        noter("duree_moyenne_emprunt", lambda: Analyses(biblio).duree_moyenne_emprunt())
+
+        emprunts, retours = debit_emprunts(dossier, min(3000, nb_livres // 10))
+        resultats["emprunts_par_s"] = emprunts
+        resultats["retours_par_s"] = retours
+    return resultats
+
+
+def commit_courant():
+    try:
+        sortie = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return sortie.stdout.strip()
+
+
+def comparer(ancien, nouveau, seuil):
+    """
+    Compare deux résultats de la suite, échelle par échelle.
+    Une durée plus longue ou un débit plus faible de plus de seuil % est une régression.
+    :return: (lignes du rapport, nombre de régressions)
+    """
+    lignes, regressions = [], 0
+    for echelle, mesures in nouveau["resultats"].items():
+        anciennes = ancien["resultats"].get(echelle)
+        if anciennes is None:
+            continue
+        lignes.append(f"{echelle} livres ({ancien['meta']['commit']} -> {nouveau['meta']['commit']})")
+        for nom, valeur in mesures.items():
+            avant = anciennes.get(nom)
+            if not (nom.endswith("_par_s") or nom.endswith("_s")) or "mediane" in nom or not avant:
+                continue
+            variation = 100 * (valeur - avant) / avant
+            pire = variation < -seuil if nom.endswith("_par_s") else variation > seuil
+            regressions += pire
+            lignes.append(f"  {nom:32} {avant:12.4f} -> {valeur:12.4f} {variation:+7.1f} %{'  RÉGRESSION' if pire else ''}")
+    return lignes, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mesures de performance de Bibliotheque sur des données synthétiques.")
+    parser.add_argument("--echelles", type=int, nargs="+", default=[10000, 100000, 1000000],
+                        help="nombres de livres des jeux de données")
+    parser.add_argument("--repetitions", type=int, default=3)
+    parser.add_argument("--graine", type=int, default=42)
+    parser.add_argument("--sortie", default=None, help="fichier JSON des résultats (par défaut la sortie standard)")
+    parser.add_argument("--comparer", default=None, help="résultats JSON d'un autre commit à comparer")
+    parser.add_argument("--seuil", type=float, default=10.0, help="écart en %% signalé comme régression")
+    args = parser.parse_args(argv)
+
+    resultats = {
+        "meta": {
+            "commit": commit_courant(),
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np is not None,
+            "graine": args.graine,
+            "reference": REFERENCE.isoformat(),
+            "repetitions": args.repetitions,
+        },
+        "resultats": {},
+    }
+    for echelle in args.echelles:
+        print(f"{echelle} livres...", file=sys.stderr)
+        resultats["resultats"][str(echelle)] = mesurer_echelle(echelle, args.repetitions, args.graine)
+
+    texte = json.dumps(resultats, indent=2)
+    if args.sortie:
+        with open(args.sortie, "w", encoding="utf-8") as f:
+            f.write(texte + "\n")
+    else:
+        print(texte)
+
+    if args.comparer:
+        with open(args.comparer, encoding="utf-8") as f:
+            ancien = json.load(f)
+        lignes, regressions = comparer(ancien, resultats, args.seuil)
+        print("\n".join(lignes), file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+import csv
+import threading
+from collections import Counter
+from datetime import date, datetime, timedelta
+from functools import wraps
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Ramène une borne (date, datetime ou chaîne "AAAA-MM-JJ") à une date
+def _date(valeur):
+    if valeur is None or isinstance(valeur, date) and not isinstance(valeur, datetime):
+        return valeur
+    if isinstance(valeur, datetime):
+        return valeur.date()
+    return datetime.strptime(str(valeur)[:10], "%Y-%m-%d").date()
+
+
+# Garde le résultat d'une analyse tant que la version des données de la bibliothèque n'a pas changé
+def _memoise(methode):
+    @wraps(methode)
+    def enveloppe(self, *args, **kwargs):
+        cle = (methode.__name__, args, tuple(sorted(kwargs.items())))
+        version = self.biblio.version
+        with self._verrou:
+            if self._version != version:
+                self._cache.clear()
+                self._version = version
+            if cle in self._cache:
+                return self._cache[cle]
+        resultat = methode(self, *args, **kwargs)
+        with self._verrou:
+            if self._version == version:
+                self._cache[cle] = resultat
+        return resultat
+    return enveloppe
+
+
+class Analyses:
+    """
+    Indicateurs de la bibliothèque pour les graphiques et les rapports.
+    Chaque résultat est mémorisé et recalculé seulement après un changement des données
+    (Bibliotheque.version). Les indicateurs tirés de l'historique sont calculés sur ses colonnes,
+    avec NumPy s'il est installé.
+    """
+
+    def __init__(self, biblio):
+        self.biblio = biblio
+        self._cache = {}
+        self._version = None
+        self._verrou = threading.Lock()
+        self._colonnes_cache = None  # (signature de l'historique, colonnes)
+
+    # Nombre de livres du catalogue par genre
+    @_memoise
+    def repartition_genres(self):
+        with self.biblio.verrou:
+            return dict(self.biblio.statistiques.par_genre)
+
+    # Les n auteurs ayant le plus de livres : [(auteur, nombre)]
+    @_memoise
+    def top_auteurs(self, n=10):
+        with self.biblio.verrou:
+            return self.biblio.statistiques.top_auteurs(n)
+
+    def activite(self, debut=None, fin=None):
+        """
+        Emprunts et retours de chaque jour entre debut et fin inclus.
+        :param debut: premier jour (date ou "AAAA-MM-JJ"), par défaut 30 jours avant fin
+        :param fin: dernier jour (date ou "AAAA-MM-JJ"), par défaut aujourd'hui
+        :return: (jours, emprunts, retours)
+        """
+        # Bornes résolues avant la mémorisation : passé minuit, « aujourd'hui » désigne un autre jour
+        fin = _date(fin) or datetime.now().date()
+        debut = _date(debut) or fin - timedelta(days=30)
+        return self._activite(debut, fin)
+
+    @_memoise
+    def _activite(self, debut, fin):
+        jours = [debut + timedelta(days=i) for i in range((fin - debut).days + 1)]
+        with self.biblio.verrou:
+            compteurs = [self.biblio.statistiques.par_jour.get(jour.strftime("%Y-%m-%d"), (0, 0)) for jour in jours]
+        return jours, [c[0] for c in compteurs], [c[1] for c in compteurs]
+
+    @_memoise
+    def livres_plus_empruntes(self, n=10, debut=None, fin=None):
+        """
+        Les n livres les plus empruntés, éventuellement sur une plage de jours.
+        :return: [(isbn, titre, nombre d'emprunts)] ; le titre est vide pour un livre supprimé depuis
+        """
+        colonnes = self._colonnes()
+        if np is not None:
+            garder = colonnes["emprunt"] & self._masque_plage(colonnes, debut, fin)
+            comptes = np.bincount(colonnes["isbn"][garder], minlength=len(colonnes["isbns"]))
+            meilleurs = np.argsort(-comptes, kind="stable")[:n]
+            classement = [(colonnes["isbns"][i], int(comptes[i])) for i in meilleurs if comptes[i]]
+        else:
+            debut, fin = self._bornes(debut, fin)
+            comptes = Counter(
+                isbn for horodatage, isbn, _, emprunt in zip(colonnes["date"], colonnes["isbn"], colonnes["membre"],
+                                                             colonnes["emprunt"])
+                if emprunt and debut <= horodatage < fin
+            )
+            classement = sorted(comptes.items(), key=lambda e: (-e[1], e[0]))[:n]
+        with self.biblio.verrou:
+            return [(isbn, self.biblio.livres[isbn].titre if isbn in self.biblio.livres else "", nombre)
+                    for isbn, nombre in classement]
+
+    @_memoise
+    def duree_moyenne_emprunt(self, debut=None, fin=None):
+        """
+        Durée moyenne en jours entre un emprunt et le retour du même livre par le même membre,
+        pour les emprunts faits entre debut et fin. Retourne None si aucun emprunt n'est revenu.
+        """
+        colonnes = self._colonnes()
+        if np is not None:
+            # Tri stable par (livre, membre) : chaque emprunt est suivi de son retour éventuel
+            cle = colonnes["isbn"].astype(np.int64) * (len(colonnes["membres"]) + 1) + colonnes["membre"]
+            ordre = np.argsort(cle, kind="stable")
+            cle, emprunt = cle[ordre], colonnes["emprunt"][ordre]
+            dates, dans_plage = colonnes["date"][ordre], self._masque_plage(colonnes, debut, fin)[ordre]
+            paires = (cle[:-1] == cle[1:]) & emprunt[:-1] & ~emprunt[1:] & dans_plage[:-1]
+            if not paires.any():
+                return None
+            durees = (dates[1:][paires] - dates[:-1][paires]) / np.timedelta64(1, "D")
+            return float(durees.mean())
+
+        debut, fin = self._bornes(debut, fin)
+        en_cours, durees = {}, []
+        for horodatage, isbn, membre, emprunt in zip(colonnes["date"], colonnes["isbn"], colonnes["membre"],
+                                                     colonnes["emprunt"]):
+            if emprunt:
+                en_cours[isbn, membre] = horodatage
+            else:
+                depart = en_cours.pop((isbn, membre), None)
+                if depart is not None and debut <= depart < fin:
+                    durees.append((horodatage - depart).total_seconds() / 86400)
+        return sum(durees) / len(durees) if durees else None
+
+    # Colonnes de l'historique (dates, livres, membres, emprunt ou retour), relues seulement
+    # si l'historique a changé (un ajout au catalogue, par exemple, ne les invalide pas)
+    def _colonnes(self):
+        signature = self.biblio.stockage.signature_historique()
+        with self._verrou:
+            if self._colonnes_cache is not None and self._colonnes_cache[0] == signature:
+                return self._colonnes_cache[1]
+        colonnes = self._lire_colonnes()
+        with self._verrou:
+            self._colonnes_cache = (signature, colonnes)
+        return colonnes
+
+    def _lire_colonnes(self):
+        dates, isbns, membres, emprunts = [], [], [], []
+        for horodatage, isbn, id_membre, action in self.biblio.stockage.historique():
+            dates.append(horodatage)
+            isbns.append(isbn)
+            membres.append(id_membre)
+            emprunts.append(action == "emprunt")
+        if np is None:
+            # Les entrées les plus anciennes n'ont que le jour : fromisoformat accepte les deux formes
+            return {"date": [datetime.fromisoformat(d) for d in dates], "isbn": isbns, "membre": membres, "emprunt": emprunts}
+        # Livres et membres codés par leur rang dans le tableau des valeurs distinctes
+        valeurs_isbn, codes_isbn = np.unique(np.array(isbns, dtype=str), return_inverse=True)
+        valeurs_membre, codes_membre = np.unique(np.array(membres, dtype=str), return_inverse=True)
+        return {
+            "date": np.array(dates, dtype="datetime64[s]"),
+            "isbn": codes_isbn, "isbns": valeurs_isbn.tolist(),
+            "membre": codes_membre, "membres": valeurs_membre.tolist(),
+            "emprunt": np.array(emprunts, dtype=bool),
+        }
+
+    # Bornes [debut, fin + 1 jour[ en datetime (toute la période si absentes)
+    def _bornes(self, debut, fin):
+        debut, fin = _date(debut), _date(fin)
+        return (datetime.combine(debut, datetime.min.time()) if debut else datetime.min,
+                datetime.combine(fin + timedelta(days=1), datetime.min.time()) if fin else datetime.max)
+
+    def _masque_plage(self, colonnes, debut, fin):
+        masque = np.ones(len(colonnes["date"]), dtype=bool)
+        debut, fin = _date(debut), _date(fin)
+        if debut is not None:
+            masque &= colonnes["date"] >= np.datetime64(debut, "s")
+        if fin is not None:
+            masque &= colonnes["date"] < np.datetime64(fin + timedelta(days=1), "s")
+        return masque
+
+
+# Lignes (en-tête compris) du rapport CSV de chaque indicateur
+def lignes_csv(analyses, nom, debut=None, fin=None):
+    if nom == "genres":
+        return [["genre", "livres"]] + sorted(analyses.repartition_genres().items(), key=lambda e: -e[1])
+    if nom == "auteurs":
+        return [["auteur", "livres"]] + analyses.top_auteurs(10)
+    if nom == "activite":
+        jours, emprunts, retours = analyses.activite(debut, fin)
+        return [["jour", "emprunts", "retours"]] + [[j.strftime("%Y-%m-%d"), e, r] for j, e, r in zip(jours, emprunts, retours)]
+    if nom == "plus_empruntes":
+        return [["isbn", "titre", "emprunts"]] + analyses.livres_plus_empruntes(10, debut, fin)
+    if nom == "duree_moyenne":
+        duree = analyses.duree_moyenne_emprunt(debut, fin)
+        return [["duree_moyenne_jours"], ["" if duree is None else f"{duree:.2f}"]]
+    raise ValueError(f"Indicateur inconnu : {nom}")
+
+
+def exporter_csv(analyses, nom, chemin, debut=None, fin=None):
+    with open(chemin, "w", encoding="utf-8", newline="") as f:
+        csv.writer(f).writerows(lignes_csv(analyses, nom, debut, fin))
@@ -0,0 +1,155 @@
+import os
+import json
+from collections import Counter
+from datetime import date, datetime, timedelta
+from src.prets import FORMAT_DATE
+
+INTERVALLE_POINTS = 7  # Jours entre deux points de contrôle
+
+
+# Ramène une date (date, datetime ou chaîne) à un horodatage "AAAA-MM-JJ HH:MM:SS" ;
+# un jour seul désigne sa fin (l'état « au soir » de ce jour)
+def _horodatage(valeur):
+    if valeur is None:
+        return datetime.now().strftime(FORMAT_DATE)
+    if isinstance(valeur, datetime):
+        return valeur.strftime(FORMAT_DATE)
+    if isinstance(valeur, date):
+        return valeur.strftime("%Y-%m-%d") + " 23:59:59"
+    valeur = str(valeur).strip()
+    return valeur + " 23:59:59" if len(valeur) == 10 else valeur
+
+
+def _lendemain(jour, jours=1):
+    return (datetime.strptime(jour, "%Y-%m-%d") + timedelta(days=jours)).strftime("%Y-%m-%d")
+
+
+class Audit:
+    """
+    Emprunts en cours à une date passée, reconstitués depuis l'historique : qui détenait un livre,
+    ce que détenait un membre, tout ce qui était emprunté.
+    Des points de contrôle enregistrent l'état au début d'un jour (après toutes les actions des jours
+    précédents) dans data/points_controle/ ; une question sur la date T part du dernier point avant T
+    et ne rejoue que les actions qui suivent, lues via l'index par jour de l'historique : le coût suit
+    la longueur de cet écart, pas celle de tout l'historique. Les points manquants (un tous les
+    intervalle jours, jusqu'à la veille) sont écrits au passage ; quand l'état n'a pas changé depuis
+    le dernier point complet, le point ne fait que renvoyer à celui-ci. Chaque point garde la signature
+    de l'historique qu'il résume : un historique qui ne la prolonge plus les rend caducs.
+    Les entrées de l'historique portent l'ISBN du livre : l'état est tenu par livre et par membre.
+    """
+
+    def __init__(self, biblio, intervalle=INTERVALLE_POINTS, dossier=None):
+        self.biblio = biblio
+        self.intervalle = intervalle
+        self.dossier = dossier or os.path.join(biblio.data_dir, "points_controle")
+
+    def _chemin(self, jour):
+        return os.path.join(self.dossier, f"{jour}.json")
+
+    # Jours des points de contrôle encore valides, dans l'ordre. Un historique réécrit
+    # (migration, import) depuis leur écriture les rend tous caducs : ils sont supprimés
+    def jours_points(self):
+        try:
+            jours = sorted(nom[:-5] for nom in os.listdir(self.dossier) if nom.endswith(".json"))
+        except FileNotFoundError:
+            return []
+        if jours and self.biblio.stockage.historique_depuis(self._lire(jours[-1])["signature"]) is None:
+            for jour in jours:
+                os.remove(self._chemin(jour))
+            return []
+        return jours
+
+    def _lire(self, jour):
+        with open(self._chemin(jour), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    # État enregistré par le point d'un jour : (jour du point complet qui le contient, état)
+    def _etat_point(self, jour):
+        point = self._lire(jour)
+        if "comme" in point:
+            jour = point["comme"]
+            point = self._lire(jour)
+        return jour, Counter({(isbn, id_membre): nombre for isbn, id_membre, nombre in point["emprunts"]})
+
+    # Écrit le point de contrôle d'un jour : l'état complet s'il diffère de celui du dernier point complet
+    # (precedent, None au départ), sinon un simple renvoi vers ce point ; retourne le dernier point complet
+    def _point(self, jour, etat, precedent):
+        etat = +etat
+        if precedent is not None and etat == precedent[1]:
+            self._ecrire(jour, comme=precedent[0])
+            return precedent
+        self._ecrire(jour, emprunts=[[isbn, id_membre, nombre] for (isbn, id_membre), nombre in sorted(etat.items())])
+        return jour, etat
+
+    def _ecrire(self, jour, **contenu):
+        os.makedirs(self.dossier, exist_ok=True)
+        temporaire = self._chemin(jour) + ".tmp"
+        with open(temporaire, "w", encoding="utf-8") as f:
+            json.dump(dict(jour=jour, signature=self.biblio.stockage.signature_historique(), **contenu), f)
+        os.replace(temporaire, self._chemin(jour))
+
+    def etat(self, date=None):
+        """
+        Emprunts en cours à une date, après toutes les actions horodatées jusqu'à elle incluse.
+        :param date: datetime, date (fin du jour) ou chaîne "AAAA-MM-JJ[ HH:MM:SS]" ; maintenant par défaut
+        :return: Counter {(isbn, id_membre): nombre d'exemplaires empruntés}
+        """
+        limite = _horodatage(date)
+        jour_limite = limite[:10]
+        aujourd_hui = datetime.now().strftime("%Y-%m-%d")
+
+        # Dernier point de contrôle au plus tard le jour de la date demandée
+        etat, depart, precedent = Counter(), None, None
+        for jour in reversed(self.jours_points()):
+            if jour <= jour_limite:
+                precedent = self._etat_point(jour)
+                etat, depart = Counter(precedent[1]), jour
+                break
+
+        # Rejoue les actions qui suivent ; chaque point de contrôle franchi est écrit (état au début
+        # de son jour) s'il s'agit d'un jour révolu et que l'historique est resté dans l'ordre des dates
+        prochain_point = _lendemain(depart, self.intervalle) if depart else None
+        dernier_jour, ordonne = depart or "", True
+        for horodatage, isbn, id_membre, action in self.biblio.iter_historique(depart, jour_limite):
+            jour = horodatage[:10]
+            if len(horodatage) == 10:
+                horodatage += " 00:00:00"  # Entrées anciennes datées au jour
+            ordonne = ordonne and jour >= dernier_jour
+            dernier_jour = max(dernier_jour, jour)
+            prochain_point = prochain_point or _lendemain(jour, self.intervalle)
+            while ordonne and prochain_point <= jour and prochain_point < aujourd_hui:
+                precedent = self._point(prochain_point, etat, precedent)
+                prochain_point = _lendemain(prochain_point, self.intervalle)
+            if horodatage > limite:
+                continue
+            cle = (isbn, id_membre)
+            if action == "emprunt":
+                etat[cle] += 1
+            elif etat[cle] > 0:
+                etat[cle] -= 1
+        # Points des jours sans action jusqu'à la date demandée
+        while ordonne and prochain_point is not None and prochain_point <= min(jour_limite, _lendemain(aujourd_hui, -1)):
+            precedent = self._point(prochain_point, etat, precedent)
+            prochain_point = _lendemain(prochain_point, self.intervalle)
+        return +etat
+
+    # Livres empruntés à une date : {isbn: [ID des membres qui en détenaient un exemplaire]}
+    def inventaire(self, date=None):
+        emprunts = {}
+        for (isbn, id_membre), nombre in sorted(self.etat(date).items()):
+            emprunts.setdefault(isbn, []).extend([id_membre] * nombre)
+        return emprunts
+
+    # Membres qui détenaient un exemplaire du livre à une date
+    def detenteurs(self, isbn, date=None):
+        return self.inventaire(date).get(isbn, [])
+
+    # ISBN des livres qu'un membre détenait à une date
+    def emprunts_membre(self, id_membre, date=None):
+        return sorted(isbn for (isbn, membre), nombre in self.etat(date).items() if membre == id_membre
+                      for _ in range(nombre))
+
+    # Écrit les points de contrôle manquants jusqu'à la veille ; retourne les jours des points
+    def mettre_a_jour(self):
+        self.etat(_lendemain(datetime.now().strftime("%Y-%m-%d"), -1))
+        return self.jours_points()
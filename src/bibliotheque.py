@@ -1,159 +1,890 @@
 import os
-import csv
+import sys
+import time
+import threading
+from bisect import bisect_left, insort
+from contextlib import contextmanager, nullcontext
+from itertools import islice
 from datetime import datetime
-from src.exceptions import LivreInexistantError, LivreIndisponibleError, MembreInexistantError, QuotaEmpruntDepasseError
+from src.exceptions import (LivreInexistantError, LivreIndisponibleError, MembreInexistantError, QuotaEmpruntDepasseError,
+                            PretEnRetardError)
+from src.stockage import StockageTexte
+from src.statistiques import Statistiques
+from src.recherche import IndexRecherche
+from src.instantane import LivresMappes
+from src.prets import Pret, Echeancier, RENOUVELLEMENTS_MAX, DUREE_PRET, FORMAT_DATE
+from src.reservations import FilesAttente
+
+
+# Année d'un livre : entier si le texte en est l'écriture exacte ("1850", "-50"), sinon le texte
+# tel quel ("vers 1850", "1999?") pour qu'il soit réécrit à l'identique ; None si vide
+def lire_annee(annee):
+    if annee is None or isinstance(annee, int):
+        return annee
+    texte = str(annee).strip()
+    if not texte:
+        return None
+    try:
+        valeur = int(texte)
+    except ValueError:
+        return texte
+    return valeur if str(valeur) == texte else texte
+
 
 class Bibliotheque:
-    # Classe interne pour représenter un livre
+    # Attributs de Livre sur lesquels le tableau peut être trié
+    CLES_TRI = ("isbn", "titre", "auteur", "annee", "genre", "statut")
+
+    # Classe interne pour représenter un livre (un titre : ses exemplaires sont des Exemplaire)
+    # Représentation compacte : pas de __dict__, auteur et genre internés, année entière (voir lire_annee),
+    # disponibilité tenue par deux compteurs d'exemplaires
     class Livre:
+        __slots__ = ("isbn", "titre", "auteur", "annee", "genre", "exemplaires", "disponibles")
+
         def __init__(self, isbn, titre, auteur, annee, genre, statut="disponible"):
             self.isbn = isbn
             self.titre = titre
-            self.auteur = auteur
-            self.annee = annee
-            self.genre = genre
+            self.auteur = sys.intern(auteur)
+            self.annee = lire_annee(annee)
+            self.genre = sys.intern(genre)
+            self.exemplaires = 1  # Nombre d'exemplaires physiques
             self.statut = statut  # "disponible" ou "emprunte"
 
+        # "disponible" tant qu'au moins un exemplaire est disponible
+        @property
+        def statut(self):
+            return "disponible" if self.disponibles else "emprunte"
+
+        @statut.setter
+        def statut(self, valeur):
+            self.disponibles = 0 if valeur == "emprunte" else self.exemplaires
+
+        # Année telle qu'écrite dans les fichiers ("" si inconnue)
+        @property
+        def annee_texte(self):
+            return "" if self.annee is None else str(self.annee)
+
         def __str__(self):
             return f"{self.titre} ({self.auteur}) - {self.statut}"
 
     # Classe interne pour représenter un membre
     class Membre:
+        __slots__ = ("id_membre", "nom", "livres_empruntes")
+
         def __init__(self, id_membre, nom):
             self.id_membre = id_membre
             self.nom = nom
-            self.livres_empruntes = []  # Liste des ISBN des livres empruntés
+            self.livres_empruntes = set()  # Codes-barres des exemplaires empruntés (l'ISBN pour un exemplaire unique)
 
         def __str__(self):
             return f"{self.nom} ({len(self.livres_empruntes)} livre(s) emprunté(s))"
 
-    def __init__(self):
+    # Classe interne pour représenter un exemplaire physique d'un livre
+    # Un livre sans exemplaire déclaré en a un seul, implicite, dont le code-barres est l'ISBN
+    class Exemplaire:
+        __slots__ = ("code", "isbn", "localisation", "statut")
+
+        def __init__(self, code, isbn, localisation="", statut="disponible"):
+            self.code = code
+            self.isbn = isbn
+            self.localisation = localisation
+            self.statut = statut  # "disponible" ou "emprunte"
+
+        def __str__(self):
+            return f"{self.code} ({self.localisation or 'sans localisation'}) - {self.statut}"
+
+    def __init__(self, journalise=False, seuil_compactage=10000, stockage=None, data_dir=None, partage=False,
+                 lot_historique=100, delai_historique_ms=1000, instantane_binaire=False, instrumentation=None):
         self.livres = {}      # Dictionnaire des livres par ISBN
         self.membres = {}     # Dictionnaire des membres par ID
-        self.historique = []  # Liste des actions (date, isbn, id_membre, action)
+        self._historique = None  # Historique en mémoire, matérialisé seulement si demandé
+        self.emprunts = {}    # Index inverse code-barres de l'exemplaire -> ID du membre emprunteur
+        self.exemplaires = {}     # Code-barres -> Exemplaire, pour les livres dont les exemplaires sont déclarés
+        self._codes_livre = {}    # ISBN -> codes-barres de ses exemplaires déclarés
+        self._libres = {}         # ISBN -> codes-barres de ses exemplaires déclarés disponibles
+        self.prets = Echeancier()  # Prêts en cours (date d'emprunt, échéance), triés par échéance
+        self.reservations = FilesAttente()  # Files d'attente des livres empruntés, par ISBN et par membre
+        self._observateurs = []  # Fonctions appelées à chaque changement (objet, action, cle)
+        self.version = 0         # Incrémentée à chaque changement : invalide les résultats dérivés (graphiques)
+        self._index_tri = {}     # Index triés construits à la demande : cle -> [(valeur, isbn)]
+        self._isbn_disponibles = None  # {isbn: None} des livres ayant un exemplaire disponible, construit à la demande
+        self.statistiques = Statistiques()  # Agrégats pour les graphiques (par jour, genre, auteur)
+        self._recherche = None   # Index de recherche plein texte, construit à la première recherche
 
-        # Chemins vers les fichiers de données
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        self.data_dir = os.path.join(base_dir, "..", "data")
-        os.makedirs(self.data_dir, exist_ok=True)
+        # Concurrence : verrou réentrant autour de chaque mutation ; en mode partagé, verrou
+        # consultatif inter-processus et prise en compte des écritures des autres processus
+        self.verrou = threading.RLock()
+        self.partage = partage
+        self.mesures_verrou = {}  # opération -> [nombre, attente totale, détention totale, détention max]
 
-        self.livres_fichier = os.path.join(self.data_dir, "livres.txt")
-        self.membres_fichier = os.path.join(self.data_dir, "membres.txt")
-        self.historique_fichier = os.path.join(self.data_dir, "historique.csv")
+        # Dossier des données (par défaut data/ à la racine du projet)
+        if data_dir is None:
+            base_dir = os.path.dirname(os.path.abspath(__file__))
+            data_dir = os.path.join(base_dir, "..", "data")
+        self.data_dir = data_dir
 
-    # Ajoute un livre à la bibliothèque
-    def ajouter_livre(self, livre):
+        # Moteur de stockage : fichiers texte par défaut, journalisés si demandé.
+        # L'historique y est écrit par lots de lot_historique lignes ou toutes les delai_historique_ms ms ;
+        # instantane_binaire ajoute livres.bin, projeté en mémoire au démarrage. En mode partagé, le journal
+        # est toujours tenu : les écritures d'un autre processus sont rattrapées entrée par entrée,
+        # sans rechargement complet
+        if stockage is None:
+            stockage = StockageTexte(self.data_dir, journalise or partage, seuil_compactage, lot_historique,
+                                     delai_historique_ms, instantane_binaire)
+        self.stockage = stockage
+        self.stockage.attacher(self)
+        self.statistiques_fichier = os.path.join(self.data_dir, "statistiques.json")
+
+        # Mesures optionnelles (src/instrumentation.py) : chaque méthode publique est remplacée
+        # par sa version mesurée, le stockage y compte les octets écrits
+        self.instrumentation = instrumentation
+        if instrumentation is not None:
+            instrumentation.instrumenter(self)
+
+    # Vérifie qu'un livre peut être ajouté (lève ValueError sinon)
+    def _valider_livre(self, livre):
+        if not livre.isbn or not livre.titre:
+            raise ValueError("ISBN et titre obligatoires.")
+        if any(";" in champ or "\n" in champ
+               for champ in (livre.isbn, livre.titre, livre.auteur, livre.annee_texte, livre.genre)):
+            raise ValueError("Les champs ne doivent contenir ni ';' ni retour à la ligne.")
         if livre.isbn in self.livres:
             raise ValueError("Livre déjà existant.")
+
+    # Ajoute un livre aux structures en mémoire et à leurs index
+    def _inserer_livre(self, livre):
         self.livres[livre.isbn] = livre
-        self.sauvegarder()
+        self._indexer_livre(livre)
+        if self._isbn_disponibles is not None and livre.disponibles:
+            self._isbn_disponibles[livre.isbn] = None
+        self.statistiques.ajouter_livre(livre)
+        if self._recherche is not None:
+            self._recherche.ajouter(livre)
+
+    # Retire un livre des structures en mémoire et de leurs index
+    def _retirer_livre(self, isbn):
+        livre = self.livres.pop(isbn)
+        self._desindexer_livre(livre)
+        if self._isbn_disponibles is not None:
+            self._isbn_disponibles.pop(isbn, None)
+        self.statistiques.retirer_livre(livre)
+        if self._recherche is not None:
+            self._recherche.retirer(livre)
+
+    # Ajoute delta au compteur d'exemplaires disponibles d'un livre ; l'index trié par statut
+    # et l'ensemble des livres disponibles ne sont touchés que si le livre passe de disponible à emprunté ou l'inverse
+    def _changer_disponibles(self, livre, delta):
+        if (livre.disponibles > 0) == (livre.disponibles + delta > 0):
+            livre.disponibles += delta
+            return
+        self._desindexer_livre(livre, ("statut",))
+        livre.disponibles += delta
+        self._indexer_livre(livre, ("statut",))
+        if self._isbn_disponibles is not None:
+            if livre.disponibles:
+                self._isbn_disponibles[livre.isbn] = None
+            else:
+                self._isbn_disponibles.pop(livre.isbn, None)
+
+    # ISBN du livre d'un exemplaire
+    def livre_de(self, code):
+        exemplaire = self.exemplaires.get(code)
+        return exemplaire.isbn if exemplaire is not None else code
+
+    # Exemplaires d'un livre (l'exemplaire implicite d'un livre sans exemplaire déclaré est construit)
+    def exemplaires_livre(self, isbn):
+        codes = self._codes_livre.get(isbn)
+        if codes is None:
+            return [self.Exemplaire(isbn, isbn, "", self.livres[isbn].statut)]
+        return [self.exemplaires[code] for code in codes]
+
+    # Range un exemplaire déclaré avec son livre et met à jour les compteurs du livre.
+    # Le premier exemplaire déclaré remplace l'exemplaire implicite
+    def _attacher_exemplaire(self, exemplaire):
+        livre = self.livres[exemplaire.isbn]
+        if exemplaire.isbn not in self._codes_livre:
+            self._codes_livre[exemplaire.isbn] = []
+            self._libres[exemplaire.isbn] = set()
+            livre.exemplaires = 0
+            self._changer_disponibles(livre, -livre.disponibles)
+        self.exemplaires[exemplaire.code] = exemplaire
+        self._codes_livre[exemplaire.isbn].append(exemplaire.code)
+        livre.exemplaires += 1
+        if exemplaire.statut == "disponible":
+            self._libres[exemplaire.isbn].add(exemplaire.code)
+            self._changer_disponibles(livre, 1)
+
+    def _detacher_exemplaire(self, code):
+        exemplaire = self.exemplaires.pop(code)
+        self._codes_livre[exemplaire.isbn].remove(code)
+        livre = self.livres.get(exemplaire.isbn)
+        if livre is not None:
+            livre.exemplaires -= 1
+        if code in self._libres[exemplaire.isbn]:
+            self._libres[exemplaire.isbn].discard(code)
+            if livre is not None:
+                self._changer_disponibles(livre, -1)
+
+    # Oublie les exemplaires déclarés d'un livre retiré du catalogue
+    def _oublier_exemplaires(self, isbn):
+        for code in self._codes_livre.pop(isbn, ()):
+            del self.exemplaires[code]
+        self._libres.pop(isbn, None)
+
+    # Marque un exemplaire emprunté : celui donné, ou un exemplaire disponible pris en O(1).
+    # Retourne son code-barres, ou None s'il était déjà emprunté (rejeu du journal)
+    def _sortir_exemplaire(self, isbn, code=None):
+        livre = self.livres[isbn]
+        libres = self._libres.get(isbn)
+        if libres is None:
+            code = isbn  # Exemplaire implicite
+            if not livre.disponibles:
+                return None
+        elif code is None:
+            code = libres.pop()
+        elif code in libres:
+            libres.discard(code)
+        else:
+            return None
+        if code in self.exemplaires:
+            self.exemplaires[code].statut = "emprunte"
+        self._changer_disponibles(livre, -1)
+        return code
+
+    # Remet un exemplaire en rayon (sans effet s'il était déjà disponible)
+    def _rentrer_exemplaire(self, isbn, code):
+        livre = self.livres.get(isbn)
+        if livre is None:
+            return
+        exemplaire = self.exemplaires.get(code)
+        if exemplaire is None:
+            if livre.disponibles < livre.exemplaires:
+                self._changer_disponibles(livre, 1)
+            return
+        if exemplaire.statut == "emprunte":
+            exemplaire.statut = "disponible"
+            self._libres[isbn].add(code)
+            self._changer_disponibles(livre, 1)
+
+    # Code-barres de l'exemplaire d'un livre emprunté par un membre (code ou ISBN donné), ou None
+    def _code_emprunte(self, isbn_ou_code, id_membre):
+        empruntes = self.membres[id_membre].livres_empruntes
+        if isbn_ou_code in empruntes:
+            return isbn_ou_code
+        return next((code for code in empruntes if self.livre_de(code) == isbn_ou_code), None)
+
+    # Ajoute un exemplaire à un livre ; code-barres généré (ISBN-n) s'il n'est pas donné.
+    # Un livre sans exemplaire déclaré garde son exemplaire implicite, déclaré sous le code de l'ISBN
+    def ajouter_exemplaire(self, isbn, code=None, localisation=""):
+        with self._transaction("ajouter_exemplaire"):
+            if isbn not in self.livres:
+                raise LivreInexistantError("Livre inexistant.")
+            if any(c in champ for c in ";,\n" for champ in (code or "", localisation)):
+                raise ValueError("Code-barres et localisation sans ';', ',' ni retour à la ligne.")
+            if code is not None and (code in self.exemplaires or code in self.livres):
+                raise ValueError("Code-barres déjà utilisé.")
+
+            nouveaux = []
+            if isbn not in self._codes_livre:
+                livre = self.livres[isbn]
+                nouveaux.append(self.Exemplaire(isbn, isbn, "", livre.statut))
+                self._attacher_exemplaire(nouveaux[-1])
+            if code is None:
+                numero = len(self._codes_livre[isbn]) + 1
+                while f"{isbn}-{numero}" in self.exemplaires:
+                    numero += 1
+                code = f"{isbn}-{numero}"
+            nouveaux.append(self.Exemplaire(code, isbn, localisation))
+            self._attacher_exemplaire(nouveaux[-1])
+            self.stockage.ajouter_exemplaires(nouveaux)
+            self._notifier("livre", "modification", isbn)
+            return nouveaux[-1]
+
+    # Retire un exemplaire disponible (le dernier exemplaire d'un livre se retire avec le livre)
+    def supprimer_exemplaire(self, code):
+        with self._transaction("supprimer_exemplaire"):
+            if code not in self.exemplaires:
+                raise LivreInexistantError("Exemplaire inexistant.")
+            exemplaire = self.exemplaires[code]
+            if exemplaire.statut == "emprunte":
+                raise LivreIndisponibleError("L'exemplaire est actuellement emprunté.")
+            if len(self._codes_livre[exemplaire.isbn]) == 1:
+                raise ValueError("Dernier exemplaire : supprimer le livre.")
+            self._detacher_exemplaire(code)
+            self.stockage.supprimer_exemplaire(code)
+            self._notifier("livre", "modification", exemplaire.isbn)
+
+    # Ajoute un livre à la bibliothèque
+    def ajouter_livre(self, livre):
+        with self._transaction("ajouter_livre"):
+            self._valider_livre(livre)
+            self._inserer_livre(livre)
+            self.stockage.ajouter_livre(livre)
+            self._notifier("livre", "ajout", livre.isbn)
+
+    # Ajoute des livres en masse : validation en un passage, une seule écriture
+    # Retourne la liste des erreurs (numéro de ligne à partir de 1, message) ; les lignes valides sont ajoutées
+    def ajouter_livres(self, livres):
+        with self._transaction("ajouter_livres"):
+            ajoutes, erreurs = [], []
+            for numero, livre in enumerate(livres, start=1):
+                try:
+                    if isinstance(livre, Exception):
+                        raise livre  # Ligne illisible signalée par le lecteur d'import
+                    self._valider_livre(livre)
+                except ValueError as e:
+                    erreurs.append((numero, str(e)))
+                    continue
+                self._inserer_livre(livre)
+                ajoutes.append(livre)
+            if ajoutes:
+                self.stockage.ajouter_livres(ajoutes)
+                self._notifier("livre", "rechargement", None)
+            return erreurs
 
     # Supprime un livre si non emprunté
     def supprimer_livre(self, isbn):
-        if isbn not in self.livres:
-            raise LivreInexistantError("Livre inexistant.")
-        if self.livres[isbn].statut == "emprunte":
-            raise LivreIndisponibleError("Le livre est actuellement emprunté.")
-        del self.livres[isbn]
-        self.sauvegarder()
+        with self._transaction("supprimer_livre"):
+            if isbn not in self.livres:
+                raise LivreInexistantError("Livre inexistant.")
+            livre = self.livres[isbn]
+            if livre.disponibles < livre.exemplaires:
+                raise LivreIndisponibleError("Le livre est actuellement emprunté.")
+            self._retirer_livre(isbn)
+            self._oublier_exemplaires(isbn)
+            self.reservations.retirer_livre(isbn)
+            self.stockage.supprimer_livre(isbn)
+            self._notifier("livre", "suppression", isbn)
 
-    # Enregistre un nouveau membre
-    def enregistrer_membre(self, membre):
+    # Vérifie qu'un membre peut être enregistré (lève ValueError sinon)
+    def _valider_membre(self, membre):
+        if not membre.id_membre:
+            raise ValueError("ID membre obligatoire.")
+        if any(";" in champ or "\n" in champ for champ in (membre.id_membre, membre.nom)):
+            raise ValueError("Les champs ne doivent contenir ni ';' ni retour à la ligne.")
         if membre.id_membre in self.membres:
             raise ValueError("Membre déjà existant.")
-        self.membres[membre.id_membre] = membre
-        self.sauvegarder()
+
+    # Enregistre un nouveau membre
+    def enregistrer_membre(self, membre):
+        with self._transaction("enregistrer_membre"):
+            self._valider_membre(membre)
+            self.membres[membre.id_membre] = membre
+            self.stockage.enregistrer_membre(membre)
+            self._notifier("membre", "ajout", membre.id_membre)
+
+    # Enregistre des membres en masse : validation en un passage, une seule écriture
+    # Retourne la liste des erreurs (numéro de ligne à partir de 1, message)
+    def enregistrer_membres(self, membres):
+        with self._transaction("enregistrer_membres"):
+            ajoutes, erreurs = [], []
+            for numero, membre in enumerate(membres, start=1):
+                try:
+                    if isinstance(membre, Exception):
+                        raise membre
+                    self._valider_membre(membre)
+                except ValueError as e:
+                    erreurs.append((numero, str(e)))
+                    continue
+                self.membres[membre.id_membre] = membre
+                ajoutes.append(membre)
+            if ajoutes:
+                self.stockage.enregistrer_membres(ajoutes)
+                self._notifier("membre", "rechargement", None)
+            return erreurs
 
     # Supprime un membre s'il n'a pas de livres empruntés
     def supprimer_membre(self, id_membre):
-        if id_membre not in self.membres:
-            raise MembreInexistantError("Membre inexistant.")
-        if self.membres[id_membre].livres_empruntes:
-            raise ValueError("Le membre a encore des livres empruntés.")
-        del self.membres[id_membre]
-        self.sauvegarder()
+        with self._transaction("supprimer_membre"):
+            if id_membre not in self.membres:
+                raise MembreInexistantError("Membre inexistant.")
+            if self.membres[id_membre].livres_empruntes:
+                raise ValueError("Le membre a encore des livres empruntés.")
+            del self.membres[id_membre]
+            self.reservations.retirer_membre(id_membre)
+            self.stockage.supprimer_membre(id_membre)
+            self._notifier("membre", "suppression", id_membre)
 
-    # Permet à un membre d'emprunter un livre disponible
+    # Permet à un membre d'emprunter un livre disponible : n'importe quel exemplaire disponible
+    # pour un ISBN, ou l'exemplaire précis dont le code-barres est donné
     def emprunter_livre(self, isbn, id_membre):
-        if id_membre not in self.membres:
-            raise MembreInexistantError("Membre inexistant.")
-        if isbn not in self.livres:
-            raise LivreInexistantError("Livre inexistant.")
-        if self.livres[isbn].statut != "disponible":
-            raise LivreIndisponibleError("Livre déjà emprunté.")
+        with self._transaction("emprunter_livre"):
+            if id_membre not in self.membres:
+                raise MembreInexistantError("Membre inexistant.")
+            code = None
+            if isbn not in self.livres and isbn in self.exemplaires:
+                code, isbn = isbn, self.exemplaires[isbn].isbn
+            if isbn not in self.livres:
+                raise LivreInexistantError("Livre inexistant.")
+            if code is not None and self.exemplaires[code].statut != "disponible":
+                raise LivreIndisponibleError("Exemplaire déjà emprunté.")
+            if not self.livres[isbn].disponibles:
+                raise LivreIndisponibleError("Livre déjà emprunté.")
+            self._verifier_quota(id_membre)
+            pret = self._preter(isbn, id_membre, code)
+            self._notifier("livre", "modification", isbn)
+            self._notifier("membre", "modification", id_membre)
+            return pret
+
+    # Lève QuotaEmpruntDepasseError (ou PretEnRetardError) si le membre ne peut plus emprunter
+    def _verifier_quota(self, id_membre):
         if len(self.membres[id_membre].livres_empruntes) >= 3:
             raise QuotaEmpruntDepasseError("Ce membre a atteint le quota maximal de 3 emprunts.")
+        if self.retards_membre(id_membre):
+            raise PretEnRetardError("Ce membre doit d'abord rendre ses livres en retard.")
 
-        self.livres[isbn].statut = "emprunte"
-        self.membres[id_membre].livres_empruntes.append(isbn)
-        self._log_action("emprunt", isbn, id_membre)
-        self.sauvegarder()
+    # Prête un exemplaire disponible d'un livre à un membre (sa réservation éventuelle du livre est honorée)
+    def _preter(self, isbn, id_membre, code=None):
+        code = self._sortir_exemplaire(isbn, code)
+        self.membres[id_membre].livres_empruntes.add(code)
+        self.emprunts[code] = id_membre
+        self.reservations.retirer(isbn, id_membre)
+        pret = Pret(isbn, id_membre, self._log_action("emprunt", isbn, id_membre), code=code)
+        self.prets.ajouter(pret)
+        self.stockage.emprunter(pret)
+        return pret
 
-    # Permet de retourner un livre
+    # Permet de retourner un livre (ISBN ou code-barres de l'exemplaire emprunté)
     def retourner_livre(self, isbn, id_membre):
+        with self._transaction("retourner_livre"):
+            if id_membre not in self.membres:
+                raise MembreInexistantError("Membre inexistant.")
+            if isbn not in self.livres and isbn not in self.exemplaires:
+                raise LivreInexistantError("Livre inexistant.")
+            code = self._code_emprunte(isbn, id_membre)
+            if code is None:
+                raise ValueError("Ce livre n'a pas été emprunté par ce membre.")
+            isbn = self.livre_de(code)
+
+            self.membres[id_membre].livres_empruntes.discard(code)
+            self.emprunts.pop(code, None)
+            self.prets.retirer(code)
+            self._rentrer_exemplaire(isbn, code)
+            date = self._log_action("retour", isbn, id_membre)
+            self.stockage.retourner(isbn, id_membre, date, code)
+
+            # L'exemplaire rendu passe directement au premier réservataire qui peut encore emprunter
+            suivant = self.reservations.prochain(isbn, self._peut_emprunter)
+            if suivant is not None:
+                self._preter(isbn, suivant, code)
+            self._notifier("livre", "modification", isbn)
+            self._notifier("membre", "modification", id_membre)
+            if suivant is not None:
+                self._notifier("membre", "modification", suivant)
+                self._notifier("reservation", "attribution", code)
+            return suivant
+
+    def _peut_emprunter(self, id_membre):
         if id_membre not in self.membres:
-            raise MembreInexistantError("Membre inexistant.")
-        if isbn not in self.livres:
-            raise LivreInexistantError("Livre inexistant.")
-        if isbn not in self.membres[id_membre].livres_empruntes:
-            raise ValueError("Ce livre n'a pas été emprunté par ce membre.")
-
-        self.membres[id_membre].livres_empruntes.remove(isbn)
-        self.livres[isbn].statut = "disponible"
-        self._log_action("retour", isbn, id_membre)
-        self.sauvegarder()
-
-    # Enregistre une action dans l'historique
+            return False
+        try:
+            self._verifier_quota(id_membre)
+        except QuotaEmpruntDepasseError:
+            return False
+        return True
+
+    # Place un membre dans la file d'attente d'un livre emprunté ; retourne son rang dans la file
+    def reserver_livre(self, isbn, id_membre):
+        with self._transaction("reserver_livre"):
+            if id_membre not in self.membres:
+                raise MembreInexistantError("Membre inexistant.")
+            if isbn not in self.livres:
+                raise LivreInexistantError("Livre inexistant.")
+            if self.livres[isbn].disponibles:
+                raise ValueError("Ce livre est disponible : il peut être emprunté directement.")
+            if self._code_emprunte(isbn, id_membre) is not None:
+                raise ValueError("Ce membre emprunte déjà ce livre.")
+            if (isbn, id_membre) in self.reservations:
+                raise ValueError("Ce membre a déjà réservé ce livre.")
+
+            self.reservations.ajouter(isbn, id_membre)
+            self.stockage.reserver(isbn, id_membre)
+            self._notifier("reservation", "ajout", isbn)
+            return self.reservations.position(isbn, id_membre)
+
+    # Retire un membre de la file d'attente d'un livre
+    def annuler_reservation(self, isbn, id_membre):
+        with self._transaction("annuler_reservation"):
+            if not self.reservations.retirer(isbn, id_membre):
+                raise ValueError("Ce membre n'a pas réservé ce livre.")
+            self.stockage.annuler_reservation(isbn, id_membre)
+            self._notifier("reservation", "suppression", isbn)
+
+    # Réservations d'un membre : [(isbn, rang dans la file)], lues dans l'index par membre
+    def reservations_membre(self, id_membre):
+        return [(isbn, self.reservations.position(isbn, id_membre)) for isbn in self.reservations.du_membre(id_membre)]
+
+    # Prolonge un prêt de DUREE_PRET à partir de son échéance (au plus RENOUVELLEMENTS_MAX fois)
+    # Un prêt déjà en retard ne peut plus être renouvelé
+    def renouveler_pret(self, isbn, id_membre):
+        with self._transaction("renouveler_pret"):
+            if id_membre not in self.membres:
+                raise MembreInexistantError("Membre inexistant.")
+            pret = self.prets.get(self._code_emprunte(isbn, id_membre))
+            if pret is None:
+                raise ValueError("Ce livre n'a pas été emprunté par ce membre.")
+            if pret.en_retard():
+                raise PretEnRetardError("Ce prêt est en retard : le livre doit être rendu.")
+            if pret.renouvellements >= RENOUVELLEMENTS_MAX:
+                raise ValueError(f"Ce prêt a déjà été renouvelé {RENOUVELLEMENTS_MAX} fois.")
+
+            echeance = (datetime.fromisoformat(pret.echeance) + DUREE_PRET).strftime(FORMAT_DATE)
+            pret = self.prets.prolonger(pret.code, echeance, pret.renouvellements + 1)
+            self.stockage.renouveler(pret)
+            self._notifier("livre", "modification", pret.isbn)
+            self._notifier("membre", "modification", id_membre)
+            return pret
+
+    # Prêts en retard d'un membre (au plus son quota de livres : pas de parcours global)
+    def retards_membre(self, id_membre, date=None):
+        prets = (self.prets.get(code) for code in self.membres[id_membre].livres_empruntes)
+        return [pret for pret in prets if pret is not None and pret.en_retard(date)]
+
+    # Rapport des retards : (prêt, livre, membre, jours de retard) du retard le plus ancien au plus récent.
+    # Seuls les prêts en retard sont lus, dans l'index par échéance
+    def rapport_retards(self, date=None):
+        with self.verrou:
+            prets = self.prets.en_retard(date)
+        for pret in prets:
+            yield pret, self.livres.get(pret.isbn), self.membres.get(pret.id_membre), pret.jours_de_retard(date)
+
+    # Retourne le membre qui emprunte actuellement ce livre (son exemplaire de code-barres ISBN,
+    # ou l'exemplaire dont le code-barres est donné), ou None
+    def emprunteur(self, isbn):
+        id_membre = self.emprunts.get(isbn)
+        return self.membres.get(id_membre) if id_membre is not None else None
+
+    # Livres ayant au moins un exemplaire disponible (les limit premiers si limit est donné).
+    # L'ensemble de leurs ISBN est construit au premier appel en un parcours du catalogue, puis tenu à jour
+    # à chaque emprunt et retour : les appels suivants ne coûtent que le nombre de livres retournés
+    def livres_disponibles(self, limit=None):
+        with self.verrou:
+            if self._isbn_disponibles is None:
+                self._isbn_disponibles = dict.fromkeys(isbn for isbn, livre in self.livres.items() if livre.disponibles)
+            return [self.livres[isbn] for isbn in islice(self._isbn_disponibles, limit)]
+
+    # Premier livre disponible, ou None ; sans construire l'ensemble des disponibles s'il n'existe pas encore
+    # (au démarrage, le parcours s'arrête au premier livre trouvé)
+    def premier_disponible(self):
+        with self.verrou:
+            if self._isbn_disponibles is not None:
+                return self.livres[next(iter(self._isbn_disponibles))] if self._isbn_disponibles else None
+            return next((livre for livre in self.livres.values() if livre.disponibles), None)
+
+    # Valeur de tri d'un livre pour une clé donnée
+    def _valeur_tri(self, livre, cle):
+        if cle == "annee":
+            # Années inconnues ou non numériques en tête
+            return livre.annee if isinstance(livre.annee, int) else float("-inf")
+        return str(getattr(livre, cle)).casefold()
+
+    # Retourne l'index trié d'une clé, construit au premier usage puis maintenu incrémentalement
+    def _index(self, cle):
+        if cle not in self.CLES_TRI:
+            raise ValueError(f"Clé de tri inconnue : {cle}")
+        if cle not in self._index_tri:
+            if cle == "isbn" and isinstance(self.livres, LivresMappes):
+                # Les livres de l'instantané binaire sont déjà rangés par ISBN
+                self._index_tri[cle] = self.livres.index_isbn()
+                return self._index_tri[cle]
+            self._index_tri[cle] = sorted((self._valeur_tri(livre, cle), livre.isbn) for livre in self.livres.values())
+        return self._index_tri[cle]
+
+    # Insère un livre dans les index triés déjà construits
+    def _indexer_livre(self, livre, cles=None):
+        for cle in cles or list(self._index_tri):
+            index = self._index_tri.get(cle)
+            if isinstance(index, list):
+                insort(index, (self._valeur_tri(livre, cle), livre.isbn))
+            elif index is not None:
+                index.inserer((self._valeur_tri(livre, cle), livre.isbn))
+
+    # Retire un livre des index triés déjà construits
+    def _desindexer_livre(self, livre, cles=None):
+        for cle in cles or list(self._index_tri):
+            index = self._index_tri.get(cle)
+            if index is None:
+                continue
+            entree = (self._valeur_tri(livre, cle), livre.isbn)
+            if not isinstance(index, list):
+                index.retirer(entree)
+                continue
+            i = bisect_left(index, entree)
+            if i < len(index) and index[i] == entree:
+                del index[i]
+
+    # Retourne une fenêtre du catalogue triée : (nombre total de livres retenus, liste de livres)
+    # filtre peut être une fonction livre -> bool ou un ensemble d'ISBN
+    def livres_page(self, offset=0, limit=None, sort_key="isbn", filtre=None, inverse=False):
+        if isinstance(filtre, (set, frozenset, dict)) and len(filtre) * 8 < len(self.livres):
+            # Petit ensemble d'ISBN (résultat de recherche) : tri direct des seuls livres retenus
+            retenus = sorted(
+                (self.livres[isbn] for isbn in filtre if isbn in self.livres),
+                key=lambda livre: (self._valeur_tri(livre, sort_key), livre.isbn),
+                reverse=inverse
+            )
+            fin = None if limit is None else offset + limit
+            return len(retenus), retenus[offset:fin]
+
+        index = self._index(sort_key)
+        ordre = reversed(index) if inverse else iter(index)
+        if filtre is None:
+            fin = len(index) if limit is None else min(len(index), offset + limit)
+            if inverse:
+                positions = range(len(index) - 1 - offset, len(index) - 1 - fin, -1)
+            else:
+                positions = range(offset, fin)
+            return len(index), [self.livres[index[i][1]] for i in positions]
+
+        if callable(filtre):
+            retenus = (self.livres[isbn] for _, isbn in ordre if filtre(self.livres[isbn]))
+        else:
+            retenus = (self.livres[isbn] for _, isbn in ordre if isbn in filtre)
+        page = []
+        total = 0
+        for livre in retenus:
+            if offset <= total and (limit is None or len(page) < limit):
+                page.append(livre)
+            total += 1
+        return total, page
+
+    # Recherche plein texte sur titre, auteur et genre (sans accents, dernier mot en préfixe)
+    # Retourne un nouvel ensemble des ISBN trouvés (partiel pour un préfixe très répandu, voir IndexRecherche)
+    def rechercher(self, requete):
+        if self._recherche is None:
+            self._recherche = IndexRecherche()
+            for livre in self.livres.values():
+                self._recherche.ajouter(livre)
+        return self._recherche.rechercher(requete)
+
+    # Abonne une fonction aux changements : callback(objet, action, cle)
+    # objet vaut "livre" ou "membre", action vaut "ajout", "modification" ou "suppression",
+    # ou "rechargement" (cle None) après une opération en masse.
+    # objet vaut "reservation" (cle : ISBN) pour les files d'attente ; avec l'action "attribution",
+    # quand un retour passe le livre au réservataire suivant, cle est le code-barres de l'exemplaire
+    # attribué (voir emprunteur(code) et livre_de(code))
+    def abonner(self, callback):
+        self._observateurs.append(callback)
+
+    # Désabonne une fonction précédemment abonnée
+    def desabonner(self, callback):
+        if callback in self._observateurs:
+            self._observateurs.remove(callback)
+
+    # Prévient les abonnés qu'un livre ou un membre a changé
+    def _notifier(self, objet, action, cle):
+        self.version += 1
+        for callback in list(self._observateurs):
+            callback(objet, action, cle)
+
+    # Liste complète des actions (date, isbn, id_membre, action), lue au premier accès
+    @property
+    def historique(self):
+        if self._historique is None:
+            self._historique = list(self.stockage.historique())
+        return self._historique
+
+    # Parcourt l'historique en flux, éventuellement limité aux jours entre debut et fin (inclus)
+    def iter_historique(self, debut=None, fin=None):
+        return self.stockage.historique(debut, fin)
+
+    # Enregistre une action dans l'historique, horodatée à la seconde ; le stockage l'écrit avec la mutation
     def _log_action(self, action, isbn, id_membre):
-        date = datetime.now().strftime("%Y-%m-%d")
-        self.historique.append((date, isbn, id_membre, action))
-        with open(self.historique_fichier, "a", newline="", encoding="utf-8") as f:
-            csv.writer(f).writerow([date, isbn, id_membre, action])
+        date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.statistiques.enregistrer_action(date, action)
+        if self._historique is not None:
+            self._historique.append((date, isbn, id_membre, action))
+        return date
+
+    # Rejoue une entrée du journal sur l'état en mémoire (idempotent)
+    def _appliquer_entree(self, op, *donnees):
+        if op == "livre+":
+            if donnees[0][0] in self.livres:
+                self._retirer_livre(donnees[0][0])
+            self._inserer_livre(self.Livre(*donnees[0]))
+        elif op == "livre-":
+            if donnees[0] in self.livres:
+                self._retirer_livre(donnees[0])
+            self._oublier_exemplaires(donnees[0])
+            self.reservations.retirer_livre(donnees[0])
+        elif op == "exemplaire+":
+            if donnees[0][0] not in self.exemplaires and donnees[0][1] in self.livres:
+                self._attacher_exemplaire(self.Exemplaire(*donnees[0]))
+        elif op == "exemplaire-":
+            if donnees[0] in self.exemplaires:
+                self._detacher_exemplaire(donnees[0])
+        elif op == "membre+":
+            self.membres[donnees[0][0]] = self.Membre(*donnees[0])
+        elif op == "membre-":
+            membre = self.membres.pop(donnees[0], None)
+            if membre is not None:
+                for isbn in membre.livres_empruntes:
+                    self.emprunts.pop(isbn, None)
+                    self.prets.retirer(isbn)
+            self.reservations.retirer_membre(donnees[0])
+        elif op == "reservation+":
+            self.reservations.ajouter(*donnees)
+        elif op == "reservation-":
+            self.reservations.retirer(*donnees)
+        elif op == "renouvellement":
+            if donnees[0] in self.prets:
+                self.prets.prolonger(*donnees)
+        elif op in ("emprunt", "retour"):
+            # Entrées (isbn, id_membre[, date[, échéance], code-barres]) : les anciens journaux n'ont
+            # ni échéance ni code-barres (exemplaire implicite)
+            isbn, id_membre = donnees[0], donnees[1]
+            code = donnees[4 if op == "emprunt" else 3] if len(donnees) > (4 if op == "emprunt" else 3) else isbn
+            if isbn in self.livres:
+                if op == "emprunt":
+                    self._sortir_exemplaire(isbn, code if code in self.exemplaires else None)
+                else:
+                    self._rentrer_exemplaire(isbn, code)
+            if len(donnees) > 2:
+                # Entrée écrite par un autre processus : l'historique a déjà été écrit par celui-ci
+                self.statistiques.enregistrer_action(donnees[2], op)
+                if self._historique is not None:
+                    self._historique.append((donnees[2], isbn, id_membre, op))
+            membre = self.membres.get(id_membre)
+            if membre is not None:
+                if op == "emprunt":
+                    membre.livres_empruntes.add(code)
+                    self.emprunts[code] = id_membre
+                    self.reservations.retirer(isbn, id_membre)
+                    if len(donnees) > 2:
+                        self.prets.ajouter(Pret(isbn, id_membre, *donnees[2:4], code=code))
+                else:
+                    membre.livres_empruntes.discard(code)
+                    self.emprunts.pop(code, None)
+                    self.prets.retirer(code)
+
+    # Replie le journal dans les fichiers instantanés (stockage texte journalisé), avec les agrégats statistiques
+    def compacter(self):
+        with self._transaction("compacter"):
+            self.stockage.compacter()
 
-    # Sauvegarde des livres et membres dans les fichiers
+    # Sauvegarde des livres et membres via le moteur de stockage, et des agrégats statistiques
     def sauvegarder(self):
-        with open(self.livres_fichier, "w", encoding="utf-8") as f:
-            for livre in self.livres.values():
-                ligne = ";".join([livre.isbn, livre.titre, livre.auteur, livre.annee, livre.genre, livre.statut])
-                f.write(ligne + "\n")
+        with self._transaction("sauvegarder"):
+            self.stockage.sauvegarder()
+            self._sauvegarder_statistiques()
 
-        with open(self.membres_fichier, "w", encoding="utf-8") as f:
-            for membre in self.membres.values():
-                emprunts = ",".join(membre.livres_empruntes)
-                ligne = f"{membre.id_membre};{membre.nom};{emprunts}"
-                f.write(ligne + "\n")
+    # Écrit les compteurs journaliers avec la signature de l'historique qu'ils résument
+    def _sauvegarder_statistiques(self):
+        self.statistiques.sauvegarder(self.statistiques_fichier, self.stockage.signature_historique())
 
-    # Charge les données depuis les fichiers
-    def charger(self):
-        # Charger les livres
-        try:
-            with open(self.livres_fichier, "r", encoding="utf-8") as f:
-                for ligne in f:
-                    parts = ligne.strip().split(";")
-                    if len(parts) == 6:
-                        isbn, titre, auteur, annee, genre, statut = parts
-                        self.livres[isbn] = self.Livre(isbn, titre, auteur, annee, genre, statut)
-        except FileNotFoundError:
-            pass
+    # Section critique d'une opération : verrou du processus, puis en mode partagé verrou
+    # inter-processus et rattrapage des écritures des autres processus.
+    # Les temps d'attente et de détention sont mesurés par opération (voir statistiques_verrou)
+    @contextmanager
+    def _transaction(self, operation):
+        debut = time.perf_counter()
+        with self.verrou:
+            if not self.partage:
+                acquis = time.perf_counter()
+                try:
+                    yield
+                finally:
+                    self._mesurer_verrou(operation, acquis - debut, time.perf_counter() - acquis)
+                return
+            with self.stockage.verrou_processus():
+                acquis = time.perf_counter()
+                try:
+                    self.stockage.rafraichir()
+                    yield
+                finally:
+                    self._mesurer_verrou(operation, acquis - debut, time.perf_counter() - acquis)
 
-        # Charger les membres
-        try:
-            with open(self.membres_fichier, "r", encoding="utf-8") as f:
-                for ligne in f:
-                    parts = ligne.strip().split(";")
-                    if len(parts) >= 2:
-                        id_m, nom = parts[0], parts[1]
-                        emprunts = parts[2].split(",") if len(parts) > 2 and parts[2] else []
-                        membre = self.Membre(id_m, nom)
-                        membre.livres_empruntes = emprunts
-                        self.membres[id_m] = membre
-        except FileNotFoundError:
-            pass
+    def _mesurer_verrou(self, operation, attente, detention):
+        mesure = self.mesures_verrou.setdefault(operation, [0, 0.0, 0.0, 0.0])
+        mesure[0] += 1
+        mesure[1] += attente
+        mesure[2] += detention
+        mesure[3] = max(mesure[3], detention)
 
-        # Charger l'historique
-        try:
-            with open(self.historique_fichier, "r", encoding="utf-8") as f:
-                reader = csv.reader(f)
-                self.historique = [tuple(row) for row in reader if len(row) == 4]
-        except FileNotFoundError:
+    # Résumé des mesures du verrou par opération (durées en millisecondes)
+    def statistiques_verrou(self):
+        return {
+            operation: {
+                "nombre": nombre,
+                "attente_moyenne_ms": 1000 * attente / nombre,
+                "detention_moyenne_ms": 1000 * detention / nombre,
+                "detention_max_ms": 1000 * detention_max,
+            }
+            for operation, (nombre, attente, detention, detention_max) in self.mesures_verrou.items()
+        }
+
+    # Prend en compte les modifications écrites par d'autres processus (mode partagé)
+    def synchroniser(self):
+        with self._transaction("synchroniser"):
             pass
+
+    # Recharge tout l'état depuis le stockage (un autre processus a réécrit les instantanés)
+    def _recharger(self):
+        self.charger()
+        self._notifier("livre", "rechargement", None)
+        self._notifier("membre", "rechargement", None)
+
+    # Charge les données depuis le moteur de stockage
+    # (en mode partagé, sous le verrou inter-processus pour ne pas lire un état à moitié écrit)
+    def charger(self):
+        with self.verrou, (self.stockage.verrou_processus() if self.partage else nullcontext()):
+            self._charger()
+
+    def _charger(self):
+        self.version += 1
+        if isinstance(self.livres, LivresMappes):
+            self.livres.instantane.fermer()  # Rechargement : projection et fichier de l'instantané précédent
+        self.livres = {}
+        self.membres = {}
+        self._index_tri = {}
+        self._isbn_disponibles = None
+        self._recherche = None
+        self.prets = Echeancier()
+        self.reservations = FilesAttente()
+        self.exemplaires, self._codes_livre, self._libres = {}, {}, {}
+        self.stockage.charger()
+
+        # Reconstruire l'index inverse exemplaire -> membre
+        self.emprunts = {}
+        for membre in self.membres.values():
+            for isbn in membre.livres_empruntes:
+                self.emprunts[isbn] = membre.id_membre
+        self._completer_prets()
+
+        # L'historique n'est plus chargé ici : il est lu en flux à la demande
+        self._historique = None
+
+        # Agrégats : compteurs du catalogue remplis par le stockage, compteurs journaliers relus puis
+        # complétés des seules entrées ajoutées à l'historique depuis leur sauvegarde
+        # (reconstruits en un seul parcours si l'historique a été réécrit)
+        signature = self.stockage.signature_historique()
+        sauvee = self.statistiques.charger(self.statistiques_fichier)
+        if sauvee != signature:
+            suite = self.stockage.historique_depuis(sauvee) if sauvee is not None else None
+            if suite is None:
+                self.statistiques.reconstruire_historique(self.stockage.historique())
+            else:
+                for entree in suite:
+                    self.statistiques.enregistrer_action(entree[0], entree[3])
+            self.statistiques.sauvegarder(self.statistiques_fichier, signature)
+
+
+    # Aligne les prêts sur les emprunts en cours. Les données écrites avant l'existence des prêts
+    # n'en ont pas : leur date d'emprunt est retrouvée en un seul parcours de l'historique
+    def _completer_prets(self):
+        for pret in list(self.prets.values()):
+            if self.emprunts.get(pret.code) != pret.id_membre:
+                self.prets.retirer(pret.code)
+        manquants = {code: id_membre for code, id_membre in self.emprunts.items() if code not in self.prets}
+        if not manquants:
+            return
+        dates = {}
+        for date, isbn, id_membre, action in self.stockage.historique():
+            if action == "emprunt" and manquants.get(isbn) == id_membre:
+                dates[isbn] = date
+        aujourd_hui = datetime.now().strftime(FORMAT_DATE)
+        for isbn, id_membre in manquants.items():
+            date = dates.get(isbn, aujourd_hui)
+            if len(date) == 10:
+                date += " 00:00:00"  # Entrées d'historique datées au jour
+            self.prets.ajouter(Pret(self.livre_de(isbn), id_membre, date, code=isbn))
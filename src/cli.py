@@ -0,0 +1,203 @@
+import os
+import sys
+import csv
+import json
+import argparse
+from src.audit import Audit
+from src.bibliotheque import Bibliotheque
+from src.stockage import StockageSQLite
+
+# Colonnes des fichiers d'import / export
+CHAMPS_LIVRES = ["isbn", "titre", "auteur", "annee", "genre", "statut"]
+CHAMPS_MEMBRES = ["id_membre", "nom", "livres_empruntes"]
+CHAMPS_RETARDS = ["isbn", "code", "titre", "id_membre", "nom", "date_emprunt", "echeance", "jours_de_retard"]
+
+
+# Devine le format d'après l'extension du fichier
+def format_fichier(chemin, format_demande=None):
+    if format_demande:
+        return format_demande
+    extension = os.path.splitext(chemin)[1].lower()
+    return {".csv": "csv", ".jsonl": "jsonl", ".json": "json"}.get(extension, "csv")
+
+
+# Parcourt les enregistrements d'un fichier sous forme de dictionnaires
+# CSV et JSON Lines sont lus en flux ; le JSON (forme de src/data/livres.json) est lu d'un bloc
+def lire_enregistrements(chemin, fmt):
+    with open(chemin, "r", encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            yield from csv.DictReader(f)
+        elif fmt == "jsonl":
+            for ligne in f:
+                if ligne.strip():
+                    try:
+                        yield json.loads(ligne)
+                    except json.JSONDecodeError as e:
+                        yield ValueError(f"JSON invalide : {e}")
+        else:
+            contenu = json.load(f)
+            yield from (contenu.values() if isinstance(contenu, dict) else contenu)
+
+
+# Texte d'un champ d'enregistrement ; "" s'il est absent ou vide (null en JSON)
+def champ_texte(enregistrement, *cles):
+    for cle in cles:
+        valeur = enregistrement.get(cle)
+        if valeur is not None:
+            return str(valeur).strip()
+    return ""
+
+
+# Convertit un enregistrement en Livre ; les livres importés sont toujours disponibles
+def livre_depuis_enregistrement(enregistrement):
+    if isinstance(enregistrement, Exception):
+        return enregistrement
+    try:
+        isbn, titre = champ_texte(enregistrement, "isbn"), champ_texte(enregistrement, "titre")
+        if not isbn or not titre:
+            return ValueError("Champ manquant ou invalide : ISBN et titre obligatoires.")
+        return Bibliotheque.Livre(
+            isbn, titre,
+            champ_texte(enregistrement, "auteur"),
+            champ_texte(enregistrement, "annee", "année"),
+            champ_texte(enregistrement, "genre"),
+        )
+    except (TypeError, AttributeError) as e:
+        return ValueError(f"Champ manquant ou invalide : {e}")
+
+
+def membre_depuis_enregistrement(enregistrement):
+    if isinstance(enregistrement, Exception):
+        return enregistrement
+    try:
+        return Bibliotheque.Membre(champ_texte(enregistrement, "id_membre", "id"), champ_texte(enregistrement, "nom"))
+    except (TypeError, AttributeError) as e:
+        return ValueError(f"Enregistrement invalide : {e}")
+
+
+def livre_vers_enregistrement(biblio, livre):
+    emprunteur = biblio.emprunteur(livre.isbn)
+    return {
+        "isbn": livre.isbn, "titre": livre.titre, "auteur": livre.auteur, "annee": livre.annee_texte,
+        "genre": livre.genre, "statut": livre.statut,
+        "emprunte_par": emprunteur.id_membre if emprunteur is not None else "",
+        "exemplaires": livre.exemplaires, "disponibles": livre.disponibles,
+    }
+
+
+def membre_vers_enregistrement(membre):
+    return {"id_membre": membre.id_membre, "nom": membre.nom,
+            "livres_empruntes": ",".join(sorted(membre.livres_empruntes))}
+
+
+# Écrit les enregistrements en flux (CSV, JSON Lines) ou en un objet indexé par clé (JSON)
+def ecrire_enregistrements(chemin, fmt, enregistrements, champs, cle):
+    with open(chemin, "w", encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            writer = csv.DictWriter(f, fieldnames=champs, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(enregistrements)
+        elif fmt == "jsonl":
+            for enregistrement in enregistrements:
+                f.write(json.dumps(enregistrement, ensure_ascii=False) + "\n")
+        else:
+            json.dump({e[cle]: e for e in enregistrements}, f, ensure_ascii=False, indent=2)
+
+
+def importer(biblio, quoi, chemin, fmt):
+    enregistrements = lire_enregistrements(chemin, fmt)
+    if quoi == "livres":
+        return biblio.ajouter_livres(livre_depuis_enregistrement(e) for e in enregistrements)
+    return biblio.enregistrer_membres(membre_depuis_enregistrement(e) for e in enregistrements)
+
+
+def exporter(biblio, quoi, chemin, fmt):
+    if quoi == "livres":
+        enregistrements = (livre_vers_enregistrement(biblio, livre) for livre in biblio.livres.values())
+        ecrire_enregistrements(chemin, fmt, enregistrements, CHAMPS_LIVRES + ["emprunte_par", "exemplaires", "disponibles"],
+                               "isbn")
+        return len(biblio.livres)
+    enregistrements = (membre_vers_enregistrement(membre) for membre in biblio.membres.values())
+    ecrire_enregistrements(chemin, fmt, enregistrements, CHAMPS_MEMBRES, "id_membre")
+    return len(biblio.membres)
+
+
+# Lignes du rapport des retards (prêts en retard à la date donnée, le plus ancien d'abord)
+def retards_vers_enregistrements(biblio, date=None):
+    for pret, livre, membre, jours in biblio.rapport_retards(date):
+        yield {
+            "isbn": pret.isbn, "code": pret.code, "titre": livre.titre if livre is not None else "",
+            "id_membre": pret.id_membre, "nom": membre.nom if membre is not None else "",
+            "date_emprunt": pret.date_emprunt, "echeance": pret.echeance, "jours_de_retard": jours,
+        }
+
+
+def creer_bibliotheque(args):
+    stockage = StockageSQLite(args.sqlite) if args.sqlite else None
+    biblio = Bibliotheque(journalise=True, stockage=stockage, data_dir=args.data_dir, partage=True)
+    biblio.charger()
+    return biblio
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gestion de bibliothèque en ligne de commande (sans interface Tk).")
+    parser.add_argument("--data-dir", default=None, help="dossier des données (par défaut data/)")
+    parser.add_argument("--sqlite", default=None, help="utiliser cette base SQLite au lieu des fichiers texte")
+    sous = parser.add_subparsers(dest="commande", required=True)
+    for commande in ("importer", "exporter"):
+        p = sous.add_parser(commande)
+        p.add_argument("quoi", choices=["livres", "membres"])
+        p.add_argument("fichier")
+        p.add_argument("--format", choices=["csv", "jsonl", "json"], default=None)
+    p = sous.add_parser("retards", help="rapport des prêts en retard")
+    p.add_argument("fichier", nargs="?", default=None, help="fichier du rapport (CSV sur la sortie standard sinon)")
+    p.add_argument("--date", default=None, help="date de référence AAAA-MM-JJ HH:MM:SS (maintenant par défaut)")
+    p.add_argument("--format", choices=["csv", "jsonl", "json"], default=None)
+    p = sous.add_parser("audit", help="emprunts en cours à une date passée, depuis l'historique")
+    p.add_argument("quoi", choices=["inventaire", "livre", "membre", "points"])
+    p.add_argument("cle", nargs="?", default=None, help="ISBN (livre) ou ID du membre (membre)")
+    p.add_argument("--date", default=None, help="date AAAA-MM-JJ (fin du jour) ou AAAA-MM-JJ HH:MM:SS")
+    args = parser.parse_args(argv)
+    if args.commande == "audit" and args.quoi in ("livre", "membre") and args.cle is None:
+        parser.error(f"audit {args.quoi} : ISBN ou ID du membre manquant")
+
+    biblio = creer_bibliotheque(args)
+    if args.commande == "audit":
+        audit = Audit(biblio)
+        if args.quoi == "points":
+            resultat = audit.mettre_a_jour()
+        elif args.quoi == "livre":
+            resultat = audit.detenteurs(args.cle, args.date)
+        elif args.quoi == "membre":
+            resultat = audit.emprunts_membre(args.cle, args.date)
+        else:
+            resultat = audit.inventaire(args.date)
+        print(json.dumps(resultat, ensure_ascii=False, indent=2))
+        return 0
+    if args.commande == "retards":
+        enregistrements = retards_vers_enregistrements(biblio, args.date)
+        if args.fichier is None:
+            writer = csv.DictWriter(sys.stdout, fieldnames=CHAMPS_RETARDS)
+            writer.writeheader()
+            writer.writerows(enregistrements)
+        else:
+            ecrire_enregistrements(args.fichier, format_fichier(args.fichier, args.format), enregistrements,
+                                   CHAMPS_RETARDS, "isbn")
+        return 0
+
+    fmt = format_fichier(args.fichier, args.format)
+    if args.commande == "importer":
+        erreurs = importer(biblio, args.quoi, args.fichier, fmt)
+        for numero, message in erreurs:
+            print(f"ligne {numero} : {message}", file=sys.stderr)
+        biblio.sauvegarder()
+        print(f"Import terminé ({len(erreurs)} erreur(s)).")
+        return 1 if erreurs else 0
+
+    nombre = exporter(biblio, args.quoi, args.fichier, fmt)
+    print(f"{nombre} {args.quoi} exporté(s) vers {args.fichier}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
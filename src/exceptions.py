@@ -15,3 +15,7 @@ class MembreInexistantError(Exception):
 # Exception levée lorsqu’on tente d’effectuer une opération sur un livre introuvable
 class LivreInexistantError(Exception):
     pass
+
+# Exception levée lorsqu’un membre ayant un emprunt en retard tente d’emprunter ou de renouveler
+class PretEnRetardError(QuotaEmpruntDepasseError):
+    pass
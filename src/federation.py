@@ -0,0 +1,325 @@
+import os
+import sys
+import json
+import zlib
+import heapq
+import argparse
+import threading
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from src.bibliotheque import Bibliotheque
+from src.cli import livre_vers_enregistrement, livre_depuis_enregistrement
+from src.exceptions import MembreInexistantError
+
+# Requêtes exécutées sur une branche, dans le processus de la fédération ou dans celui de la branche :
+# fonctions du module désignées par leur nom, qui ne renvoient que des données simples (sérialisables)
+
+
+def _charger(biblio):
+    biblio.charger()
+    return len(biblio.livres)
+
+
+def _rechercher(biblio, requete, limite):
+    with biblio.verrou:
+        filtre = biblio.rechercher(requete) if requete.strip() else None
+        total, page = biblio.livres_page(0, limite, "isbn", filtre=filtre)
+        return total, [livre_vers_enregistrement(biblio, livre) for livre in page]
+
+
+def _disponibilite(biblio, isbn):
+    with biblio.verrou:
+        livre = biblio.livres.get(isbn)
+        if livre is None:
+            return None
+        return {"exemplaires": livre.exemplaires, "disponibles": livre.disponibles,
+                "reservations": len(biblio.reservations.file(isbn))}
+
+
+def _membre(biblio, id_membre):
+    with biblio.verrou:
+        membre = biblio.membres.get(id_membre)
+        if membre is None:
+            return None
+        return {"id_membre": membre.id_membre, "nom": membre.nom,
+                "emprunts": [{"code": pret.code, "isbn": pret.isbn, "echeance": pret.echeance}
+                             for pret in (biblio.prets.get(code) for code in sorted(membre.livres_empruntes)) if pret],
+                "reservations": [{"isbn": isbn, "rang": rang} for isbn, rang in biblio.reservations_membre(id_membre)]}
+
+
+def _statistiques(biblio, jours):
+    with biblio.verrou:
+        stats = biblio.statistiques
+        fin = datetime.now().date()
+        dates, valeurs = stats.emprunts_par_jour(fin - timedelta(days=jours), fin)
+        return {
+            "livres": len(biblio.livres),
+            "membres": len(biblio.membres),
+            "emprunts_en_cours": len(biblio.prets),
+            "retards": len(biblio.prets.en_retard()),
+            "genres": dict(stats.par_genre),
+            "auteurs": dict(stats.par_auteur),
+            "emprunts_par_jour": {date.strftime("%Y-%m-%d"): valeur for date, valeur in zip(dates, valeurs)},
+        }
+
+
+def _ajouter_livre(biblio, enregistrement):
+    livre = livre_depuis_enregistrement(enregistrement)
+    if isinstance(livre, Exception):
+        raise livre
+    biblio.ajouter_livre(livre)
+    return livre_vers_enregistrement(biblio, livre)
+
+
+def _enregistrer_membre(biblio, id_membre, nom):
+    biblio.enregistrer_membre(Bibliotheque.Membre(id_membre, nom))
+
+
+def _sauvegarder(biblio):
+    biblio.sauvegarder()
+
+
+REQUETES = {fonction.__name__[1:]: fonction for fonction in (
+    _charger, _rechercher, _disponibilite, _membre, _statistiques, _ajouter_livre, _enregistrer_membre, _sauvegarder
+)}
+
+
+class BrancheLocale:
+    """Branche servie dans le processus de la fédération (sa Bibliotheque est protégée par son verrou)."""
+
+    def __init__(self, nom, data_dir, options):
+        self.nom = nom
+        self.biblio = Bibliotheque(data_dir=data_dir, **options)
+
+    def appeler(self, requete, *args):
+        return REQUETES[requete](self.biblio, *args)
+
+    def fermer(self):
+        self.biblio.stockage.fermer()
+
+
+# Boucle du processus d'une branche : exécute les requêtes reçues une à une jusqu'à None
+# (une branche qui n'a pas pu être ouverte renvoie l'erreur à chaque requête)
+def _servir_branche(connexion, data_dir, options):
+    biblio, erreur = None, None
+    try:
+        biblio = Bibliotheque(data_dir=data_dir, **options)
+    except Exception as e:
+        erreur = e
+    while True:
+        message = connexion.recv()
+        if message is None:
+            break
+        requete, args = message
+        try:
+            if erreur is not None:
+                raise erreur
+            connexion.send((True, REQUETES[requete](biblio, *args)))
+        except Exception as e:
+            connexion.send((False, e))
+    if biblio is not None:
+        biblio.stockage.fermer()
+    connexion.close()
+
+
+class BrancheProcessus:
+    """
+    Branche servie par son propre processus : ses données ne sont chargées que là,
+    seules les requêtes et leurs résultats traversent le tube.
+    """
+
+    def __init__(self, nom, data_dir, options):
+        self.nom = nom
+        contexte = multiprocessing.get_context("spawn")  # Pas de fork d'un processus qui a des threads
+        self._connexion, distante = contexte.Pipe()
+        self._processus = contexte.Process(target=_servir_branche, args=(distante, data_dir, options),
+                                           name=f"branche-{nom}", daemon=True)
+        self._processus.start()
+        distante.close()
+        self._verrou = threading.Lock()  # Une requête à la fois dans le tube
+
+    def appeler(self, requete, *args):
+        with self._verrou:
+            self._connexion.send((requete, args))
+            reussite, resultat = self._connexion.recv()
+        if not reussite:
+            raise resultat
+        return resultat
+
+    def fermer(self):
+        with self._verrou:
+            self._connexion.send(None)
+            self._connexion.close()
+        self._processus.join()
+
+
+# Poids d'une clé pour une branche (hachage de rendez-vous)
+def _poids(branche, cle):
+    return zlib.crc32(f"{branche}\0{cle}".encode("utf-8"))
+
+
+class Federation:
+    """
+    Catalogues de plusieurs branches interrogés ensemble, chaque branche gardant son dossier de données
+    et sa Bibliotheque. Les recherches, les disponibilités et les statistiques sont envoyées à toutes
+    les branches en parallèle (un thread par branche) puis fusionnées ; un membre ou un nouveau livre
+    est rangé dans la branche désignée par le hachage de rendez-vous de son ID ou de son ISBN :
+    toujours la même tant que la liste des branches ne change pas, et ajouter une branche ne déplace
+    qu'une clé sur N.
+    Avec processus=True, chaque branche vit dans son propre processus : aucun processus ne charge
+    les données de toutes les branches, et les requêtes s'exécutent vraiment en parallèle.
+    """
+
+    def __init__(self, dossiers, processus=False, **options):
+        """
+        :param dossiers: {nom de branche: dossier de données}
+        :param options: options de chaque Bibliotheque (par défaut journalise=True, comme la ligne de commande)
+        """
+        if not dossiers:
+            raise ValueError("Aucune branche.")
+        options.setdefault("journalise", True)
+        classe = BrancheProcessus if processus else BrancheLocale
+        self.branches = {nom: classe(nom, dossier, options) for nom, dossier in sorted(dossiers.items())}
+        self._executeur = ThreadPoolExecutor(max_workers=len(self.branches), thread_name_prefix="federation")
+        self._verrou_membres = threading.Lock()  # Vérification puis inscription d'un ID, d'un seul tenant
+        self.diffuser("charger")
+
+    # Une branche par sous-dossier de racine, nommée comme lui
+    @classmethod
+    def depuis_racine(cls, racine, processus=False, **options):
+        dossiers = {nom: os.path.join(racine, nom) for nom in os.listdir(racine)
+                    if os.path.isdir(os.path.join(racine, nom))}
+        return cls(dossiers, processus, **options)
+
+    # Branche attitrée d'un ID membre ou d'un ISBN
+    def branche_de(self, cle):
+        return max(self.branches, key=lambda nom: (_poids(nom, cle), nom))
+
+    # Exécute une requête sur toutes les branches en parallèle : {nom: résultat}
+    def diffuser(self, requete, *args):
+        futurs = {nom: self._executeur.submit(branche.appeler, requete, *args) for nom, branche in self.branches.items()}
+        return {nom: futur.result() for nom, futur in futurs.items()}
+
+    def rechercher(self, requete, limite=50):
+        """
+        Recherche plein texte dans toutes les branches (tout le catalogue si requete est vide).
+        :return: (nombre total de livres trouvés, les limite premiers par ISBN sans tenir compte de la casse
+                  puis branche, chacun avec le nom de sa branche)
+        """
+        resultats = self.diffuser("rechercher", requete, limite)
+        pages = [[dict(livre, branche=nom) for livre in page] for nom, (_, page) in resultats.items()]
+        # Même clé que le tri des branches (Bibliotheque._valeur_tri) : sinon la fusion de pages triées
+        # sans tenir compte de la casse ne serait plus triée
+        fusion = heapq.merge(*pages, key=lambda livre: (livre["isbn"].casefold(), livre["isbn"], livre["branche"]))
+        return sum(total for total, _ in resultats.values()), [livre for _, livre in zip(range(limite), fusion)]
+
+    # Exemplaires d'un livre dans chaque branche qui l'a : {branche: {"exemplaires", "disponibles", "reservations"}}
+    def disponibilite(self, isbn):
+        return {nom: etat for nom, etat in self.diffuser("disponibilite", isbn).items() if etat is not None}
+
+    # Branches où le livre peut être emprunté tout de suite
+    def branches_disponibles(self, isbn):
+        return [nom for nom, etat in self.disponibilite(isbn).items() if etat["disponibles"]]
+
+    def membre(self, id_membre):
+        """
+        Fiche d'un membre (emprunts et réservations), demandée à sa branche attitrée ;
+        un membre inscrit ailleurs avant la fédération est cherché dans toutes les branches.
+        :return: fiche avec le nom de la branche
+        """
+        attitree = self.branche_de(id_membre)
+        fiche = self.branches[attitree].appeler("membre", id_membre)
+        if fiche is not None:
+            return dict(fiche, branche=attitree)
+        for nom, fiche in self.diffuser("membre", id_membre).items():
+            if fiche is not None:
+                return dict(fiche, branche=nom)
+        raise MembreInexistantError("Membre inexistant.")
+
+    # Inscrit un membre dans sa branche attitrée, l'ID devant être libre dans toutes les branches ;
+    # retourne le nom de la branche
+    def enregistrer_membre(self, id_membre, nom, branche=None):
+        branche = branche or self.branche_de(id_membre)
+        with self._verrou_membres:
+            if any(fiche is not None for fiche in self.diffuser("membre", id_membre).values()):
+                raise ValueError("Membre déjà existant.")
+            self.branches[branche].appeler("enregistrer_membre", id_membre, nom)
+        return branche
+
+    # Ajoute un livre (enregistrement comme en import) à une branche, par défaut celle de son ISBN
+    def ajouter_livre(self, enregistrement, branche=None):
+        branche = branche or self.branche_de(str(enregistrement.get("isbn", "")).strip())
+        return dict(self.branches[branche].appeler("ajouter_livre", enregistrement), branche=branche)
+
+    def statistiques(self, jours=30, n_auteurs=10):
+        """
+        Statistiques de l'ensemble des branches, additionnées à partir des compteurs de chacune
+        (aucune branche n'envoie ses livres ni son historique).
+        :return: totaux, genres, top auteurs, emprunts par jour et détail par branche
+        """
+        par_branche = self.diffuser("statistiques", jours)
+        genres, auteurs, par_jour = Counter(), Counter(), Counter()
+        for stats in par_branche.values():
+            genres.update(stats["genres"])
+            auteurs.update(stats["auteurs"])
+            par_jour.update(stats["emprunts_par_jour"])
+        totaux = {cle: sum(stats[cle] for stats in par_branche.values())
+                  for cle in ("livres", "membres", "emprunts_en_cours", "retards")}
+        return dict(
+            totaux,
+            genres=dict(genres),
+            top_auteurs=auteurs.most_common(n_auteurs),
+            emprunts_par_jour=dict(sorted(par_jour.items())),
+            branches={nom: {cle: stats[cle] for cle in totaux} for nom, stats in par_branche.items()},
+        )
+
+    def sauvegarder(self):
+        self.diffuser("sauvegarder")
+
+    def fermer(self):
+        self._executeur.shutdown()
+        for branche in self.branches.values():
+            branche.fermer()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Interroge ensemble les catalogues de plusieurs branches.")
+    parser.add_argument("racine", help="dossier contenant un sous-dossier de données par branche")
+    parser.add_argument("--processus", action="store_true", help="un processus par branche")
+    sous = parser.add_subparsers(dest="commande", required=True)
+    p = sous.add_parser("rechercher")
+    p.add_argument("requete")
+    p.add_argument("--limite", type=int, default=50)
+    sous.add_parser("disponibilite").add_argument("isbn")
+    sous.add_parser("membre").add_argument("id_membre")
+    sous.add_parser("branche", help="branche attitrée d'un ISBN ou d'un ID membre").add_argument("cle")
+    sous.add_parser("stats")
+    args = parser.parse_args(argv)
+
+    federation = Federation.depuis_racine(args.racine, args.processus)
+    try:
+        if args.commande == "rechercher":
+            total, livres = federation.rechercher(args.requete, args.limite)
+            resultat = {"total": total, "livres": livres}
+        elif args.commande == "disponibilite":
+            resultat = federation.disponibilite(args.isbn)
+        elif args.commande == "membre":
+            try:
+                resultat = federation.membre(args.id_membre)
+            except MembreInexistantError as e:
+                print(e, file=sys.stderr)
+                return 1
+        elif args.commande == "branche":
+            resultat = {"cle": args.cle, "branche": federation.branche_de(args.cle)}
+        else:
+            resultat = federation.statistiques()
+        print(json.dumps(resultat, ensure_ascii=False, indent=2))
+    finally:
+        federation.fermer()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,379 @@
+import os
+import sys
+import mmap
+import json
+import zlib
+import struct
+import heapq
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from collections.abc import MutableMapping, ValuesView
+
+# Format de livres.bin (petit-boutiste) :
+#   en-tête | enregistrements | positions des chaînes | chaînes UTF-8 | table de hachage | résumé JSON
+# Les enregistrements sont rangés par ISBN : leur ordre est aussi celui de l'index trié par ISBN.
+MAGIQUE = b"BIBLIO\x00\x02"
+ENTETE = struct.Struct("<8sQqIIQQQQQQ")
+# isbn, titre, auteur, genre (numéros de chaîne), année, emprunté
+ENREGISTREMENT = struct.Struct("<IIIIiB3x")
+ANNEE_INCONNUE = -2 ** 31
+ANNEE_TEXTE = -2 ** 31 + 1  # Année non entière (ou hors 32 bits) : son texte est la chaîne qui suit le titre
+VIDE = -1
+
+
+def _hachage(isbn_octets):
+    return zlib.crc32(isbn_octets)
+
+
+# Identité du fichier texte dont l'instantané binaire est la copie : (taille, date de modification)
+def signature_source(chemin):
+    infos = os.stat(chemin)
+    return infos.st_size, infos.st_mtime_ns
+
+
+def ecrire_instantane(chemin, livres, source):
+    """
+    Écrit l'instantané binaire des livres, via un fichier temporaire renommé à la fin.
+    :param chemin: fichier à écrire (livres.bin)
+    :param livres: livres du catalogue
+    :param source: signature (taille, date) du livres.txt écrit en même temps
+    """
+    livres = sorted(livres, key=lambda livre: (livre.isbn.casefold(), livre.isbn))
+    positions = array("I", [0])
+    chaines = bytearray()
+    numeros = {}  # auteurs et genres, stockés une seule fois
+
+    def chaine(texte, partagee=False):
+        if partagee and texte in numeros:
+            return numeros[texte]
+        chaines.extend(texte.encode("utf-8"))
+        positions.append(len(chaines))
+        numero = len(positions) - 2
+        if partagee:
+            numeros[texte] = numero
+        return numero
+
+    enregistrements = bytearray(ENREGISTREMENT.size * len(livres))
+    taille_table = 1 << max(4, (2 * len(livres)).bit_length())
+    table = array("i", [VIDE]) * taille_table
+    par_genre, par_auteur = Counter(), Counter()
+    for numero, livre in enumerate(livres):
+        isbn, titre = chaine(livre.isbn), chaine(livre.titre)
+        if livre.annee is None:
+            annee = ANNEE_INCONNUE
+        elif isinstance(livre.annee, int) and ANNEE_TEXTE < livre.annee < 2 ** 31:
+            annee = livre.annee
+        else:
+            annee = ANNEE_TEXTE
+            chaine(livre.annee_texte)
+        ENREGISTREMENT.pack_into(
+            enregistrements, numero * ENREGISTREMENT.size,
+            isbn, titre, chaine(livre.auteur, True), chaine(livre.genre, True), annee, livre.statut == "emprunte"
+        )
+        case = _hachage(livre.isbn.encode("utf-8")) & (taille_table - 1)
+        while table[case] != VIDE:
+            case = (case + 1) & (taille_table - 1)
+        table[case] = numero
+        par_genre[livre.genre] += 1
+        par_auteur[livre.auteur] += 1
+    if sys.byteorder != "little":
+        positions.byteswap()
+        table.byteswap()
+    resume = json.dumps({"par_genre": par_genre, "par_auteur": par_auteur}, ensure_ascii=False).encode("utf-8")
+
+    debut_enregistrements = ENTETE.size
+    debut_positions = debut_enregistrements + len(enregistrements)
+    debut_chaines = debut_positions + positions.itemsize * len(positions)
+    debut_table = debut_chaines + len(chaines)
+    debut_resume = debut_table + table.itemsize * len(table)
+    temporaire = chemin + ".tmp"
+    with open(temporaire, "wb") as f:
+        f.write(ENTETE.pack(MAGIQUE, source[0], source[1], len(livres), taille_table, debut_enregistrements,
+                            debut_positions, debut_chaines, debut_table, debut_resume, len(resume)))
+        f.write(enregistrements)
+        positions.tofile(f)
+        f.write(chaines)
+        table.tofile(f)
+        f.write(resume)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporaire, chemin)
+
+
+class Instantane:
+    """
+    Lecture d'un livres.bin projeté en mémoire (mmap) : rien n'est décodé à l'ouverture,
+    chaque livre est reconstruit à la demande à partir de son enregistrement.
+    """
+
+    def __init__(self, fichier, carte, entete):
+        (_, _, _, self.nombre, self._taille_table, self._debut_enregistrements, debut_positions,
+         self._debut_chaines, debut_table, debut_resume, taille_resume) = entete
+        self._fichier = fichier
+        self._carte = carte
+        self._vue = memoryview(carte)
+        self._positions = self._vue[debut_positions:self._debut_chaines].cast("I")
+        self._table = self._vue[debut_table:debut_table + 4 * self._taille_table].cast("i")
+        self._debut_resume, self._taille_resume = debut_resume, taille_resume
+        self._partagees = {}  # numéro -> auteur ou genre déjà décodé
+
+    @classmethod
+    def ouvrir(cls, chemin, source):
+        """
+        Projette livres.bin en mémoire ; retourne None s'il est absent, illisible
+        ou s'il ne correspond plus au livres.txt de signature source.
+        """
+        if sys.byteorder != "little":
+            return None
+        try:
+            fichier = open(chemin, "rb")
+        except FileNotFoundError:
+            return None
+        try:
+            entete = ENTETE.unpack(fichier.read(ENTETE.size))
+            if entete[0] != MAGIQUE or (entete[1], entete[2]) != tuple(source):
+                fichier.close()
+                return None
+            carte = mmap.mmap(fichier.fileno(), 0, access=mmap.ACCESS_READ)
+        except (struct.error, ValueError, OSError):
+            fichier.close()
+            return None
+        return cls(fichier, carte, entete)
+
+    # Compteurs du catalogue par genre et par auteur au moment de l'écriture
+    def resume(self):
+        contenu = json.loads(self._carte[self._debut_resume:self._debut_resume + self._taille_resume])
+        return Counter(contenu["par_genre"]), Counter(contenu["par_auteur"])
+
+    def _octets(self, numero):
+        return self._carte[self._debut_chaines + self._positions[numero]:
+                           self._debut_chaines + self._positions[numero + 1]]
+
+    def _chaine(self, numero):
+        return self._octets(numero).decode("utf-8")
+
+    def _partagee(self, numero):
+        texte = self._partagees.get(numero)
+        if texte is None:
+            texte = self._partagees[numero] = sys.intern(self._chaine(numero))
+        return texte
+
+    def _enregistrement(self, position):
+        return ENREGISTREMENT.unpack_from(self._carte, self._debut_enregistrements + position * ENREGISTREMENT.size)
+
+    def isbn(self, position):
+        return self._chaine(self._enregistrement(position)[0])
+
+    # Position de l'enregistrement d'un ISBN, ou -1
+    def chercher(self, isbn):
+        octets = isbn.encode("utf-8")
+        masque = self._taille_table - 1
+        case = _hachage(octets) & masque
+        while True:
+            position = self._table[case]
+            if position == VIDE:
+                return -1
+            if self._octets(self._enregistrement(position)[0]) == octets:
+                return position
+            case = (case + 1) & masque
+
+    # Construit l'objet livre d'un enregistrement
+    def livre(self, position, fabrique):
+        isbn, titre, auteur, genre, annee, emprunte = self._enregistrement(position)
+        if annee == ANNEE_INCONNUE:
+            annee = None
+        elif annee == ANNEE_TEXTE:
+            annee = self._chaine(titre + 1)
+        return fabrique(
+            self._chaine(isbn), self._chaine(titre), self._partagee(auteur), annee, self._partagee(genre),
+            "emprunte" if emprunte else "disponible"
+        )
+
+    def fermer(self):
+        self._positions.release()
+        self._table.release()
+        self._vue.release()
+        self._carte.close()
+        self._fichier.close()
+
+
+class LivresMappes(MutableMapping):
+    """
+    Dictionnaire ISBN -> Livre adossé à un Instantane.
+    Un livre lu par isbn est construit une fois puis gardé ; les livres ajoutés, remplacés ou
+    supprimés depuis l'instantané sont tenus à part. values() parcourt le catalogue sans retenir
+    les livres qu'il construit : ils ne doivent pas être modifiés (passer par livres[isbn]).
+    """
+
+    def __init__(self, instantane, fabrique):
+        self.instantane = instantane
+        self._fabrique = fabrique
+        self._livres = {}         # ISBN -> Livre construit ou ajouté
+        self._ajoutes = set()     # ISBN absents de l'instantané
+        self._supprimes = set()   # ISBN de l'instantané supprimés depuis
+        self._nombre = instantane.nombre
+
+    def __getitem__(self, isbn):
+        livre = self._livres.get(isbn)
+        if livre is None:
+            position = -1 if isbn in self._supprimes else self.instantane.chercher(isbn)
+            if position < 0:
+                raise KeyError(isbn)
+            livre = self._livres[isbn] = self.instantane.livre(position, self._fabrique)
+        return livre
+
+    def __contains__(self, isbn):
+        return isbn in self._livres or (isbn not in self._supprimes and self.instantane.chercher(isbn) >= 0)
+
+    def __setitem__(self, isbn, livre):
+        if isbn not in self:
+            self._nombre += 1
+            if isbn in self._supprimes:
+                self._supprimes.discard(isbn)
+            else:
+                self._ajoutes.add(isbn)
+        self._livres[isbn] = livre
+
+    def __delitem__(self, isbn):
+        if isbn not in self:
+            raise KeyError(isbn)
+        self._livres.pop(isbn, None)
+        if isbn in self._ajoutes:
+            self._ajoutes.discard(isbn)
+        else:
+            self._supprimes.add(isbn)
+        self._nombre -= 1
+
+    def __len__(self):
+        return self._nombre
+
+    def __iter__(self):
+        instantane = self.instantane
+        for position in range(instantane.nombre):
+            isbn = instantane.isbn(position)
+            if isbn not in self._supprimes:
+                yield isbn
+        yield from list(self._ajoutes)
+
+    def values(self):
+        return _ValeursMappees(self)
+
+    # Index trié (valeur, isbn) par ISBN, tiré de l'ordre de l'instantané
+    def index_isbn(self):
+        instantane = self.instantane
+        return IndexInstantane(
+            instantane,
+            [instantane.chercher(isbn) for isbn in self._supprimes],
+            [(isbn.casefold(), isbn) for isbn in self._ajoutes]
+        )
+
+
+class _ValeursMappees(ValuesView):
+    def __iter__(self):
+        livres = self._mapping
+        instantane = livres.instantane
+        for position in range(instantane.nombre):
+            isbn = instantane.isbn(position)
+            if isbn in livres._supprimes:
+                continue
+            livre = livres._livres.get(isbn)
+            yield livre if livre is not None else instantane.livre(position, livres._fabrique)
+        for isbn in list(livres._ajoutes):
+            yield livres._livres[isbn]
+
+
+class IndexInstantane:
+    """
+    Index trié (isbn.casefold(), isbn) lu directement dans l'ordre des enregistrements de l'instantané,
+    corrigé des livres supprimés (positions masquées) et ajoutés (petite liste triée).
+    Se comporte comme la liste triée des autres index pour livres_page ; inserer/retirer
+    remplacent insort et del.
+    """
+
+    def __init__(self, instantane, masques, ajouts):
+        self._instantane = instantane
+        self._masques = sorted(masques)  # positions d'enregistrements retirées de l'index
+        self._ajouts = sorted(ajouts)
+
+    def _base(self, position):
+        isbn = self._instantane.isbn(position)
+        return isbn.casefold(), isbn
+
+    # Position de la première entrée de l'instantané >= entree
+    def _chercher_base(self, entree):
+        debut, fin = 0, self._instantane.nombre
+        while debut < fin:
+            milieu = (debut + fin) // 2
+            if self._base(milieu) < entree:
+                debut = milieu + 1
+            else:
+                fin = milieu
+        return debut
+
+    # Position du j-ième enregistrement non masqué
+    def _visible(self, j):
+        if not self._masques:
+            return j
+        debut, fin = j, j + len(self._masques)
+        while debut < fin:
+            milieu = (debut + fin) // 2
+            if milieu + 1 - bisect_right(self._masques, milieu) < j + 1:
+                debut = milieu + 1
+            else:
+                fin = milieu
+        return debut
+
+    # Nombre d'entrées de l'instantané (non masquées) inférieures à entree
+    def _rang_base(self, entree):
+        position = self._chercher_base(entree)
+        return position - bisect_left(self._masques, position)
+
+    def __len__(self):
+        return self._instantane.nombre - len(self._masques) + len(self._ajouts)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        if not self._ajouts:
+            return self._base(self._visible(i))
+        # Nombre d'ajouts placés avant la i-ème entrée (le rang d'un ajout croît avec lui)
+        debut, fin = 0, len(self._ajouts)
+        while debut < fin:
+            milieu = (debut + fin) // 2
+            if milieu + self._rang_base(self._ajouts[milieu]) < i:
+                debut = milieu + 1
+            else:
+                fin = milieu
+        if debut < len(self._ajouts) and debut + self._rang_base(self._ajouts[debut]) == i:
+            return self._ajouts[debut]
+        return self._base(self._visible(i - debut))
+
+    def _parcourir_base(self, positions):
+        masques = set(self._masques)
+        for position in positions:
+            if position not in masques:
+                yield self._base(position)
+
+    def __iter__(self):
+        return heapq.merge(self._parcourir_base(range(self._instantane.nombre)), self._ajouts)
+
+    def __reversed__(self):
+        return heapq.merge(self._parcourir_base(range(self._instantane.nombre - 1, -1, -1)),
+                           reversed(self._ajouts), reverse=True)
+
+    def inserer(self, entree):
+        insort(self._ajouts, entree)
+
+    def retirer(self, entree):
+        i = bisect_left(self._ajouts, entree)
+        if i < len(self._ajouts) and self._ajouts[i] == entree:
+            del self._ajouts[i]
+            return
+        position = self._chercher_base(entree)
+        if position < self._instantane.nombre and self._base(position) == entree:
+            j = bisect_left(self._masques, position)
+            if j == len(self._masques) or self._masques[j] != position:
+                self._masques.insert(j, position)
@@ -0,0 +1,211 @@
+import io
+import json
+import time
+import pstats
+import inspect
+import cProfile
+import threading
+import tracemalloc
+from bisect import bisect_left
+from datetime import datetime
+from functools import wraps
+from contextlib import contextmanager
+
+# Bornes supérieures (en ms) des classes de l'histogramme des durées ; la dernière classe est ouverte
+BORNES_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+MODES_PROFIL = ("cprofile", "tracemalloc")
+HORS_OPERATION = "(arrière-plan)"  # Octets écrits hors de toute opération mesurée (minuteur de l'historique)
+
+
+class Mesure:
+    """
+    Appels, durées et octets écrits d'une opération. Les durées sont rangées dans un histogramme
+    à classes fixes (BORNES_MS) : mémoire constante quel que soit le nombre d'appels.
+    """
+    __slots__ = ("appels", "erreurs", "total_ms", "max_ms", "classes", "octets")
+
+    def __init__(self):
+        self.appels = 0
+        self.erreurs = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.classes = [0] * (len(BORNES_MS) + 1)
+        self.octets = 0
+
+    def ajouter(self, duree_ms, erreur=False):
+        self.appels += 1
+        self.erreurs += erreur
+        self.total_ms += duree_ms
+        self.max_ms = max(self.max_ms, duree_ms)
+        self.classes[bisect_left(BORNES_MS, duree_ms)] += 1
+
+    # Durée sous laquelle tombe la proportion q des appels (0 < q <= 1), à la classe près :
+    # borne supérieure de la classe qui la contient, au plus la durée maximale observée
+    def quantile(self, q):
+        cumul = 0
+        for i, nombre in enumerate(self.classes):
+            cumul += nombre
+            if nombre and cumul >= q * self.appels:
+                return min(BORNES_MS[i], self.max_ms) if i < len(BORNES_MS) else self.max_ms
+        return 0.0
+
+    def en_dict(self):
+        return {
+            "appels": self.appels,
+            "erreurs": self.erreurs,
+            "moyenne_ms": self.total_ms / self.appels if self.appels else 0.0,
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "max_ms": self.max_ms,
+            "total_ms": self.total_ms,
+            "octets": self.octets,
+            "histogramme": self.classes[:],
+        }
+
+
+class Instrumentation:
+    """
+    Mesures optionnelles des opérations de la bibliothèque et de l'interface : nombre d'appels,
+    histogramme des durées et octets écrits par opération (une écriture est comptée pour chaque
+    opération en cours dans le thread, comme sa durée), plus les octets par fichier.
+    profiler() demande une capture cProfile ou tracemalloc du prochain appel d'une opération.
+    Utilisable depuis plusieurs threads (serveur, thread des graphiques).
+    """
+
+    def __init__(self):
+        self.debut = datetime.now()
+        self.mesures = {}             # opération -> Mesure
+        self.octets_par_fichier = {}  # nom de fichier -> octets écrits
+        self.profils = {}             # opération -> dernière capture {"mode", "date", "rapport"}
+        self._profil_demande = None   # (opération, mode) du prochain appel à profiler
+        self._verrou = threading.Lock()
+        self._local = threading.local()  # Pile des opérations en cours dans chaque thread
+
+    def _pile(self):
+        pile = getattr(self._local, "pile", None)
+        if pile is None:
+            pile = self._local.pile = []
+        return pile
+
+    # Mesure le bloc comme un appel de l'opération (profilé s'il a été demandé pour elle)
+    @contextmanager
+    def mesurer(self, operation):
+        mode = self._retirer_profil(operation)
+        pile = self._pile()
+        pile.append(operation)
+        erreur = False
+        debut = time.perf_counter()
+        try:
+            if mode is None:
+                yield
+            else:
+                with self._profiler(operation, mode):
+                    yield
+        except BaseException:
+            erreur = True
+            raise
+        finally:
+            duree_ms = 1000 * (time.perf_counter() - debut)
+            pile.pop()
+            with self._verrou:
+                self.mesures.setdefault(operation, Mesure()).ajouter(duree_ms, erreur)
+
+    # Retourne une version mesurée de fonction, sous le nom operation
+    def envelopper(self, fonction, operation):
+        @wraps(fonction)
+        def enveloppe(*args, **kwargs):
+            with self.mesurer(operation):
+                return fonction(*args, **kwargs)
+        return enveloppe
+
+    # Remplace sur l'objet chacune de ses méthodes publiques par sa version mesurée (nommée prefixe + nom)
+    def instrumenter(self, objet, prefixe=""):
+        for nom, _ in inspect.getmembers(type(objet), inspect.isfunction):
+            if not nom.startswith("_"):
+                setattr(objet, nom, self.envelopper(getattr(objet, nom), prefixe + nom))
+        return objet
+
+    # Compte des octets écrits dans un fichier, attribués aux opérations en cours du thread
+    def octets(self, nombre, fichier):
+        operations = set(self._pile()) or {HORS_OPERATION}
+        with self._verrou:
+            self.octets_par_fichier[fichier] = self.octets_par_fichier.get(fichier, 0) + nombre
+            for operation in operations:
+                self.mesures.setdefault(operation, Mesure()).octets += nombre
+
+    def profiler(self, operation, mode="cprofile"):
+        """
+        Demande la capture du prochain appel d'une opération ; le rapport est rangé dans profils[operation].
+        :param mode: "cprofile" (fonctions les plus coûteuses) ou "tracemalloc" (mémoire allouée par ligne)
+        """
+        if mode not in MODES_PROFIL:
+            raise ValueError(f"Mode de profilage inconnu : {mode}")
+        with self._verrou:
+            self._profil_demande = (operation, mode)
+
+    def _retirer_profil(self, operation):
+        with self._verrou:
+            if self._profil_demande is None or self._profil_demande[0] != operation:
+                return None
+            mode = self._profil_demande[1]
+            self._profil_demande = None
+            return mode
+
+    @contextmanager
+    def _profiler(self, operation, mode):
+        if mode == "cprofile":
+            profil = cProfile.Profile()
+            profil.enable()
+            try:
+                yield
+            finally:
+                profil.disable()
+                sortie = io.StringIO()
+                pstats.Stats(profil, stream=sortie).sort_stats("cumulative").print_stats(30)
+                self._garder_profil(operation, mode, sortie.getvalue())
+            return
+
+        deja_actif = tracemalloc.is_tracing()
+        if not deja_actif:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        avant = tracemalloc.take_snapshot()
+        try:
+            yield
+        finally:
+            apres = tracemalloc.take_snapshot()
+            _, pic = tracemalloc.get_traced_memory()
+            if not deja_actif:
+                tracemalloc.stop()
+            lignes = [f"Pic de mémoire suivie : {pic / 1024:.1f} Kio", "Mémoire restée allouée, par ligne :"]
+            lignes += [str(stat) for stat in apres.compare_to(avant, "lineno")[:25]]
+            self._garder_profil(operation, mode, "\n".join(lignes))
+
+    def _garder_profil(self, operation, mode, rapport):
+        with self._verrou:
+            self.profils[operation] = {"mode": mode, "date": datetime.now().isoformat(timespec="seconds"),
+                                       "rapport": rapport}
+
+    # Oublie les mesures et les captures (une demande de profilage en attente est gardée)
+    def reinitialiser(self):
+        with self._verrou:
+            self.debut = datetime.now()
+            self.mesures.clear()
+            self.octets_par_fichier.clear()
+            self.profils.clear()
+
+    def en_dict(self):
+        with self._verrou:
+            return {
+                "debut": self.debut.isoformat(timespec="seconds"),
+                "date": datetime.now().isoformat(timespec="seconds"),
+                "bornes_ms": list(BORNES_MS),
+                "operations": {operation: mesure.en_dict() for operation, mesure in sorted(self.mesures.items())},
+                "octets_par_fichier": dict(self.octets_par_fichier),
+                "profils": dict(self.profils),
+            }
+
+    def exporter_json(self, chemin):
+        with open(chemin, "w", encoding="utf-8") as f:
+            json.dump(self.en_dict(), f, indent=2, ensure_ascii=False)
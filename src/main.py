@@ -1,22 +1,43 @@
 import os
 import sys
 import tkinter as tk
-from tkinter import messagebox, ttk
+from tkinter import messagebox, ttk, filedialog
 from src.bibliotheque import Bibliotheque
-import matplotlib.pyplot as plt
-from collections import Counter
-from datetime import datetime, timedelta
+from src.analyses import Analyses
+from src.visualisation import GRAPHIQUES
+from src.instrumentation import Instrumentation, MODES_PROFIL
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+# Démarrage : matplotlib n'est importé qu'au premier graphique, PIL seulement pour remplir
+# le cache des icônes redimensionnées (relues ensuite directement par Tk)
 
 #  Gestion PIL et chargement images
-try:
-    from PIL import Image, ImageTk
-    PIL_AVAILABLE = True
+# Icône redimensionnée gardée en PNG dans assets/.cache, le nom de fichier portant la date
+# de modification de l'original et la taille : toute retouche de l'image invalide le cache.
+# Retourne le chemin du PNG en cache, ou None si PIL manque ou si le cache n'est pas inscriptible
+def icone_en_cache(chemin, largeur, hauteur):
+    nom = os.path.splitext(os.path.basename(chemin))[0]
+    cache = os.path.join(os.path.dirname(chemin), ".cache",
+                         f"{nom}-{largeur}x{hauteur}-{os.stat(chemin).st_mtime_ns}.png")
+    if os.path.exists(cache):
+        return cache
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
     try:
-        RESAMPLE_MODE = Image.Resampling.LANCZOS
+        mode = Image.Resampling.LANCZOS
     except AttributeError:
-        RESAMPLE_MODE = Image.ANTIALIAS
-except ImportError:
-    PIL_AVAILABLE = False
+        mode = Image.ANTIALIAS
+    try:
+        os.makedirs(os.path.dirname(cache), exist_ok=True)
+        temporaire = cache + ".tmp"
+        Image.open(chemin).resize((largeur, hauteur), mode).save(temporaire, format="PNG")
+        os.replace(temporaire, cache)
+    except OSError:
+        return None
+    return cache
 
 def charger_image(nom_fichier, largeur=None, hauteur=None):
     dossier_script = os.path.dirname(os.path.abspath(sys.argv[0]))
@@ -26,13 +47,11 @@ def charger_image(nom_fichier, largeur=None, hauteur=None):
         print(f"Erreur chargement image {nom_fichier}: fichier introuvable.")
         return None
     try:
-        if PIL_AVAILABLE:
-            img = Image.open(chemin)
-            if largeur and hauteur:
-                img = img.resize((largeur, hauteur), RESAMPLE_MODE)
-            return ImageTk.PhotoImage(img)
-        else:
-            return tk.PhotoImage(file=chemin)
+        if largeur and hauteur:
+            cache = icone_en_cache(chemin, largeur, hauteur)
+            if cache is not None:
+                return tk.PhotoImage(file=cache)
+        return tk.PhotoImage(file=chemin)
     except Exception as e:
         print(f"Erreur chargement image {nom_fichier}: {e}")
         return None
@@ -44,11 +63,11 @@ fenetre.geometry("1200x750")  # élargi pour plus de colonnes
 fenetre.configure(bg="white")
 
 # Chargement images (après création fenetre Tk)
+# Icônes des graphiques : chargées avec l'onglet Statistiques, à sa première ouverture
 liste_images = [
     "stack-of-books.png", "membres.png", "statistique.png",
     "check.png", "trash.png", "emprunter.png", "retourner.png",
-    "pie-chart.png", "bar-chart.png","check.png",
-     "line-chart.png", "add-user.png","ajouter-livre.png"
+    "add-user.png", "ajouter-livre.png"
 ]
 
 icones_brut = {}
@@ -64,9 +83,6 @@ icones = {
     "supprimer": icones_brut.get("trash"),
     "emprunter": icones_brut.get("emprunter"),
     "retourner": icones_brut.get("retourner"),
-    "diagramme_genre": icones_brut.get("pie-chart"),
-    "diagramme_auteurs": icones_brut.get("bar-chart"),
-    "diagramme_emprunts_30j": icones_brut.get("line-chart"),  # remplacé diagramme.png par pie-chart
     "ajouterpersonne": icones_brut.get("add-user"),
     "ajouterlivre":icones_brut.get("ajouter-livre")
 }
@@ -133,7 +149,7 @@ def ajouter_livre():
         )
         biblio.ajouter_livre(livre)
         afficher_message("Livre ajouté avec statut 'Disponible'.")
-        maj_tout()
+        maj_listes()
         vider_champs_livre()  # Vide les champs après ajout
     except Exception as e:
         afficher_message(f"Erreur : {e}")
@@ -144,7 +160,7 @@ def supprimer_livre():
     try:
         biblio.supprimer_livre(fields_livre["isbn"].get().strip())
         afficher_message("Livre supprimé.")
-        maj_tout()
+        maj_listes()
 
         # Vider les champs après suppression
         for champ in fields_livre.values():
@@ -153,7 +169,16 @@ def supprimer_livre():
     except Exception as e:
         afficher_message(f"Erreur : {e}")
 
-#  Encadré boutons d'action Livres (ajouter / supprimer) côte à côte
+# Ajoute un exemplaire physique au livre dont l'ISBN est saisi (code-barres généré)
+def ajouter_exemplaire():
+    try:
+        exemplaire = biblio.ajouter_exemplaire(fields_livre["isbn"].get().strip())
+        livre = biblio.livres[exemplaire.isbn]
+        afficher_message(f"Exemplaire {exemplaire.code} ajouté ({livre.exemplaires} exemplaires).")
+    except Exception as e:
+        afficher_message(f"Erreur : {e}")
+
+#  Encadré boutons d'action Livres (ajouter / supprimer / exemplaire) côte à côte
 frame_boutons_livre = tk.Frame(cadre_livre, bg="white")
 frame_boutons_livre.pack(pady=5)
 
@@ -165,6 +190,10 @@ btn_supprimer_livre = tk.Button(frame_boutons_livre, text=" Supprimer Livre", im
                                 bg="#cc0000", fg="white", font=("Arial", 10, "bold"), command=supprimer_livre)
 btn_supprimer_livre.pack(side="left", padx=10)
 
+btn_ajouter_exemplaire = tk.Button(frame_boutons_livre, text="+ Exemplaire", bg="#005b96", fg="white",
+                                   font=("Arial", 10, "bold"), command=ajouter_exemplaire)
+btn_ajouter_exemplaire.pack(side="left", padx=10)
+
 #  Onglet Membres
 cadre_membre = tk.Frame(notebook, bg="white")
 notebook.add(cadre_membre, text=" Membres", image=icones["membres"], compound="left")
@@ -182,7 +211,7 @@ def enregistrer_membre():
         membre = biblio.Membre(id_entry.get().strip(), nom_entry.get().strip())
         biblio.enregistrer_membre(membre)
         afficher_message("Membre enregistré.")
-        maj_tout()
+        maj_listes()
     except Exception as e:
         afficher_message(f"Erreur : {e}")
 
@@ -190,7 +219,7 @@ def supprimer_membre():
     try:
         biblio.supprimer_membre(id_entry.get().strip())
         afficher_message("🗑 Membre supprimé.")
-        maj_tout()
+        maj_listes()
         # Vider les champs après suppression
         id_entry.delete(0, tk.END)
         nom_entry.delete(0, tk.END)
@@ -211,8 +240,9 @@ btn_supprimer_membre = tk.Button(frame_boutons_membre, text=" Supprimer Membre",
 btn_supprimer_membre.pack(side="left", padx=10)
 
 
-# Combobox livres disponibles
-livres_disponibles_cb = ttk.Combobox(cadre_membre, width=50, state="readonly")
+# Combobox livres disponibles (liste construite à l'ouverture, voir remplir_livres_disponibles)
+livres_disponibles_cb = ttk.Combobox(cadre_membre, width=50, state="readonly",
+                                     postcommand=lambda: remplir_livres_disponibles())
 tk.Label(cadre_membre, text="Livres disponibles", **style_label).pack(anchor="w", padx=10)
 livres_disponibles_cb.pack(pady=2)
 
@@ -221,20 +251,50 @@ tk.Label(cadre_membre, text="Livres empruntés", **style_label).pack(anchor="w",
 livres_empruntes_listbox = tk.Listbox(cadre_membre, width=50, height=6)
 livres_empruntes_listbox.pack(pady=2)
 
+# Libellé d'un livre disponible : le compteur du livre donne le nombre d'exemplaires sans les parcourir
+def libelle_disponible(livre):
+    if livre.exemplaires > 1:
+        return f"{livre.isbn} - {livre.titre} ({livre.disponibles}/{livre.exemplaires} disponibles)"
+    return f"{livre.isbn} - {livre.titre}"
+
+# Liste construite depuis l'ensemble des livres disponibles tenu par la bibliothèque,
+# et seulement si les données ont changé depuis la dernière ouverture
+etat_disponibles = {"version": None}
+
+def remplir_livres_disponibles():
+    if etat_disponibles["version"] == biblio.version:
+        return
+    livres_disponibles_cb['values'] = [libelle_disponible(livre) for livre in biblio.livres_disponibles()]
+    etat_disponibles["version"] = biblio.version
+
 def rafraichir_livres_disponibles():
-    livres = [f"{livre.isbn} - {livre.titre}" for livre in biblio.livres.values() if livre.statut == "disponible"]
-    livres_disponibles_cb['values'] = livres
-    livres_disponibles_cb.set(livres[0] if livres else '')
+    # Seul le premier livre disponible est affiché ici : la liste complète attend l'ouverture du menu
+    premier = biblio.premier_disponible()
+    livres_disponibles_cb.set(libelle_disponible(premier) if premier is not None else '')
 
 def rafraichir_livres_empruntes():
     livres_empruntes_listbox.delete(0, tk.END)
     id_membre = id_entry.get().strip()
     if id_membre in biblio.membres:
+        # Un exemplaire emprunté est désigné par son code-barres (l'ISBN pour un exemplaire unique)
         empruntes = biblio.membres[id_membre].livres_empruntes
-        for isbn in empruntes:
+        for code in sorted(empruntes):
+            isbn = biblio.livre_de(code)
             if isbn in biblio.livres:
                 titre = biblio.livres[isbn].titre
-                livres_empruntes_listbox.insert(tk.END, f"{isbn} - {titre}")
+                pret = biblio.prets.get(code)
+                if pret is None:
+                    livres_empruntes_listbox.insert(tk.END, f"{code} - {titre}")
+                    continue
+                retard = " (EN RETARD)" if pret.en_retard() else ""
+                livres_empruntes_listbox.insert(tk.END, f"{code} - {titre} - à rendre le {pret.echeance[:10]}{retard}")
+                if retard:
+                    livres_empruntes_listbox.itemconfig(tk.END, fg="#cc0000")
+        # Réservations du membre, avec son rang dans chaque file d'attente
+        for isbn, rang in biblio.reservations_membre(id_membre):
+            titre = biblio.livres[isbn].titre if isbn in biblio.livres else ""
+            livres_empruntes_listbox.insert(tk.END, f"{isbn} - {titre} - réservé (rang {rang})")
+            livres_empruntes_listbox.itemconfig(tk.END, fg="#005b96")
 
 def vider_champs_membre():
     id_entry.delete(0, tk.END)
@@ -255,7 +315,7 @@ def emprunter_livre():
     try:
         biblio.emprunter_livre(isbn, id_m)
         afficher_message(f"Livre {isbn} emprunté.")
-        maj_tout()
+        maj_listes()
         vider_champs_membre()  # vider les champs après emprunt
     except Exception as e:
         afficher_message(f"{e}")
@@ -273,12 +333,46 @@ def retourner_livre():
     try:
         biblio.retourner_livre(isbn, id_m)
         afficher_message(f"Livre {isbn} retourné.")
-        maj_tout()
+        maj_listes()
         vider_champs_membre()  # vider les champs après retour
     except Exception as e:
         afficher_message(f"{e}")
 
-# Encadré boutons Emprunter / Retourner horizontalement
+def renouveler_pret():
+    id_m = id_entry.get().strip()
+    selection = livres_empruntes_listbox.curselection()
+    if not id_m:
+        afficher_message("Veuillez saisir l'ID du membre.")
+        return
+    if not selection:
+        afficher_message("Veuillez sélectionner un livre emprunté.")
+        return
+    isbn = livres_empruntes_listbox.get(selection[0]).split(" - ")[0]
+    try:
+        pret = biblio.renouveler_pret(isbn, id_m)
+        afficher_message(f"Prêt du livre {isbn} renouvelé jusqu'au {pret.echeance[:10]}.")
+        planifier("empruntes")
+    except Exception as e:
+        afficher_message(f"{e}")
+
+# Réserve le livre choisi dans le tableau (champ ISBN) pour le membre saisi
+def reserver_livre():
+    id_m = id_entry.get().strip()
+    isbn = fields_livre["isbn"].get().strip()
+    if not id_m:
+        afficher_message("Veuillez saisir l'ID du membre.")
+        return
+    if not isbn:
+        afficher_message("Veuillez sélectionner un livre emprunté dans le tableau.")
+        return
+    try:
+        rang = biblio.reserver_livre(isbn, id_m)
+        afficher_message(f"Livre {isbn} réservé (rang {rang} dans la file d'attente).")
+        planifier("empruntes")
+    except Exception as e:
+        afficher_message(f"{e}")
+
+# Encadré boutons Emprunter / Retourner / Renouveler / Réserver horizontalement
 frame_emprunt_retour = tk.Frame(cadre_membre, bg="white")
 frame_emprunt_retour.pack(pady=5)
 
@@ -290,79 +384,206 @@ btn_retourner = tk.Button(frame_emprunt_retour, text=" Retourner livre", image=i
                           bg="#336600", fg="white", font=("Arial", 10, "bold"), command=retourner_livre)
 btn_retourner.pack(side="left", padx=10)
 
-# Mise à jour dynamique des listes quand on quitte le champ ID membre
-id_entry.bind("<FocusOut>", lambda e: (rafraichir_livres_empruntes(), rafraichir_livres_disponibles()))
+btn_renouveler = tk.Button(frame_emprunt_retour, text="Renouveler", bg="#005b96", fg="white",
+                           font=("Arial", 10, "bold"), command=renouveler_pret)
+btn_renouveler.pack(side="left", padx=10)
+
+btn_reserver = tk.Button(frame_emprunt_retour, text="Réserver", bg="#663399", fg="white",
+                         font=("Arial", 10, "bold"), command=reserver_livre)
+btn_reserver.pack(side="left", padx=10)
+
+# Mise à jour de la liste du membre quand on quitte le champ ID membre (les livres disponibles n'en dépendent pas)
+id_entry.bind("<FocusOut>", lambda e: planifier("empruntes"))
 
 #Onglet Statistiques
 cadre_stats = tk.Frame(notebook, bg="white")
 notebook.add(cadre_stats, text=" Statistiques", image=icones["statistique"], compound="left")
 
-tk.Label(cadre_stats, text="Visualisations Statistiques", font=("Arial", 14, "bold"), bg="white", fg="#003366").pack(pady=10)
+# Graphiques intégrés à l'onglet (dessins et données : src/visualisation.py et src/analyses.py) :
+# les données sont relevées par un thread de travail (qui importe aussi matplotlib la première fois),
+# le résultat est récupéré par scrutation avec fenetre.after.
+# Chaque figure est gardée et n'est redessinée que si la version des données a changé.
+executeur_graphiques = ThreadPoolExecutor(max_workers=1)
+graphiques = {}       # nom -> {"canvas": FigureCanvasTkAgg, "version": (version de biblio, jour)}
+graphiques_en_cours = set()
+
+# Zone où les graphiques sont dessinés (placée dans l'onglet à sa construction)
+cadre_graphique = tk.Frame(cadre_stats, bg="white")
+
+# Exécuté dans le thread de travail : version et données relevées ensemble sous le verrou
+def preparer_graphique(nom):
+    # Import coûteux fait ici plutôt que dans le thread Tk
+    import matplotlib.figure
+    import matplotlib.backends.backend_tkagg
+    version = (biblio.version, datetime.now().date())
+    return version, GRAPHIQUES[nom][0](analyses)
+
+def montrer_graphique(nom):
+    for autre, graphique in graphiques.items():
+        if autre != nom:
+            graphique["canvas"].get_tk_widget().pack_forget()
+    graphiques[nom]["canvas"].get_tk_widget().pack(fill="both", expand=True)
+
+def afficher_graphique(nom):
+    graphique = graphiques.get(nom)
+    if graphique is not None and graphique["version"] == (biblio.version, datetime.now().date()):
+        montrer_graphique(nom)  # Données inchangées : la figure existante est réaffichée telle quelle
+        return
+    if nom in graphiques_en_cours:
+        return
+    graphiques_en_cours.add(nom)
+    attendre_graphique(nom, executeur_graphiques.submit(preparer_graphique, nom))
 
-def diagramme_genre():
-    genres = [livre.genre for livre in biblio.livres.values()]
-    compteur = Counter(genres)
-    if not compteur:
-        messagebox.showinfo("Info", "Aucun livre trouvé.")
+def attendre_graphique(nom, futur):
+    if not futur.done():
+        fenetre.after(50, attendre_graphique, nom, futur)
         return
-    plt.figure(figsize=(6, 6))
-    plt.pie(compteur.values(), labels=compteur.keys(), autopct='%1.1f%%', startangle=90)
-    plt.title("Répartition des Livres par Genre")
-    plt.axis('equal')
-    plt.tight_layout()
-    plt.show()
-
-def histogramme_auteurs():
-    auteurs = [livre.auteur for livre in biblio.livres.values()]
-    compteur = Counter(auteurs)
-    top = compteur.most_common(10)
-    if not top:
-        messagebox.showinfo("Info", "Aucun auteur trouvé.")
+    graphiques_en_cours.discard(nom)
+    try:
+        version, donnees = futur.result()
+    except Exception as e:
+        afficher_message(f"Erreur : {e}")
+        return
+    _, dessiner, message_vide = GRAPHIQUES[nom]
+    if message_vide and not donnees:
+        messagebox.showinfo("Info", message_vide)
         return
-    noms, quantites = zip(*top)
-    plt.figure(figsize=(10, 5))
-    plt.bar(noms, quantites, color='skyblue')
-    plt.title("Top 10 Auteurs les plus populaires")
-    plt.xticks(rotation=45, ha="right")
-    plt.tight_layout()
-    plt.show()
-
-def courbe_emprunts_30j():
-    aujourd_hui = datetime.now().date()
-    depuis = aujourd_hui - timedelta(days=30)
-    dates = []
-    for entry in biblio.historique:
-        date_str, isbn, id_membre, action = entry
-        if action == "emprunt":
-            try:
-                date_obj = datetime.strptime(date_str, "%Y-%m-%d").date()
-                if date_obj >= depuis:
-                    dates.append(date_obj)
-            except:
-                continue
-    compteur = Counter(dates)
-    jours = [depuis + timedelta(days=i) for i in range(31)]
-    valeurs = [compteur.get(j, 0) for j in jours]
-    plt.figure(figsize=(12, 5))
-    plt.plot(jours, valeurs, marker='o', linestyle='-', color='green')
-    plt.title("Activité des Emprunts (30 derniers jours)")
-    plt.xlabel("Date")
-    plt.ylabel("Nombre d'emprunts")
-    plt.grid(True)
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.show()
-btn_genre = tk.Button(cadre_stats, text=" Diagramme par Genre", image=icones["diagramme_genre"], compound="left",
-                      bg="#0059b3", fg="white", font=("Arial", 10, "bold"), width=210, command=diagramme_genre)
-btn_genre.pack(pady=5)
-
-btn_auteurs = tk.Button(cadre_stats, text=" Top 10 Auteurs", image=icones["diagramme_auteurs"], compound="left",
-                        bg="#0059b3", fg="white", font=("Arial", 10, "bold"), width=210, command=histogramme_auteurs)
-btn_auteurs.pack(pady=5)
-
-btn_emprunts = tk.Button(cadre_stats, text=" Activité des emprunts (30j)", image=icones["diagramme_emprunts_30j"], compound="left",
-                         bg="#0059b3", fg="white", font=("Arial", 10, "bold"), width=210, command=courbe_emprunts_30j)
-btn_emprunts.pack(pady=5)
+
+    graphique = graphiques.get(nom)
+    if graphique is None:
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        canvas = FigureCanvasTkAgg(Figure(figsize=(8, 4), dpi=80), master=cadre_graphique)
+        graphique = graphiques[nom] = {"canvas": canvas, "version": None}
+    figure = graphique["canvas"].figure
+    figure.clear()
+    dessiner(figure, donnees)
+    figure.tight_layout()
+    graphique["canvas"].draw_idle()
+    graphique["version"] = version
+    montrer_graphique(nom)
+
+# Contenu de l'onglet construit à sa première ouverture
+def construire_onglet_stats():
+    for cle, img_nom in (("diagramme_genre", "pie-chart.png"), ("diagramme_auteurs", "bar-chart.png"),
+                         ("diagramme_emprunts_30j", "line-chart.png")):
+        icones[cle] = charger_image(img_nom, 24, 24)
+
+    tk.Label(cadre_stats, text="Visualisations Statistiques", font=("Arial", 14, "bold"), bg="white", fg="#003366").pack(pady=10)
+
+    frame_boutons_stats = tk.Frame(cadre_stats, bg="white")
+    frame_boutons_stats.pack(pady=5)
+
+    btn_genre = tk.Button(frame_boutons_stats, text=" Diagramme par Genre", image=icones["diagramme_genre"], compound="left",
+                          bg="#0059b3", fg="white", font=("Arial", 10, "bold"), width=210,
+                          command=lambda: afficher_graphique("genre"))
+    btn_genre.pack(side="left", padx=5)
+
+    btn_auteurs = tk.Button(frame_boutons_stats, text=" Top 10 Auteurs", image=icones["diagramme_auteurs"], compound="left",
+                            bg="#0059b3", fg="white", font=("Arial", 10, "bold"), width=210,
+                            command=lambda: afficher_graphique("auteurs"))
+    btn_auteurs.pack(side="left", padx=5)
+
+    btn_emprunts = tk.Button(frame_boutons_stats, text=" Activité des emprunts (30j)", image=icones["diagramme_emprunts_30j"], compound="left",
+                             bg="#0059b3", fg="white", font=("Arial", 10, "bold"), width=210,
+                             command=lambda: afficher_graphique("emprunts_30j"))
+    btn_emprunts.pack(side="left", padx=5)
+
+    btn_plus_empruntes = tk.Button(frame_boutons_stats, text=" Livres les plus empruntés", image=icones["diagramme_auteurs"], compound="left",
+                                   bg="#0059b3", fg="white", font=("Arial", 10, "bold"), width=210,
+                                   command=lambda: afficher_graphique("plus_empruntes"))
+    btn_plus_empruntes.pack(side="left", padx=5)
+
+    cadre_graphique.pack(fill="both", expand=True, padx=10, pady=5)
+
+def sur_changement_onglet(event):
+    if event.widget.select() == str(cadre_stats) and not cadre_graphique.winfo_manager():
+        construire_onglet_stats()
+
+notebook.bind("<<NotebookTabChanged>>", sur_changement_onglet)
+
+# Onglet Diagnostics, seulement avec BIBLIO_DIAGNOSTICS=1 (ou BIBLIO_PROFIL) : durées, appels et octets écrits
+# de chaque opération de la bibliothèque et de chaque rafraîchissement de l'interface (src/instrumentation.py).
+# BIBLIO_PROFIL=operation[:tracemalloc] profile dès le démarrage le premier appel de l'opération (charger, par exemple)
+instrumentation = None
+if os.environ.get("BIBLIO_DIAGNOSTICS") or os.environ.get("BIBLIO_PROFIL"):
+    instrumentation = Instrumentation()
+    if os.environ.get("BIBLIO_PROFIL"):
+        operation, _, mode = os.environ["BIBLIO_PROFIL"].partition(":")
+        instrumentation.profiler(operation, mode or "cprofile")
+
+    cadre_diagnostics = tk.Frame(notebook, bg="white")
+    notebook.add(cadre_diagnostics, text=" Diagnostics")
+
+    colonnes_diagnostics = ("Opération", "Appels", "Erreurs", "Moyenne (ms)", "p50 (ms)", "p95 (ms)", "Max (ms)", "Octets")
+    tableau_diagnostics = ttk.Treeview(cadre_diagnostics, columns=colonnes_diagnostics, show="headings", height=8)
+    for col in colonnes_diagnostics:
+        tableau_diagnostics.heading(col, text=col)
+        tableau_diagnostics.column(col, width=260 if col == "Opération" else 90, anchor="w" if col == "Opération" else "e")
+    tableau_diagnostics.pack(fill="both", expand=True, padx=10, pady=5)
+
+    frame_boutons_diagnostics = tk.Frame(cadre_diagnostics, bg="white")
+    frame_boutons_diagnostics.pack(fill="x", padx=10)
+    operation_profil_cb = ttk.Combobox(frame_boutons_diagnostics, width=35)
+    mode_profil_cb = ttk.Combobox(frame_boutons_diagnostics, width=12, state="readonly", values=MODES_PROFIL)
+    mode_profil_cb.set(MODES_PROFIL[0])
+    rapport_profil = tk.Text(cadre_diagnostics, height=10, bg="white", fg="#333333", font=("Courier", 9))
+
+    # Opérations triées par temps total, la plus coûteuse en premier
+    def rafraichir_diagnostics():
+        donnees = instrumentation.en_dict()
+        tableau_diagnostics.delete(*tableau_diagnostics.get_children())
+        for nom, mesure in sorted(donnees["operations"].items(), key=lambda e: -e[1]["total_ms"]):
+            tableau_diagnostics.insert("", "end", iid=nom, values=(
+                nom, mesure["appels"], mesure["erreurs"], f"{mesure['moyenne_ms']:.2f}", f"{mesure['p50_ms']:.2f}",
+                f"{mesure['p95_ms']:.2f}", f"{mesure['max_ms']:.2f}", mesure["octets"]))
+        operation_profil_cb.configure(values=sorted(donnees["operations"]))
+
+    def selectionner_diagnostic(event):
+        selection = tableau_diagnostics.selection()
+        if selection:
+            operation_profil_cb.set(selection[0])
+            afficher_profil()
+
+    # Dernière capture de l'opération choisie
+    def afficher_profil():
+        profil = instrumentation.profils.get(operation_profil_cb.get().strip())
+        rapport_profil.delete("1.0", tk.END)
+        if profil is not None:
+            rapport_profil.insert(tk.END, f"{profil['mode']} - {profil['date']}\n{profil['rapport']}")
+
+    def demander_profil():
+        operation = operation_profil_cb.get().strip()
+        if operation:
+            instrumentation.profiler(operation, mode_profil_cb.get())
+            afficher_message(f"Le prochain appel de {operation} sera profilé ({mode_profil_cb.get()}).")
+
+    def exporter_diagnostics():
+        chemin = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON", "*.json")],
+                                              initialfile="diagnostics.json")
+        if chemin:
+            instrumentation.exporter_json(chemin)
+            afficher_message(f"Diagnostics écrits dans {chemin}.")
+
+    def reinitialiser_diagnostics():
+        instrumentation.reinitialiser()
+        rafraichir_diagnostics()
+
+    for texte, commande in (("Actualiser", rafraichir_diagnostics), ("Réinitialiser", reinitialiser_diagnostics),
+                            ("Exporter JSON", exporter_diagnostics)):
+        tk.Button(frame_boutons_diagnostics, text=texte, bg="#0059b3", fg="white", font=("Arial", 10, "bold"),
+                  command=commande).pack(side="left", padx=5, pady=5)
+    tk.Label(frame_boutons_diagnostics, text="Profiler", **style_label).pack(side="left", padx=(20, 5))
+    operation_profil_cb.pack(side="left")
+    mode_profil_cb.pack(side="left", padx=5)
+    tk.Button(frame_boutons_diagnostics, text="Prochain appel", bg="#663399", fg="white", font=("Arial", 10, "bold"),
+              command=demander_profil).pack(side="left", padx=5)
+    tk.Button(frame_boutons_diagnostics, text="Voir le profil", bg="#005b96", fg="white", font=("Arial", 10, "bold"),
+              command=afficher_profil).pack(side="left", padx=5)
+    rapport_profil.pack(fill="both", expand=True, padx=10, pady=5)
+    tableau_diagnostics.bind("<<TreeviewSelect>>", selectionner_diagnostic)
+    notebook.bind("<<NotebookTabChanged>>",
+                  lambda event: event.widget.select() == str(cadre_diagnostics) and rafraichir_diagnostics(), add="+")
 
 #  Zone messages
 affichage = tk.Text(fenetre, height=5, bg="white", fg="#333333", font=("Arial", 10))
@@ -374,11 +595,24 @@ cadre_tableau.pack(pady=10, padx=10, fill="both", expand=True)
 
 tk.Label(cadre_tableau, text=" Tous les Livres", font=("Arial", 12, "bold"), bg="white", fg="#003366").pack()
 
+# Champ de recherche : filtre le tableau à chaque frappe (titre, auteur, genre)
+frame_recherche = tk.Frame(cadre_tableau, bg="white")
+frame_recherche.pack(fill="x", padx=5, pady=(0, 5))
+tk.Label(frame_recherche, text="Rechercher", **style_label).pack(side="left")
+recherche_entry = tk.Entry(frame_recherche, width=50)
+recherche_entry.pack(side="left", padx=5)
+
 colonnes = ("ISBN", "Titre", "Auteur", "Année", "Genre", "Statut", "ID Membre", "Nom Membre")
 tableau_livres = ttk.Treeview(cadre_tableau, columns=colonnes, show="headings", height=15)
 
+# Colonnes triables -> clé de tri de Bibliotheque.livres_page
+cles_tri_colonnes = {"ISBN": "isbn", "Titre": "titre", "Auteur": "auteur", "Année": "annee", "Genre": "genre", "Statut": "statut"}
+
 for col in colonnes:
-    tableau_livres.heading(col, text=col)
+    if col in cles_tri_colonnes:
+        tableau_livres.heading(col, text=col, command=lambda c=col: trier_tableau(c))
+    else:
+        tableau_livres.heading(col, text=col)
 
 # Ajustement largeur colonnes + alignement
 tableau_livres.column("ISBN", width=120, anchor="w")
@@ -389,6 +623,13 @@ tableau_livres.column("Genre", width=100, anchor="w")
 tableau_livres.column("Statut", width=90, anchor="center")
 tableau_livres.column("ID Membre", width=100, anchor="center")
 tableau_livres.column("Nom Membre", width=150, anchor="w")
+
+# Au-delà de ce nombre de livres, le tableau passe en mode virtuel : seule la tranche visible est insérée
+SEUIL_TABLEAU_VIRTUEL = 5000
+etat_tableau = {"virtuel": False, "offset": 0, "lignes": 15, "tri": "isbn", "inverse": False,
+                "filtre": None, "total": 0}
+
+defilement_tableau = ttk.Scrollbar(cadre_tableau, orient="vertical")
 def quitter():
     biblio.sauvegarder()
     fenetre.destroy()
@@ -413,6 +654,7 @@ frame_onglets_bouton.pack(fill="x", padx=10, pady=5)
 notebook = ttk.Notebook(frame_onglets_bouton)
 notebook.pack(side="left", fill="x", expand=True)
 # Pack du tableau en dessous, il prendra le reste de l’espace
+defilement_tableau.pack(side="right", fill="y", pady=(0,10))
 tableau_livres.pack(fill="both", expand=True, padx=5, pady=(0,10))
 
 def remplir_infos_depuis_tableau(event):
@@ -420,7 +662,7 @@ def remplir_infos_depuis_tableau(event):
     if not selected:
         return
     ligne = tableau_livres.item(selected[0])["values"]
-    isbn = ligne[0]
+    isbn = selected[0]  # l'iid de chaque ligne est l'ISBN
     id_membre = ligne[6]
 
     # Remplir champs livre
@@ -452,40 +694,213 @@ tableau_livres.bind("<<TreeviewSelect>>", remplir_infos_depuis_tableau)
 
 
 
-def maj_tout():
-    # Mise à jour tableau livres
-    for ligne in tableau_livres.get_children():
-        tableau_livres.delete(ligne)
-
-    for livre in biblio.livres.values():
-        id_membre = ""
-        nom_membre = ""
-        if livre.statut == "emprunte":
-            # chercher le membre qui emprunte ce livre
-            for m in biblio.membres.values():
-                if livre.isbn in getattr(m, "livres_empruntes", []):
-                    id_membre = m.id_membre
-                    nom_membre = m.nom
-                    break
-        tableau_livres.insert("", "end", values=(
-            livre.isbn,
-            livre.titre,
-            livre.auteur,
-            livre.annee,
-            livre.genre,
-            livre.statut,
-            id_membre,
-            nom_membre
-        ))
+def valeurs_ligne(livre):
+    id_membre = ""
+    nom_membre = ""
+    if livre.statut == "emprunte":
+        # membre emprunteur via l'index inverse de la bibliothèque
+        m = biblio.emprunteur(livre.isbn)
+        if m is not None:
+            id_membre = m.id_membre
+            nom_membre = m.nom
+    return (
+        livre.isbn,
+        livre.titre,
+        livre.auteur,
+        livre.annee_texte,
+        livre.genre,
+        f"{livre.statut} ({livre.disponibles}/{livre.exemplaires})" if livre.exemplaires > 1 else livre.statut,
+        id_membre,
+        nom_membre
+    )
+
+# Rafraîchissements différés : les vues à redessiner sont marquées, puis redessinées une seule fois
+# quand Tk repasse au repos (after_idle). Une rafale de changements (opération en masse, synchronisation)
+# ne coûte ainsi qu'une mise à jour par vue.
+#   recherche : nouveau filtrage puis tableau complet ; tableau : tableau complet ; page : tranche visible
+#   (mode virtuel) ; lignes : lignes du tableau à mettre à jour une par une ; disponibles ; empruntes
+etat_rafraichissement = {"vues": set(), "lignes": set(), "prevu": None, "frappe": None}
+DELAI_RECHERCHE_MS = 150  # La recherche attend une pause dans la frappe
+
+def planifier(*vues, lignes=()):
+    etat_rafraichissement["vues"].update(vues)
+    etat_rafraichissement["lignes"].update(lignes)
+    if etat_rafraichissement["prevu"] is None:
+        etat_rafraichissement["prevu"] = fenetre.after_idle(executer_rafraichissements)
+
+def executer_rafraichissements():
+    vues, lignes = etat_rafraichissement["vues"], etat_rafraichissement["lignes"]
+    etat_rafraichissement.update(vues=set(), lignes=set(), prevu=None)
+    # Chaque vue du tableau englobe les suivantes
+    if "recherche" in vues:
+        appliquer_recherche()
+    elif "tableau" in vues:
+        remplir_tableau()
+    elif "page" in vues:
+        afficher_page()
+    else:
+        for isbn in lignes:
+            maj_ligne(isbn)
+    if "disponibles" in vues:
+        rafraichir_livres_disponibles()
+    if "empruntes" in vues:
+        rafraichir_livres_empruntes()
 
+def maj_ligne(isbn):
+    if isbn not in biblio.livres:
+        if tableau_livres.exists(isbn):
+            tableau_livres.delete(isbn)
+    elif tableau_livres.exists(isbn):
+        tableau_livres.item(isbn, values=valeurs_ligne(biblio.livres[isbn]))
+    else:
+        tableau_livres.insert("", "end", iid=isbn, values=valeurs_ligne(biblio.livres[isbn]))
+
+def maj_listes():
     # Mise à jour listes disponibles et empruntées
-    rafraichir_livres_disponibles()
-    rafraichir_livres_empruntes()
+    planifier("disponibles", "empruntes")
+
+def afficher_page():
+    # Mode virtuel : seules les lignes visibles existent dans le Treeview
+    total, page = biblio.livres_page(etat_tableau["offset"], etat_tableau["lignes"], etat_tableau["tri"],
+                                     filtre=etat_tableau["filtre"], inverse=etat_tableau["inverse"])
+    etat_tableau["total"] = total
+    tableau_livres.delete(*tableau_livres.get_children())
+    for livre in page:
+        tableau_livres.insert("", "end", iid=livre.isbn, values=valeurs_ligne(livre))
+    if total:
+        defilement_tableau.set(etat_tableau["offset"] / total, min(1.0, (etat_tableau["offset"] + len(page)) / total))
+    else:
+        defilement_tableau.set(0, 1)
+
+def deplacer_page(offset):
+    etat_tableau["offset"] = max(0, min(offset, etat_tableau["total"] - etat_tableau["lignes"]))
+    afficher_page()
+
+def defiler_virtuel(*args):
+    # Reçoit les commandes de la barre de défilement ("moveto" ou "scroll")
+    if args[0] == "moveto":
+        deplacer_page(int(float(args[1]) * etat_tableau["total"]))
+    elif args[0] == "scroll":
+        pas = int(args[1]) * (etat_tableau["lignes"] if args[2] == "pages" else 1)
+        deplacer_page(etat_tableau["offset"] + pas)
+
+def molette_tableau(event):
+    if not etat_tableau["virtuel"]:
+        return None
+    sens = -1 if (event.num == 4 or event.delta > 0) else 1
+    deplacer_page(etat_tableau["offset"] + 3 * sens)
+    return "break"
+
+def redimensionner_tableau(event):
+    # Nombre de lignes visibles (rowheight=25, moins la ligne d'en-tête)
+    etat_tableau["lignes"] = max(1, event.height // 25 - 1)
+    if etat_tableau["virtuel"]:
+        afficher_page()
+
+def trier_tableau(colonne):
+    cle = cles_tri_colonnes[colonne]
+    etat_tableau["inverse"] = etat_tableau["tri"] == cle and not etat_tableau["inverse"]
+    etat_tableau["tri"] = cle
+    if etat_tableau["virtuel"]:
+        deplacer_page(0)
+    else:
+        # L'ordre vient des index triés de la bibliothèque, les lignes sont seulement déplacées
+        _, livres = biblio.livres_page(sort_key=cle, filtre=etat_tableau["filtre"], inverse=etat_tableau["inverse"])
+        for position, livre in enumerate(livres):
+            tableau_livres.move(livre.isbn, "", position)
+
+tableau_livres.bind("<Configure>", redimensionner_tableau)
+tableau_livres.bind("<MouseWheel>", molette_tableau)
+tableau_livres.bind("<Button-4>", molette_tableau)
+tableau_livres.bind("<Button-5>", molette_tableau)
+
+def remplir_tableau():
+    # Reconstruction complète du tableau livres (chargement initial, nouvelle recherche)
+    etat_tableau["virtuel"] = len(biblio.livres) > SEUIL_TABLEAU_VIRTUEL
+    if etat_tableau["virtuel"]:
+        tableau_livres.configure(yscrollcommand="")
+        defilement_tableau.configure(command=defiler_virtuel)
+        afficher_page()
+    else:
+        tableau_livres.configure(yscrollcommand=defilement_tableau.set)
+        defilement_tableau.configure(command=tableau_livres.yview)
+        tableau_livres.delete(*tableau_livres.get_children())
+        _, livres = biblio.livres_page(sort_key=etat_tableau["tri"], filtre=etat_tableau["filtre"],
+                                       inverse=etat_tableau["inverse"])
+        for livre in livres:
+            tableau_livres.insert("", "end", iid=livre.isbn, values=valeurs_ligne(livre))
+
+def maj_tout():
+    planifier("tableau", "disponibles", "empruntes")
+
+def appliquer_recherche(event=None):
+    # Filtre le tableau via l'index de recherche de la bibliothèque
+    requete = recherche_entry.get()
+    etat_tableau["filtre"] = biblio.rechercher(requete) if requete.strip() else None
+    etat_tableau["offset"] = 0
+    remplir_tableau()
+
+def sur_frappe_recherche(event=None):
+    if etat_rafraichissement["frappe"] is not None:
+        fenetre.after_cancel(etat_rafraichissement["frappe"])
+    etat_rafraichissement["frappe"] = fenetre.after(DELAI_RECHERCHE_MS, fin_frappe_recherche)
+
+def fin_frappe_recherche():
+    etat_rafraichissement["frappe"] = None
+    planifier("recherche")
+
+recherche_entry.bind("<KeyRelease>", sur_frappe_recherche)
+
+def sur_changement_biblio(objet, action, cle):
+    # Mise à jour incrémentale, différée : seules les vues touchées sont marquées
+    if objet in ("membre", "reservation"):
+        planifier("empruntes")
+        return
+    if objet != "livre":
+        return
+    if action == "rechargement":
+        # Opération en masse : le tableau est reconstruit une seule fois
+        planifier("recherche" if etat_tableau["filtre"] is not None else "tableau", "disponibles")
+    elif etat_tableau["filtre"] is not None and action != "modification":
+        # Un livre ajouté ou supprimé peut entrer ou sortir du résultat de recherche
+        planifier("recherche", "disponibles")
+    elif etat_tableau["virtuel"]:
+        planifier("page", "disponibles")
+    else:
+        planifier("disponibles", lignes=(cle,))
+
+# Un retour a passé le livre au premier membre de sa file d'attente
+def sur_reservation_attribuee(objet, action, cle):
+    if objet == "reservation" and action == "attribution":
+        membre = biblio.emprunteur(cle)  # cle : code-barres de l'exemplaire attribué
+        if membre is not None:
+            afficher_message(f"Livre {biblio.livre_de(cle)} réservé : attribué à {membre.nom} ({membre.id_membre}).")
+
+# Rafraîchissements de l'interface mesurés sous le nom interface.<fonction> (toujours appelés par leur nom)
+if instrumentation is not None:
+    for nom in ("executer_rafraichissements", "remplir_tableau", "afficher_page", "maj_ligne",
+                "rafraichir_livres_disponibles", "remplir_livres_disponibles", "rafraichir_livres_empruntes",
+                "appliquer_recherche", "preparer_graphique", "attendre_graphique"):
+        globals()[nom] = instrumentation.envelopper(globals()[nom], f"interface.{nom}")
 
 # Chargement initial des données
-biblio = Bibliotheque()
+biblio = Bibliotheque(journalise=True, partage=True, instantane_binaire=True, instrumentation=instrumentation)
 biblio.charger()
+biblio.abonner(sur_changement_biblio)
+biblio.abonner(sur_reservation_attribuee)
+analyses = Analyses(biblio)
 
 maj_tout()
 
+# Plusieurs postes peuvent partager data/ : on intègre régulièrement leurs modifications
+def synchroniser_periodiquement():
+    biblio.synchroniser()
+    fenetre.after(2000, synchroniser_periodiquement)
+
+fenetre.after(2000, synchroniser_periodiquement)
+
+# Mesure du temps de démarrage (benchmarks/demarrage_interface.py) : quitte dès la première image affichée
+if os.environ.get("BIBLIO_MESURE_DEMARRAGE"):
+    fenetre.after_idle(lambda: (print("premiere_image", flush=True), fenetre.destroy()))
+
 fenetre.mainloop()
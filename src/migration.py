@@ -0,0 +1,48 @@
+import os
+import argparse
+from src.bibliotheque import Bibliotheque
+from src.stockage import StockageTexte, StockageSQLite
+
+
+def migrer(source, destination, data_dir=None):
+    """
+    Copie tout le contenu d'un moteur de stockage vers un autre
+    (livres et exemplaires, membres, prêts, réservations, historique).
+    L'historique est transmis en flux, sans être chargé en mémoire.
+    :param source: Stockage à lire
+    :param destination: Stockage à remplacer
+    :param data_dir: dossier de statistiques.json pour la source (par défaut celui de la source :
+        son dossier de fichiers texte, ou celui de la base SQLite)
+    :return: la Bibliotheque chargée depuis la source
+    """
+    if data_dir is None:
+        data_dir = source.data_dir if isinstance(source, StockageTexte) else os.path.dirname(os.path.abspath(source.chemin))
+    # Chargement complet : les prêts antérieurs aux dates d'emprunt les retrouvent dans l'historique
+    biblio = Bibliotheque(stockage=source, data_dir=data_dir)
+    biblio.charger()
+    destination.attacher(biblio)
+    destination.remplacer(biblio.livres.values(), biblio.membres.values(), source.historique(), biblio.prets.values(),
+                          biblio.reservations.items(), biblio.exemplaires.values())
+    return biblio
+
+
+def main(argv=None):
+    dossier_defaut = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
+    parser = argparse.ArgumentParser(description="Migration des données entre fichiers texte et SQLite.")
+    parser.add_argument("sens", choices=["vers-sqlite", "vers-texte"])
+    parser.add_argument("--data-dir", default=dossier_defaut, help="dossier des fichiers texte")
+    parser.add_argument("--base", default=None, help="fichier SQLite (par défaut <data-dir>/bibliotheque.db)")
+    args = parser.parse_args(argv)
+
+    texte = StockageTexte(args.data_dir)
+    sqlite = StockageSQLite(args.base or os.path.join(args.data_dir, "bibliotheque.db"))
+    if args.sens == "vers-sqlite":
+        biblio = migrer(texte, sqlite, args.data_dir)
+    else:
+        biblio = migrer(sqlite, texte, args.data_dir)
+    sqlite.fermer()
+    print(f"{len(biblio.livres)} livre(s) et {len(biblio.membres)} membre(s) migrés ({args.sens}).")
+
+
+if __name__ == "__main__":
+    main()
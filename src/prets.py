@@ -0,0 +1,104 @@
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+
+# Horodatages au format de l'historique : l'ordre des chaînes est celui des dates
+FORMAT_DATE = "%Y-%m-%d %H:%M:%S"
+DUREE_PRET = timedelta(days=14)  # Durée d'un emprunt et de chaque renouvellement
+RENOUVELLEMENTS_MAX = 2
+
+
+def maintenant():
+    return datetime.now().strftime(FORMAT_DATE)
+
+
+# Échéance d'un prêt commencé (ou prolongé) à la date donnée
+def echeance_depuis(date):
+    return (datetime.fromisoformat(date) + DUREE_PRET).strftime(FORMAT_DATE)
+
+
+class Pret:
+    """
+    Emprunt en cours : livre et exemplaire (code-barres, l'ISBN pour un exemplaire unique), membre,
+    date d'emprunt, date de retour prévue et nombre de renouvellements.
+    Les dates sont des chaînes "AAAA-MM-JJ HH:MM:SS", comme dans l'historique.
+    """
+    __slots__ = ("isbn", "code", "id_membre", "date_emprunt", "echeance", "renouvellements")
+
+    def __init__(self, isbn, id_membre, date_emprunt, echeance=None, renouvellements=0, code=None):
+        self.isbn = isbn
+        self.code = code or isbn
+        self.id_membre = id_membre
+        self.date_emprunt = date_emprunt
+        self.echeance = echeance or echeance_depuis(date_emprunt)
+        self.renouvellements = int(renouvellements)
+
+    def en_retard(self, date=None):
+        return self.echeance < (date or maintenant())
+
+    # Nombre de jours entiers écoulés depuis l'échéance (0 si le prêt n'est pas en retard)
+    def jours_de_retard(self, date=None):
+        ecart = datetime.fromisoformat(date or maintenant()) - datetime.fromisoformat(self.echeance)
+        return max(0, ecart.days)
+
+    def __str__(self):
+        return f"{self.code} emprunté par {self.id_membre}, à rendre le {self.echeance[:10]}"
+
+
+class Echeancier:
+    """
+    Prêts en cours par code-barres d'exemplaire, doublés d'un index trié par échéance [(echeance, code)]
+    tenu à jour à chaque emprunt, retour et renouvellement.
+    Les prêts en retard ou arrivant à échéance dans une période se lisent par dichotomie :
+    O(log n + k) pour k prêts retenus, sans parcourir le catalogue ni l'historique.
+    """
+
+    def __init__(self):
+        self._prets = {}
+        self._par_echeance = []
+
+    def __len__(self):
+        return len(self._prets)
+
+    def __contains__(self, code):
+        return code in self._prets
+
+    def __getitem__(self, code):
+        return self._prets[code]
+
+    def get(self, code, defaut=None):
+        return self._prets.get(code, defaut)
+
+    def values(self):
+        return self._prets.values()
+
+    # Ajoute un prêt (remplace celui du même exemplaire s'il existe)
+    def ajouter(self, pret):
+        self.retirer(pret.code)
+        self._prets[pret.code] = pret
+        insort(self._par_echeance, (pret.echeance, pret.code))
+
+    # Retire et retourne le prêt d'un exemplaire, ou None
+    def retirer(self, code):
+        pret = self._prets.pop(code, None)
+        if pret is not None:
+            i = bisect_left(self._par_echeance, (pret.echeance, code))
+            del self._par_echeance[i]
+        return pret
+
+    # Reporte l'échéance d'un prêt en gardant l'index trié
+    def prolonger(self, code, echeance, renouvellements):
+        pret = self.retirer(code)
+        pret.echeance = echeance
+        pret.renouvellements = int(renouvellements)
+        self.ajouter(pret)
+        return pret
+
+    # Prêts dont l'échéance tombe entre debut (inclus) et fin (exclue), par échéance croissante
+    def echeances(self, debut=None, fin=None):
+        i = 0 if debut is None else bisect_left(self._par_echeance, (debut,))
+        j = len(self._par_echeance) if fin is None else bisect_left(self._par_echeance, (fin,))
+        return [self._prets[code] for _, code in self._par_echeance[i:j]]
+
+    # Prêts en retard à la date donnée (maintenant par défaut), du plus ancien au plus récent
+    def en_retard(self, date=None):
+        return self.echeances(fin=date or maintenant())
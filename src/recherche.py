@@ -0,0 +1,99 @@
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from itertools import islice
+
+# Parcours borné du dernier mot (saisie en cours) : au-delà de ce nombre d'ISBN parcourus, la recherche
+# par préfixe s'arrête. Le préfixe d'une ou deux lettres d'un grand catalogue couvre une bonne partie
+# de ses jetons : il donne alors les premiers résultats plutôt que de bloquer la frappe sur une union
+# de centaines de milliers d'entrées, et le résultat complet vient avec les lettres suivantes
+UNION_PREFIXE_MAX = 50000
+
+
+# Découpe un texte en jetons normalisés : minuscules, accents retirés ("Misérables" -> "miserables")
+def normaliser(texte):
+    decompose = unicodedata.normalize("NFKD", texte)
+    sans_accents = "".join(c for c in decompose if not unicodedata.combining(c))
+    return re.findall(r"\w+", sans_accents.casefold())
+
+
+class IndexRecherche:
+    """
+    Index inversé jeton -> ensemble d'ISBN sur les titres, auteurs et genres.
+    Les jetons sont aussi gardés triés pour retrouver tous ceux qui commencent par un préfixe.
+    """
+
+    def __init__(self):
+        self._postings = {}  # jeton -> ensemble d'ISBN
+        self._jetons = []    # jetons triés pour la recherche par préfixe
+
+    # Jetons indexés pour un livre
+    def _jetons_livre(self, livre):
+        return set(normaliser(f"{livre.titre} {livre.auteur} {livre.genre}"))
+
+    def ajouter(self, livre):
+        for jeton in self._jetons_livre(livre):
+            isbns = self._postings.get(jeton)
+            if isbns is None:
+                isbns = self._postings[jeton] = set()
+                insort(self._jetons, jeton)
+            isbns.add(livre.isbn)
+
+    def retirer(self, livre):
+        for jeton in self._jetons_livre(livre):
+            isbns = self._postings.get(jeton)
+            if isbns is None:
+                continue
+            isbns.discard(livre.isbn)
+            if not isbns:
+                del self._postings[jeton]
+                del self._jetons[bisect_left(self._jetons, jeton)]
+
+    # ISBN des livres dont un jeton commence par prefixe (restreints à filtre s'il est donné), le jeton
+    # égal au préfixe en premier ; le parcours s'arrête après UNION_PREFIXE_MAX ISBN (résultat partiel)
+    def _prefixe(self, prefixe, filtre=None):
+        debut = bisect_left(self._jetons, prefixe)
+        fin = bisect_left(self._jetons, prefixe + "\U0010ffff")
+        resultat, parcourus = set(), 0
+        for i in range(debut, fin):
+            isbns = self._postings[self._jetons[i]]
+            reste = UNION_PREFIXE_MAX - parcourus
+            if filtre is None:
+                if len(isbns) > reste:
+                    resultat.update(islice(isbns, reste))  # Dernier jeton pris en partie
+                    break
+                resultat |= isbns
+                parcourus += len(isbns)
+                continue
+            # L'intersection ne parcourt que le plus petit des deux ensembles
+            petit, grand = (isbns, filtre) if len(isbns) <= len(filtre) else (filtre, isbns)
+            if len(petit) > reste:
+                resultat.update(isbn for isbn in islice(petit, reste) if isbn in grand)
+                break
+            resultat |= petit & grand
+            parcourus += len(petit)
+        return resultat
+
+    def rechercher(self, requete):
+        """
+        Retourne l'ensemble des ISBN correspondant à tous les mots de la requête.
+        Les mots complets sont cherchés exactement, le dernier mot comme préfixe (saisie en cours) ;
+        pour un préfixe très répandu, le résultat est partiel (voir UNION_PREFIXE_MAX).
+        L'ensemble retourné est une copie : l'appelant peut le garder ou le modifier.
+        :param requete: texte saisi par l'utilisateur
+        """
+        jetons = normaliser(requete)
+        if not jetons:
+            return set()
+        if requete[-1:].isspace():
+            mots, prefixe = jetons, None
+        else:
+            mots, prefixe = jetons[:-1], jetons[-1]
+        if not mots:
+            return self._prefixe(prefixe)
+        # L'intersection ne parcourt que le plus petit ensemble ; elle en fait une copie
+        ensembles = sorted((self._postings.get(jeton, set()) for jeton in mots), key=len)
+        if prefixe is None:
+            return ensembles[0].intersection(*ensembles[1:])
+        filtre = ensembles[0].intersection(*ensembles[1:]) if len(ensembles) > 1 else ensembles[0]
+        return self._prefixe(prefixe, filtre) if filtre else set()
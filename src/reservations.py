@@ -0,0 +1,90 @@
+from collections import deque
+
+
+class FilesAttente:
+    """
+    Réservations des livres empruntés : une file FIFO de membres par ISBN,
+    doublée d'un index par membre pour lister ses réservations sans parcourir toutes les files.
+    """
+
+    def __init__(self):
+        self._files = {}       # isbn -> deque des ID membres, le premier arrivé en tête
+        self._par_membre = {}  # id_membre -> {isbn: None}, dans l'ordre des réservations
+
+    def __len__(self):
+        return sum(len(file) for file in self._files.values())
+
+    def __contains__(self, cle):
+        isbn, id_membre = cle
+        return isbn in self._par_membre.get(id_membre, ())
+
+    # Ajoute un membre en queue de la file d'un livre
+    def ajouter(self, isbn, id_membre):
+        if (isbn, id_membre) in self:
+            return
+        self._files.setdefault(isbn, deque()).append(id_membre)
+        self._par_membre.setdefault(id_membre, {})[isbn] = None
+
+    # Retire une réservation ; retourne False si elle n'existait pas
+    def retirer(self, isbn, id_membre):
+        if (isbn, id_membre) not in self:
+            return False
+        self._files[isbn].remove(id_membre)
+        if not self._files[isbn]:
+            del self._files[isbn]
+        self._oublier(isbn, id_membre)
+        return True
+
+    def _oublier(self, isbn, id_membre):
+        reservations = self._par_membre[id_membre]
+        del reservations[isbn]
+        if not reservations:
+            del self._par_membre[id_membre]
+
+    # Retire et retourne le premier membre de la file pour qui eligible(id_membre) est vrai, ou None.
+    # Les membres passés gardent leur place : en général c'est la tête de file, en O(1)
+    def prochain(self, isbn, eligible=lambda id_membre: True):
+        file = self._files.get(isbn)
+        if not file:
+            return None
+        for i, id_membre in enumerate(file):
+            if eligible(id_membre):
+                if i == 0:
+                    file.popleft()
+                else:
+                    del file[i]
+                if not file:
+                    del self._files[isbn]
+                self._oublier(isbn, id_membre)
+                return id_membre
+        return None
+
+    # Membres en attente d'un livre, le prochain servi en premier
+    def file(self, isbn):
+        return list(self._files.get(isbn, ()))
+
+    # Rang (à partir de 1) d'un membre dans la file d'un livre, ou None
+    def position(self, isbn, id_membre):
+        if (isbn, id_membre) not in self:
+            return None
+        return self._files[isbn].index(id_membre) + 1
+
+    # ISBN réservés par un membre, dans l'ordre de ses réservations
+    def du_membre(self, id_membre):
+        return list(self._par_membre.get(id_membre, ()))
+
+    # Supprime la file d'un livre retiré du catalogue
+    def retirer_livre(self, isbn):
+        for id_membre in self._files.pop(isbn, ()):
+            self._oublier(isbn, id_membre)
+
+    # Supprime les réservations d'un membre désinscrit
+    def retirer_membre(self, id_membre):
+        for isbn in self._par_membre.pop(id_membre, ()):
+            self._files[isbn].remove(id_membre)
+            if not self._files[isbn]:
+                del self._files[isbn]
+
+    # Files non vides : (isbn, [ID membres dans l'ordre]) pour la sauvegarde
+    def items(self):
+        return ((isbn, list(file)) for isbn, file in self._files.items())
@@ -0,0 +1,266 @@
+import sys
+import json
+import argparse
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from src.bibliotheque import Bibliotheque
+from src.cli import (creer_bibliotheque, livre_vers_enregistrement, livre_depuis_enregistrement,
+                     retards_vers_enregistrements)
+from src.exceptions import LivreInexistantError, LivreIndisponibleError, MembreInexistantError, QuotaEmpruntDepasseError
+from src.prets import FORMAT_DATE
+
+TAILLE_CORPS_MAX = 1 << 20  # Octets acceptés dans le corps d'une requête
+
+
+# Requête mal formée (corps, champ ou paramètre invalide), distincte des erreurs métier : réponse 400
+class RequeteInvalideError(Exception):
+    pass
+
+
+# Code HTTP renvoyé pour chaque erreur (la première classe qui correspond l'emporte)
+CODES_ERREURS = {
+    RequeteInvalideError: 400,
+    LivreInexistantError: 404,
+    MembreInexistantError: 404,
+    LivreIndisponibleError: 409,
+    QuotaEmpruntDepasseError: 409,
+    ValueError: 409,
+}
+_OBLIGATOIRE = object()
+
+
+# Champ texte du corps d'une requête ; defaut s'il est absent (obligatoire sinon)
+def _champ(corps, cle, defaut=_OBLIGATOIRE):
+    if cle not in corps:
+        if defaut is _OBLIGATOIRE:
+            raise RequeteInvalideError(f"Champ manquant : {cle}")
+        return defaut
+    if not isinstance(corps[cle], str):
+        raise RequeteInvalideError(f"Champ {cle} : texte attendu.")
+    return corps[cle]
+
+
+# Paramètre entier positif ou nul de la chaîne de requête
+def _entier(parametres, cle, defaut):
+    try:
+        valeur = int(parametres.get(cle, defaut))
+    except ValueError:
+        valeur = -1
+    if valeur < 0:
+        raise RequeteInvalideError(f"Paramètre {cle} : entier positif attendu.")
+    return valeur
+
+
+class ServeurBibliotheque(ThreadingHTTPServer):
+    """
+    Serveur HTTP/JSON multi-thread autour d'une Bibliotheque partagée entre plusieurs postes.
+    Toutes les opérations passent par le verrou de la bibliothèque : deux emprunts simultanés
+    du même livre sont exécutés l'un après l'autre et le second échoue proprement.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, adresse, biblio):
+        super().__init__(adresse, GestionnaireRequetes)
+        self.biblio = biblio
+
+
+class GestionnaireRequetes(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Connexions persistantes
+    disable_nagle_algorithm = True  # En-têtes et corps partent sans attendre l'accusé de réception
+
+    # Routes : (méthode, premier segment du chemin) -> nom de la méthode
+    ROUTES = {
+        ("GET", "livres"): "lister_livres",
+        ("POST", "livres"): "ajouter_livre",
+        ("POST", "exemplaires"): "ajouter_exemplaire",
+        ("POST", "emprunts"): "emprunter",
+        ("POST", "retours"): "retourner",
+        ("POST", "renouvellements"): "renouveler",
+        ("POST", "reservations"): "reserver",
+        ("GET", "reservations"): "lister_reservations",
+        ("GET", "retards"): "lister_retards",
+        ("GET", "stats"): "statistiques",
+    }
+
+    def do_GET(self):
+        self._traiter("GET")
+
+    def do_POST(self):
+        self._traiter("POST")
+
+    def log_message(self, format, *args):
+        pass  # Pas de trace par requête
+
+    def _traiter(self, methode):
+        url = urlparse(self.path)
+        segments = [s for s in url.path.split("/") if s]
+        route = self.ROUTES.get((methode, segments[0] if segments else ""))
+        if route is None:
+            self._repondre(404, {"erreur": "Ressource inconnue."})
+            return
+        corps = {}
+        if methode == "POST":
+            try:
+                longueur = int(self.headers.get("Content-Length", 0))
+            except ValueError:
+                longueur = -1
+            if not 0 <= longueur <= TAILLE_CORPS_MAX:
+                # Corps non lu : la connexion ne peut plus servir d'autre requête
+                self.close_connection = True
+                if longueur < 0:
+                    self._repondre(400, {"erreur": "Content-Length invalide."})
+                else:
+                    self._repondre(413, {"erreur": "Corps de requête trop volumineux."})
+                return
+            try:
+                corps = json.loads(self.rfile.read(longueur) or b"{}")
+            except ValueError:
+                self._repondre(400, {"erreur": "Corps JSON invalide."})
+                return
+        if not isinstance(corps, dict):
+            self._repondre(400, {"erreur": "Le corps doit être un objet JSON."})
+            return
+        parametres = {cle: valeurs[-1] for cle, valeurs in parse_qs(url.query).items()}
+        try:
+            with self.server.biblio.verrou:
+                code, reponse = getattr(self, route)(segments[1:], parametres, corps)
+        except KeyError as e:
+            code, reponse = 400, {"erreur": f"Champ manquant : {e}"}
+        except tuple(CODES_ERREURS) as e:
+            code = next(c for classe, c in CODES_ERREURS.items() if isinstance(e, classe))
+            reponse = {"erreur": str(e)}
+        self._repondre(code, reponse)
+
+    def _repondre(self, code, contenu):
+        donnees = json.dumps(contenu, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(donnees)))
+        self.end_headers()
+        self.wfile.write(donnees)
+
+    # GET /livres[/<isbn>]?q=texte&offset=0&limit=50&tri=titre
+    def lister_livres(self, segments, parametres, corps):
+        biblio = self.server.biblio
+        if segments:
+            if segments[0] not in biblio.livres:
+                raise LivreInexistantError("Livre inexistant.")
+            return 200, livre_vers_enregistrement(biblio, biblio.livres[segments[0]])
+        requete = parametres.get("q", "")
+        tri = parametres.get("tri", "isbn")
+        if tri not in Bibliotheque.CLES_TRI:
+            raise RequeteInvalideError(f"Paramètre tri : une valeur parmi {', '.join(Bibliotheque.CLES_TRI)} attendue.")
+        total, page = biblio.livres_page(
+            _entier(parametres, "offset", 0), _entier(parametres, "limit", 50), tri,
+            filtre=biblio.rechercher(requete) if requete.strip() else None
+        )
+        return 200, {"total": total, "livres": [livre_vers_enregistrement(biblio, livre) for livre in page]}
+
+    # POST /livres {"isbn", "titre", "auteur", "annee", "genre"}
+    def ajouter_livre(self, segments, parametres, corps):
+        livre = livre_depuis_enregistrement(corps)
+        if isinstance(livre, Exception):
+            raise RequeteInvalideError(str(livre))
+        self.server.biblio.ajouter_livre(livre)
+        return 201, livre_vers_enregistrement(self.server.biblio, livre)
+
+    # POST /exemplaires {"isbn"[, "code", "localisation"]}
+    def ajouter_exemplaire(self, segments, parametres, corps):
+        exemplaire = self.server.biblio.ajouter_exemplaire(_champ(corps, "isbn"), _champ(corps, "code", None),
+                                                           _champ(corps, "localisation", ""))
+        return 201, {"code": exemplaire.code, "isbn": exemplaire.isbn, "localisation": exemplaire.localisation,
+                     "exemplaires": self.server.biblio.livres[exemplaire.isbn].exemplaires}
+
+    # POST /emprunts {"isbn" (ou code-barres d'un exemplaire), "id_membre"}
+    def emprunter(self, segments, parametres, corps):
+        pret = self.server.biblio.emprunter_livre(_champ(corps, "isbn"), _champ(corps, "id_membre"))
+        return 200, {"isbn": pret.isbn, "code": pret.code, "id_membre": pret.id_membre, "statut": "emprunte",
+                     "echeance": pret.echeance}
+
+    # POST /retours {"isbn", "id_membre"} : le livre passe au réservataire suivant s'il y en a un
+    def retourner(self, segments, parametres, corps):
+        isbn, id_membre = _champ(corps, "isbn"), _champ(corps, "id_membre")
+        suivant = self.server.biblio.retourner_livre(isbn, id_membre)
+        return 200, {"isbn": isbn, "id_membre": id_membre,
+                     "statut": "disponible" if suivant is None else "emprunte", "attribue_a": suivant}
+
+    # POST /renouvellements {"isbn", "id_membre"}
+    def renouveler(self, segments, parametres, corps):
+        pret = self.server.biblio.renouveler_pret(_champ(corps, "isbn"), _champ(corps, "id_membre"))
+        return 200, {"isbn": pret.isbn, "id_membre": pret.id_membre, "echeance": pret.echeance,
+                     "renouvellements": pret.renouvellements}
+
+    # POST /reservations {"isbn", "id_membre"[, "annuler": true]}
+    def reserver(self, segments, parametres, corps):
+        biblio = self.server.biblio
+        isbn, id_membre = _champ(corps, "isbn"), _champ(corps, "id_membre")
+        if corps.get("annuler"):
+            biblio.annuler_reservation(isbn, id_membre)
+            return 200, {"isbn": isbn, "id_membre": id_membre, "rang": None}
+        rang = biblio.reserver_livre(isbn, id_membre)
+        return 201, {"isbn": isbn, "id_membre": id_membre, "rang": rang}
+
+    # GET /reservations/<isbn> : file d'attente d'un livre ; GET /reservations?id_membre=M001 : réservations d'un membre
+    def lister_reservations(self, segments, parametres, corps):
+        biblio = self.server.biblio
+        if segments:
+            if segments[0] not in biblio.livres:
+                raise LivreInexistantError("Livre inexistant.")
+            return 200, {"isbn": segments[0], "file": biblio.reservations.file(segments[0])}
+        id_membre = parametres["id_membre"]
+        if id_membre not in biblio.membres:
+            raise MembreInexistantError("Membre inexistant.")
+        return 200, {"id_membre": id_membre, "reservations": [
+            {"isbn": isbn, "rang": rang} for isbn, rang in biblio.reservations_membre(id_membre)
+        ]}
+
+    # GET /retards?date=AAAA-MM-JJ HH:MM:SS : prêts en retard, le plus ancien d'abord
+    def lister_retards(self, segments, parametres, corps):
+        date = parametres.get("date")
+        if date is not None:
+            try:
+                date = datetime.fromisoformat(date).strftime(FORMAT_DATE)
+            except ValueError:
+                raise RequeteInvalideError("Paramètre date : AAAA-MM-JJ[ HH:MM:SS] attendu.")
+        retards = list(retards_vers_enregistrements(self.server.biblio, date))
+        return 200, {"total": len(retards), "retards": retards}
+
+    # GET /stats : genres, top 10 auteurs et emprunts des 30 derniers jours
+    def statistiques(self, segments, parametres, corps):
+        stats = self.server.biblio.statistiques
+        fin = datetime.now().date()
+        jours, valeurs = stats.emprunts_par_jour(fin - timedelta(days=30), fin)
+        return 200, {
+            "livres": len(self.server.biblio.livres),
+            "membres": len(self.server.biblio.membres),
+            "genres": dict(stats.par_genre),
+            "top_auteurs": stats.top_auteurs(10),
+            "emprunts_30j": {jour.strftime("%Y-%m-%d"): valeur for jour, valeur in zip(jours, valeurs)},
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Service HTTP/JSON de la bibliothèque (sans interface Tk).")
+    parser.add_argument("--hote", default="127.0.0.1", help="adresse d'écoute (localhost par défaut)")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--data-dir", default=None, help="dossier des données (par défaut data/)")
+    parser.add_argument("--sqlite", default=None, help="utiliser cette base SQLite au lieu des fichiers texte")
+    args = parser.parse_args(argv)
+
+    biblio = creer_bibliotheque(args)
+    serveur = ServeurBibliotheque((args.hote, args.port), biblio)
+    print(f"Bibliothèque servie sur http://{args.hote}:{args.port}/")
+    try:
+        serveur.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        serveur.server_close()
+        biblio.sauvegarder()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
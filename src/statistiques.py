@@ -0,0 +1,73 @@
+import os
+import json
+from collections import Counter
+from datetime import timedelta
+
+
+class Statistiques:
+    """
+    Agrégats maintenus au fil des opérations pour que les graphiques ne parcourent
+    ni tout le catalogue ni tout l'historique :
+    - par_jour : jour "AAAA-MM-JJ" -> [nombre d'emprunts, nombre de retours]
+    - par_genre / par_auteur : nombre de livres du catalogue par genre et par auteur
+    """
+
+    def __init__(self):
+        self.par_jour = {}
+        self.par_genre = Counter()
+        self.par_auteur = Counter()
+
+    # Compte une action d'historique ("emprunt" ou "retour")
+    def enregistrer_action(self, date_action, action):
+        compteurs = self.par_jour.setdefault(date_action[:10], [0, 0])
+        compteurs[0 if action == "emprunt" else 1] += 1
+
+    def ajouter_livre(self, livre):
+        self.par_genre[livre.genre] += 1
+        self.par_auteur[livre.auteur] += 1
+
+    def retirer_livre(self, livre):
+        for compteur, cle in ((self.par_genre, livre.genre), (self.par_auteur, livre.auteur)):
+            compteur[cle] -= 1
+            if compteur[cle] <= 0:
+                del compteur[cle]
+
+    # Recalcule les compteurs du catalogue
+    def reconstruire_catalogue(self, livres):
+        self.par_genre = Counter(livre.genre for livre in livres)
+        self.par_auteur = Counter(livre.auteur for livre in livres)
+
+    # Recalcule les compteurs journaliers en un seul parcours de l'historique
+    def reconstruire_historique(self, historique):
+        self.par_jour = {}
+        for entree in historique:
+            self.enregistrer_action(entree[0], entree[3])
+
+    # Nombre d'emprunts pour chaque jour entre debut et fin inclus : (jours, valeurs)
+    def emprunts_par_jour(self, debut, fin):
+        jours = [debut + timedelta(days=i) for i in range((fin - debut).days + 1)]
+        valeurs = [self.par_jour.get(jour.strftime("%Y-%m-%d"), (0, 0))[0] for jour in jours]
+        return jours, valeurs
+
+    # Les n auteurs ayant le plus de livres
+    def top_auteurs(self, n=10):
+        return self.par_auteur.most_common(n)
+
+    # Écrit les compteurs journaliers avec la signature de l'historique qu'ils résument
+    def sauvegarder(self, chemin, signature):
+        temporaire = chemin + ".tmp"
+        with open(temporaire, "w", encoding="utf-8") as f:
+            json.dump({"signature": signature, "par_jour": self.par_jour}, f)
+        os.replace(temporaire, chemin)
+
+    # Relit les compteurs journaliers ; retourne la signature de l'historique qu'ils résument
+    # (None sans fichier lisible : rien n'est chargé)
+    def charger(self, chemin):
+        try:
+            with open(chemin, "r", encoding="utf-8") as f:
+                contenu = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        self.par_jour = contenu["par_jour"]
+        return contenu.get("signature")
+
@@ -0,0 +1,1023 @@
+import io
+import os
+import csv
+import json
+import atexit
+import sqlite3
+import threading
+import zlib
+from bisect import bisect_left
+from contextlib import nullcontext
+from datetime import date as date_type
+from src.instantane import Instantane, LivresMappes, ecrire_instantane, signature_source
+from src.prets import Pret
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+# Ramène une borne de date (date, datetime ou chaîne) au jour "AAAA-MM-JJ"
+def _jour(valeur):
+    if valeur is None:
+        return None
+    if isinstance(valeur, date_type):
+        return valeur.strftime("%Y-%m-%d")
+    return str(valeur)[:10]
+
+
+class VerrouFichier:
+    """
+    Verrou consultatif exclusif entre processus, posé sur un fichier dédié.
+    Réentrant dans un même processus : seul le premier niveau prend le verrou système.
+    """
+
+    def __init__(self, chemin):
+        self.chemin = chemin
+        self._fichier = None
+        self._profondeur = 0
+
+    def __enter__(self):
+        if self._profondeur == 0:
+            self._fichier = open(self.chemin, "a+b")
+            if fcntl is not None:
+                fcntl.flock(self._fichier.fileno(), fcntl.LOCK_EX)
+            else:
+                self._fichier.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(self._fichier.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        continue  # LK_LOCK abandonne après 10 s : on réessaie
+        self._profondeur += 1
+        return self
+
+    def __exit__(self, *exc):
+        self._profondeur -= 1
+        if self._profondeur == 0:
+            if fcntl is not None:
+                fcntl.flock(self._fichier.fileno(), fcntl.LOCK_UN)
+            else:
+                self._fichier.seek(0)
+                msvcrt.locking(self._fichier.fileno(), msvcrt.LK_UNLCK, 1)
+            self._fichier.close()
+            self._fichier = None
+
+
+class EcrivainHistorique:
+    """
+    Ajoute les lignes de historique.csv par lots, le fichier restant ouvert.
+    Les lignes en attente sont écrites dès que taille_lot lignes sont accumulées, au plus tard
+    delai_ms millisecondes après la première (par un minuteur en arrière-plan), à chaque appel
+    de vider() et à l'arrêt du programme. sur_ecriture(chemin, octets) est appelée après chaque écriture.
+    """
+
+    def __init__(self, chemin, taille_lot=100, delai_ms=1000, sur_ecriture=None):
+        self.chemin = chemin
+        self.sur_ecriture = sur_ecriture
+        self.taille_lot = max(1, taille_lot)
+        self.delai_ms = delai_ms
+        self._fichier = None
+        self._tampon = io.StringIO()
+        self._writer = csv.writer(self._tampon)
+        self._en_attente = 0
+        self._minuteur = None
+        self._verrou = threading.Lock()
+        self._inscrit = False  # vider() enregistré auprès d'atexit
+
+    def ecrire(self, ligne):
+        with self._verrou:
+            if not self._inscrit:
+                # Réinscrit après fermer() : l'écrivain sert encore après un remplacer()
+                atexit.register(self.vider)
+                self._inscrit = True
+            self._writer.writerow(ligne)
+            self._en_attente += 1
+            if self._en_attente >= self.taille_lot:
+                self._vider()
+            elif self._minuteur is None and self.delai_ms:
+                self._minuteur = threading.Timer(self.delai_ms / 1000, self.vider)
+                self._minuteur.daemon = True
+                self._minuteur.start()
+
+    # Écrit les lignes en attente en un seul appel système (mode ajout : pas de mélange entre processus) ;
+    # avec synchroniser, attend aussi qu'elles soient sur disque
+    def vider(self, synchroniser=False):
+        with self._verrou:
+            self._vider()
+            if synchroniser and self._fichier is not None:
+                os.fsync(self._fichier.fileno())
+
+    def _vider(self):
+        if self._minuteur is not None:
+            self._minuteur.cancel()
+            self._minuteur = None
+        if not self._en_attente:
+            return
+        if self._fichier is None:
+            self._fichier = open(self.chemin, "ab", buffering=0)
+        ecrits = self._fichier.write(self._tampon.getvalue().encode("utf-8"))
+        if self.sur_ecriture is not None:
+            self.sur_ecriture(self.chemin, ecrits)
+        self._tampon.seek(0)
+        self._tampon.truncate()
+        self._en_attente = 0
+
+    # Vide le tampon et ferme le fichier (avant qu'il soit remplacé, ou à la fermeture) ;
+    # se désinscrit d'atexit pour que l'écrivain ne reste pas référencé jusqu'à l'arrêt
+    def fermer(self):
+        with self._verrou:
+            self._vider()
+            if self._inscrit:
+                atexit.unregister(self.vider)
+                self._inscrit = False
+            if self._fichier is not None:
+                self._fichier.close()
+                self._fichier = None
+
+
+class Stockage:
+    """
+    Interface commune des moteurs de stockage de la bibliothèque.
+    Le moteur reçoit chaque mutation déjà validée par Bibliotheque et la rend durable.
+    """
+
+    def attacher(self, biblio):
+        self.biblio = biblio
+
+    # Compte les octets écrits dans un fichier si la bibliothèque est instrumentée
+    def _compter_octets(self, chemin, octets):
+        instrumentation = getattr(getattr(self, "biblio", None), "instrumentation", None)
+        if instrumentation is not None:
+            instrumentation.octets(octets, os.path.basename(chemin))
+
+    # Remplit biblio.livres (et leurs exemplaires déclarés, via biblio._attacher_exemplaire),
+    # biblio.membres (avec leurs emprunts en cours), biblio.prets, biblio.reservations
+    # ainsi que les compteurs du catalogue de biblio.statistiques
+    def charger(self):
+        raise NotImplementedError
+
+    def ajouter_livre(self, livre):
+        raise NotImplementedError
+
+    def supprimer_livre(self, isbn):
+        raise NotImplementedError
+
+    # Ajouts en masse : par défaut un ajout à la fois, les moteurs font mieux
+    def ajouter_livres(self, livres):
+        for livre in livres:
+            self.ajouter_livre(livre)
+
+    def enregistrer_membres(self, membres):
+        for membre in membres:
+            self.enregistrer_membre(membre)
+
+    def enregistrer_membre(self, membre):
+        raise NotImplementedError
+
+    def supprimer_membre(self, id_membre):
+        raise NotImplementedError
+
+    # Exemplaires déclarés d'un livre (code-barres, localisation, statut)
+    def ajouter_exemplaires(self, exemplaires):
+        raise NotImplementedError
+
+    def supprimer_exemplaire(self, code):
+        raise NotImplementedError
+
+    # Un emprunt (prêt de l'exemplaire pret.code commencé à pret.date_emprunt) ou un retour
+    # et sa ligne d'historique (ISBN du livre) forment une seule écriture
+    def emprunter(self, pret):
+        raise NotImplementedError
+
+    def retourner(self, isbn, id_membre, date, code):
+        raise NotImplementedError
+
+    # Nouvelle échéance et nombre de renouvellements d'un prêt
+    def renouveler(self, pret):
+        raise NotImplementedError
+
+    # Ajout en fin de file d'attente d'un livre, ou retrait de la file
+    # (un emprunt par le réservataire retire aussi sa réservation)
+    def reserver(self, isbn, id_membre):
+        raise NotImplementedError
+
+    def annuler_reservation(self, isbn, id_membre):
+        raise NotImplementedError
+
+    # Parcourt l'historique (date, isbn, id_membre, action) sans le charger entièrement
+    # debut et fin (inclus) limitent le parcours à une plage de jours
+    def historique(self, debut=None, fin=None):
+        raise NotImplementedError
+
+    # Valeur qui change dès que l'historique change (valide les agrégats sauvegardés)
+    def signature_historique(self):
+        raise NotImplementedError
+
+    # Entrées ajoutées à l'historique depuis la signature donnée, ou None si l'historique ne la
+    # prolonge plus (réécrit depuis) : les agrégats sauvegardés sont alors à reconstruire
+    def historique_depuis(self, signature):
+        return None
+
+    # Remplace tout le contenu du stockage (migration, import en masse)
+    def remplacer(self, livres, membres, historique, prets=(), reservations=(), exemplaires=()):
+        raise NotImplementedError
+
+    def sauvegarder(self):
+        pass
+
+    def compacter(self):
+        pass
+
+    # Verrou pris autour de chaque mutation quand plusieurs processus partagent les données
+    def verrou_processus(self):
+        return nullcontext()
+
+    # Intègre les modifications écrites par d'autres processus depuis le dernier chargement
+    def rafraichir(self):
+        pass
+
+    def fermer(self):
+        pass
+
+
+class StockageTexte(Stockage):
+    """
+    Stockage par défaut : fichiers texte séparés par ';' et historique CSV.
+    En mode journalisé, chaque mutation est ajoutée à journal.log au lieu de réécrire les fichiers.
+    Avec instantane_binaire, livres.txt est doublé d'un livres.bin projeté en mémoire au chargement
+    (voir src/instantane.py) : les livres ne sont alors construits qu'à la demande.
+    """
+
+    # Instantanés qu'une mutation peut modifier : les seuls réécrits en mode non journalisé
+    INSTANTANES_OPERATION = {
+        "livre+": ("livres",),
+        "livre-": ("livres", "exemplaires", "reservations"),
+        "exemplaire+": ("livres", "exemplaires"),
+        "exemplaire-": ("livres", "exemplaires"),
+        "membre+": ("membres",),
+        "membre-": ("membres", "prets", "reservations"),
+        "reservation+": ("reservations",),
+        "reservation-": ("reservations",),
+        "renouvellement": ("prets",),
+        # Un retour peut prêter l'exemplaire au premier réservataire
+        "emprunt": ("livres", "exemplaires", "membres", "prets", "reservations"),
+        "retour": ("livres", "exemplaires", "membres", "prets", "reservations"),
+    }
+
+    def __init__(self, data_dir, journalise=False, seuil_compactage=10000, lot_historique=100,
+                 delai_historique_ms=1000, instantane_binaire=False):
+        self.data_dir = data_dir
+        os.makedirs(self.data_dir, exist_ok=True)
+
+        self.livres_fichier = os.path.join(self.data_dir, "livres.txt")
+        self.membres_fichier = os.path.join(self.data_dir, "membres.txt")
+        self.historique_fichier = os.path.join(self.data_dir, "historique.csv")
+        self.journal_fichier = os.path.join(self.data_dir, "journal.log")
+        self.prets_fichier = os.path.join(self.data_dir, "prets.txt")
+        self.reservations_fichier = os.path.join(self.data_dir, "reservations.txt")
+        self.exemplaires_fichier = os.path.join(self.data_dir, "exemplaires.txt")
+        self.instantane_fichier = os.path.join(self.data_dir, "livres.bin")
+        self.instantane_binaire = instantane_binaire
+        self.index_historique_fichier = os.path.join(self.data_dir, "historique.idx")
+        self._ecrivain_historique = EcrivainHistorique(self.historique_fichier, lot_historique, delai_historique_ms,
+                                                       self._compter_octets)
+
+        # Index des positions de l'historique : premier octet de chaque jour, construit à la demande
+        self._idx_taille = 0
+        self._idx_jours = []
+        self._idx_positions = []
+        self._idx_monotone = True
+        self._idx_charge = False
+
+        self.journalise = journalise
+        self.seuil_compactage = seuil_compactage  # Nombre d'entrées avant compactage automatique
+        self._journal = None
+        self._nb_entrees_journal = 0
+        self._position_journal = 0  # Octets du journal déjà appliqués en mémoire
+
+        # Accès partagé entre processus
+        self._verrou = VerrouFichier(os.path.join(self.data_dir, ".verrou"))
+        self._etat_charge = None  # Identité des instantanés chargés (détecte une réécriture externe)
+
+    def charger(self):
+        biblio = self.biblio
+
+        # Charger les livres : instantané binaire à jour s'il existe, fichier texte sinon
+        instantane = self._ouvrir_instantane()
+        if instantane is not None:
+            biblio.livres = LivresMappes(instantane, biblio.Livre)
+            biblio.statistiques.par_genre, biblio.statistiques.par_auteur = instantane.resume()
+        else:
+            try:
+                with open(self.livres_fichier, "r", encoding="utf-8") as f:
+                    for ligne in f:
+                        parts = ligne.strip().split(";")
+                        if len(parts) == 6:
+                            isbn, titre, auteur, annee, genre, statut = parts
+                            biblio.livres[isbn] = biblio.Livre(isbn, titre, auteur, annee, genre, statut)
+            except FileNotFoundError:
+                pass
+            biblio.statistiques.reconstruire_catalogue(biblio.livres.values())
+
+        # Charger les exemplaires déclarés (les livres absents de exemplaires.txt en ont un seul, implicite)
+        try:
+            with open(self.exemplaires_fichier, "r", encoding="utf-8") as f:
+                for ligne in f:
+                    parts = ligne.rstrip("\n").split(";")
+                    if len(parts) == 4 and parts[1] in biblio.livres:
+                        biblio._attacher_exemplaire(biblio.Exemplaire(*parts))
+        except FileNotFoundError:
+            pass
+
+        # Charger les membres
+        try:
+            with open(self.membres_fichier, "r", encoding="utf-8") as f:
+                for ligne in f:
+                    parts = ligne.strip().split(";")
+                    if len(parts) >= 2:
+                        id_m, nom = parts[0], parts[1]
+                        emprunts = parts[2].split(",") if len(parts) > 2 and parts[2] else []
+                        membre = biblio.Membre(id_m, nom)
+                        membre.livres_empruntes = set(emprunts)
+                        biblio.membres[id_m] = membre
+        except FileNotFoundError:
+            pass
+
+        # Charger les prêts en cours (absents des données antérieures : voir Bibliotheque._completer_prets)
+        try:
+            with open(self.prets_fichier, "r", encoding="utf-8") as f:
+                for ligne in f:
+                    parts = ligne.strip().split(";")
+                    if len(parts) in (5, 6):
+                        biblio.prets.ajouter(Pret(*parts))
+        except FileNotFoundError:
+            pass
+
+        # Charger les files d'attente : un livre par ligne, membres dans l'ordre d'arrivée
+        try:
+            with open(self.reservations_fichier, "r", encoding="utf-8") as f:
+                for ligne in f:
+                    parts = ligne.strip().split(";")
+                    if len(parts) == 2 and parts[1]:
+                        for id_membre in parts[1].split(","):
+                            biblio.reservations.ajouter(parts[0], id_membre)
+        except FileNotFoundError:
+            pass
+
+        # Rejouer les mutations journalisées depuis le dernier instantané
+        self._etat_charge = self._etat_instantanes()
+        self._nb_entrees_journal = self._rejouer_journal(0)
+        if self._nb_entrees_journal and not self.journalise:
+            self.sauvegarder()
+
+    # Projette livres.bin s'il correspond au livres.txt actuel, sinon None
+    def _ouvrir_instantane(self):
+        if not self.instantane_binaire:
+            return None
+        try:
+            source = signature_source(self.livres_fichier)
+        except FileNotFoundError:
+            return None
+        return Instantane.ouvrir(self.instantane_fichier, source)
+
+    # (date de modification, taille, inode) des fichiers instantanés
+    def _etat_instantanes(self):
+        etat = []
+        for chemin in (self.livres_fichier, self.membres_fichier, self.exemplaires_fichier, self.prets_fichier,
+                       self.reservations_fichier):
+            try:
+                infos = os.stat(chemin)
+                etat.append((infos.st_mtime_ns, infos.st_size, infos.st_ino))
+            except FileNotFoundError:
+                etat.append(None)
+        return tuple(etat)
+
+    def verrou_processus(self):
+        return self._verrou
+
+    def rafraichir(self):
+        if self._etat_instantanes() != self._etat_charge:
+            # Un autre processus a compacté ou réécrit les fichiers : rechargement complet
+            self.biblio._recharger()
+            return
+        try:
+            taille = os.path.getsize(self.journal_fichier)
+        except FileNotFoundError:
+            taille = 0
+        if taille < self._position_journal:
+            self.biblio._recharger()
+        elif taille > self._position_journal:
+            # Rattrapage incrémental : seules les nouvelles entrées du journal sont appliquées
+            nouvelles = self._rejouer_journal(self._position_journal)
+            self._nb_entrees_journal += nouvelles
+            if nouvelles:
+                self.biblio._notifier("livre", "rechargement", None)
+                self.biblio._notifier("membre", "rechargement", None)
+
+    def ajouter_livre(self, livre):
+        self._persister("livre+", [livre.isbn, livre.titre, livre.auteur, livre.annee_texte, livre.genre, livre.statut])
+
+    def supprimer_livre(self, isbn):
+        self._persister("livre-", isbn)
+
+    def ajouter_livres(self, livres):
+        self._persister_lot([
+            ("livre+", [livre.isbn, livre.titre, livre.auteur, livre.annee_texte, livre.genre, livre.statut])
+            for livre in livres
+        ])
+
+    def enregistrer_membres(self, membres):
+        self._persister_lot([("membre+", [membre.id_membre, membre.nom]) for membre in membres])
+
+    def enregistrer_membre(self, membre):
+        self._persister("membre+", [membre.id_membre, membre.nom])
+
+    def supprimer_membre(self, id_membre):
+        self._persister("membre-", id_membre)
+
+    def ajouter_exemplaires(self, exemplaires):
+        self._persister_lot([("exemplaire+", [e.code, e.isbn, e.localisation, e.statut]) for e in exemplaires])
+
+    def supprimer_exemplaire(self, code):
+        self._persister("exemplaire-", code)
+
+    def emprunter(self, pret):
+        self._ajouter_historique(pret.date_emprunt, pret.isbn, pret.id_membre, "emprunt")
+        self._persister("emprunt", pret.isbn, pret.id_membre, pret.date_emprunt, pret.echeance, pret.code)
+
+    def renouveler(self, pret):
+        self._persister("renouvellement", pret.code, pret.echeance, pret.renouvellements)
+
+    def reserver(self, isbn, id_membre):
+        self._persister("reservation+", isbn, id_membre)
+
+    def annuler_reservation(self, isbn, id_membre):
+        self._persister("reservation-", isbn, id_membre)
+
+    def retourner(self, isbn, id_membre, date, code):
+        self._ajouter_historique(date, isbn, id_membre, "retour")
+        self._persister("retour", isbn, id_membre, date, code)
+
+    def historique(self, debut=None, fin=None):
+        self._ecrivain_historique.vider()
+        debut, fin = _jour(debut), _jour(fin)
+        position = 0
+        monotone = False
+        if debut is not None or fin is not None:
+            jours, positions, monotone = self._index_historique()
+            if monotone and debut is not None:
+                i = bisect_left(jours, debut)
+                if i == len(jours):
+                    return
+                position = positions[i]
+        for row in self._lire_historique(position):
+            jour = row[0][:10]
+            if debut is not None and jour < debut:
+                continue
+            if fin is not None and jour > fin:
+                if monotone:
+                    break
+                continue
+            yield row
+
+    # Lignes de historique.csv à partir d'une position (en octets). Une dernière ligne sans fin de ligne
+    # est en cours d'écriture (par un autre processus ou le minuteur de l'écrivain) : elle est ignorée
+    def _lire_historique(self, position):
+        try:
+            brut = open(self.historique_fichier, "rb")
+        except FileNotFoundError:
+            return
+        with brut:
+            brut.seek(position)
+            lignes = io.TextIOWrapper(brut, encoding="utf-8", newline="")
+            for row in csv.reader(ligne for ligne in lignes if ligne.endswith("\n")):
+                if len(row) == 4:
+                    yield tuple(row)
+
+    # "taille:empreinte" : la taille du fichier situe les lignes ajoutées depuis ; l'empreinte
+    # (inode, début et fin du contenu résumé) détecte un fichier remplacé ou réécrit (voir historique_depuis)
+    def signature_historique(self):
+        self._ecrivain_historique.vider()
+        try:
+            taille = os.path.getsize(self.historique_fichier)
+        except FileNotFoundError:
+            taille = 0
+        return f"{taille}:{self._empreinte_historique(taille)}"
+
+    # Inode du fichier et CRC32 des (au plus) 1024 premiers et 1024 derniers octets avant la position ;
+    # None si le fichier est plus court
+    def _empreinte_historique(self, position):
+        try:
+            with open(self.historique_fichier, "rb") as f:
+                inode = os.fstat(f.fileno()).st_ino
+                debut = f.read(min(position, 1024))
+                f.seek(max(0, position - 1024))
+                fin = f.read(min(position, 1024))
+        except FileNotFoundError:
+            inode, debut, fin = 0, b"", b""
+        if len(fin) < min(position, 1024):
+            return None
+        return f"{inode}-{zlib.crc32(fin, zlib.crc32(debut)):08x}"
+
+    def historique_depuis(self, signature):
+        try:
+            taille, empreinte = str(signature).split(":")
+            taille = int(taille)
+        except ValueError:
+            return None  # Signature d'une version antérieure (taille seule)
+        self._ecrivain_historique.vider()
+        if self._empreinte_historique(taille) != empreinte:
+            return None
+        return self._lire_historique(taille)
+
+    # Met à jour puis retourne l'index (jours, positions, monotone) de historique.csv
+    def _index_historique(self):
+        if not self._idx_charge:
+            self._lire_index_historique()
+        try:
+            taille = os.path.getsize(self.historique_fichier)
+        except FileNotFoundError:
+            taille = 0
+        if taille < self._idx_taille:
+            # Fichier réécrit : l'index repart de zéro
+            self._idx_taille, self._idx_jours, self._idx_positions, self._idx_monotone = 0, [], [], True
+        if taille > self._idx_taille:
+            with open(self.historique_fichier, "rb") as f:
+                f.seek(self._idx_taille)
+                position = self._idx_taille
+                for ligne in f:
+                    if not ligne.endswith(b"\n"):
+                        break  # Ligne en cours d'écriture
+                    jour = ligne[:10].decode("utf-8", "replace")
+                    if not self._idx_jours or jour > self._idx_jours[-1]:
+                        self._idx_jours.append(jour)
+                        self._idx_positions.append(position)
+                    elif jour < self._idx_jours[-1]:
+                        self._idx_monotone = False
+                    position += len(ligne)
+                self._idx_taille = position
+            self._ecrire_index_historique()
+        return self._idx_jours, self._idx_positions, self._idx_monotone
+
+    def _lire_index_historique(self):
+        self._idx_charge = True
+        try:
+            with open(self.index_historique_fichier, "r", encoding="utf-8") as f:
+                taille, monotone = f.readline().strip().split(";")
+                jours, positions = [], []
+                for ligne in f:
+                    jour, position = ligne.strip().split(";")
+                    jours.append(jour)
+                    positions.append(int(position))
+        except (FileNotFoundError, ValueError):
+            return
+        self._idx_taille, self._idx_monotone = int(taille), monotone == "1"
+        self._idx_jours, self._idx_positions = jours, positions
+
+    def _ecrire_index_historique(self):
+        entete = f"{self._idx_taille};{1 if self._idx_monotone else 0}"
+        self._ecrire_atomique(self.index_historique_fichier, [entete] + [
+            f"{jour};{position}" for jour, position in zip(self._idx_jours, self._idx_positions)
+        ])
+
+    def remplacer(self, livres, membres, historique, prets=(), reservations=(), exemplaires=()):
+        self._ecrivain_historique.fermer()
+        temporaire = self.historique_fichier + ".tmp"
+        with open(temporaire, "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerows(historique)
+            self._compter_octets(self.historique_fichier, f.tell())
+        os.replace(temporaire, self.historique_fichier)
+        self._idx_taille, self._idx_jours, self._idx_positions, self._idx_monotone = 0, [], [], True
+        self._idx_charge = True
+        if os.path.exists(self.index_historique_fichier):
+            os.remove(self.index_historique_fichier)
+        self._ecrire_instantanes(livres, membres, prets, reservations, exemplaires)
+
+    # Ajoute une ligne au fichier d'historique (écrite par lots, voir EcrivainHistorique).
+    # En mode journalisé, elle est écrite et synchronisée avant l'entrée du journal qui la suit :
+    # le rejeu d'une entrée datée suppose sa ligne d'historique déjà écrite
+    def _ajouter_historique(self, date, isbn, id_membre, action):
+        self._ecrivain_historique.ecrire([date, isbn, id_membre, action])
+        if self.journalise:
+            self._ecrivain_historique.vider(synchroniser=True)
+
+    # Persiste une mutation : une entrée dans le journal en mode journalisé, sinon réécriture
+    # des instantanés qu'elle modifie
+    def _persister(self, op, *donnees):
+        if not self.journalise:
+            self._reecrire(self.INSTANTANES_OPERATION[op])
+            return
+        self._ecrire_journal([[op, *donnees]])
+        if self._nb_entrees_journal >= self.seuil_compactage:
+            self.compacter()
+
+    # Persiste plusieurs mutations avec une seule synchronisation disque (ou une seule réécriture)
+    def _persister_lot(self, entrees):
+        if not self.journalise:
+            self._reecrire({nom for op, _ in entrees for nom in self.INSTANTANES_OPERATION[op]})
+            return
+        if len(entrees) + self._nb_entrees_journal >= self.seuil_compactage:
+            self.compacter()
+            return
+        self._ecrire_journal([[op, donnees] for op, donnees in entrees])
+
+    # Ajoute des entrées au journal et les synchronise sur disque
+    def _ecrire_journal(self, entrees):
+        if self._journal is None:
+            self._journal = open(self.journal_fichier, "ab")
+            if self._journal.tell() > self._position_journal:
+                # Fin de fichier tronquée par un arrêt brutal : on repart de la dernière entrée complète
+                self._journal.truncate(self._position_journal)
+        ecrits = self._journal.write("".join(json.dumps(e, ensure_ascii=False) + "\n" for e in entrees).encode("utf-8"))
+        self._compter_octets(self.journal_fichier, ecrits)
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        self._position_journal = self._journal.tell()
+        self._nb_entrees_journal += len(entrees)
+
+    # Rejoue le journal à partir d'une position (en octets) ; retourne le nombre d'entrées appliquées
+    def _rejouer_journal(self, depuis):
+        appliquees = 0
+        position = depuis
+        try:
+            with open(self.journal_fichier, "rb") as f:
+                f.seek(depuis)
+                for ligne in f:
+                    if not ligne.endswith(b"\n"):
+                        break  # Dernière ligne tronquée par un arrêt brutal
+                    try:
+                        entree = json.loads(ligne)
+                    except ValueError:
+                        break
+                    self.biblio._appliquer_entree(*entree)
+                    position += len(ligne)
+                    appliquees += 1
+        except FileNotFoundError:
+            pass
+        self._position_journal = position
+        return appliquees
+
+    # Replie le journal dans les fichiers instantanés puis le vide ; les agrégats statistiques
+    # sont sauvegardés avec (voir Bibliotheque._sauvegarder_statistiques)
+    def compacter(self):
+        self.sauvegarder()
+        self.biblio._sauvegarder_statistiques()
+
+    # Écrit un fichier via un fichier temporaire pour ne jamais laisser d'instantané partiel
+    def _ecrire_atomique(self, chemin, lignes):
+        temporaire = chemin + ".tmp"
+        with open(temporaire, "w", encoding="utf-8") as f:
+            for ligne in lignes:
+                f.write(ligne + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+            self._compter_octets(chemin, f.tell())
+        os.replace(temporaire, chemin)
+
+    # Écrit un instantané ("livres", "exemplaires", "membres", "prets" ou "reservations") à partir de ses éléments
+    def _ecrire_instantane(self, nom, elements):
+        if nom == "livres":
+            self._ecrire_atomique(self.livres_fichier, (
+                ";".join([livre.isbn, livre.titre, livre.auteur, livre.annee_texte, livre.genre, livre.statut])
+                for livre in elements
+            ))
+            if self.instantane_binaire:
+                try:
+                    ecrire_instantane(self.instantane_fichier, elements, signature_source(self.livres_fichier))
+                    self._compter_octets(self.instantane_fichier, os.path.getsize(self.instantane_fichier))
+                except OSError:
+                    pass  # Instantané binaire encore projeté (Windows) : il sera ignoré car périmé
+        elif nom == "exemplaires":
+            self._ecrire_atomique(self.exemplaires_fichier, (
+                f"{e.code};{e.isbn};{e.localisation};{e.statut}" for e in elements
+            ))
+        elif nom == "membres":
+            self._ecrire_atomique(self.membres_fichier, (
+                f"{membre.id_membre};{membre.nom};{','.join(sorted(membre.livres_empruntes))}"
+                for membre in elements
+            ))
+        elif nom == "prets":
+            self._ecrire_atomique(self.prets_fichier, (
+                f"{pret.isbn};{pret.id_membre};{pret.date_emprunt};{pret.echeance};{pret.renouvellements};{pret.code}"
+                for pret in elements
+            ))
+        else:
+            self._ecrire_atomique(self.reservations_fichier, (
+                f"{isbn};{','.join(file)}" for isbn, file in elements
+            ))
+
+    # Écrit les instantanés des livres, des exemplaires, des membres, des prêts et des réservations
+    # puis vide le journal
+    def _ecrire_instantanes(self, livres, membres, prets, reservations, exemplaires):
+        for nom, elements in (("livres", livres), ("exemplaires", exemplaires), ("membres", membres),
+                              ("prets", prets), ("reservations", reservations)):
+            self._ecrire_instantane(nom, elements)
+
+        # Les instantanés contiennent désormais tout le journal
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if os.path.exists(self.journal_fichier):
+            open(self.journal_fichier, "w", encoding="utf-8").close()
+        self._nb_entrees_journal = 0
+        self._position_journal = 0
+        self._etat_charge = self._etat_instantanes()
+
+    # Réécrit les seuls instantanés nommés (mode non journalisé, après une mutation)
+    def _reecrire(self, noms):
+        self._ecrivain_historique.vider()
+        biblio = self.biblio
+        elements = {"livres": biblio.livres.values, "exemplaires": biblio.exemplaires.values,
+                    "membres": biblio.membres.values, "prets": biblio.prets.values,
+                    "reservations": biblio.reservations.items}
+        for nom in ("livres", "exemplaires", "membres", "prets", "reservations"):
+            if nom in noms:
+                self._ecrire_instantane(nom, elements[nom]())
+        self._etat_charge = self._etat_instantanes()
+
+    # Sauvegarde des livres et membres dans les fichiers
+    def sauvegarder(self):
+        self._ecrivain_historique.vider()
+        biblio = self.biblio
+        self._ecrire_instantanes(biblio.livres.values(), biblio.membres.values(), biblio.prets.values(),
+                                 biblio.reservations.items(), biblio.exemplaires.values())
+
+    def fermer(self):
+        self._ecrivain_historique.fermer()
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+
+class StockageSQLite(Stockage):
+    """
+    Stockage dans une base SQLite locale, avec index sur les colonnes interrogées.
+    Chaque mutation est une transaction ; l'historique est lu par curseur, jamais chargé en bloc.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS livres (
+            isbn TEXT PRIMARY KEY,
+            titre TEXT NOT NULL,
+            auteur TEXT NOT NULL,
+            annee TEXT NOT NULL,
+            genre TEXT NOT NULL,
+            statut TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_livres_auteur ON livres (auteur);
+        CREATE INDEX IF NOT EXISTS idx_livres_genre ON livres (genre);
+        CREATE INDEX IF NOT EXISTS idx_livres_statut ON livres (statut);
+
+        CREATE TABLE IF NOT EXISTS exemplaires (
+            code TEXT PRIMARY KEY,
+            isbn TEXT NOT NULL,
+            localisation TEXT NOT NULL,
+            statut TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_exemplaires_isbn ON exemplaires (isbn);
+
+        CREATE TABLE IF NOT EXISTS membres (
+            id_membre TEXT PRIMARY KEY,
+            nom TEXT NOT NULL
+        );
+
+        -- isbn : code-barres de l'exemplaire emprunté (l'ISBN pour un exemplaire implicite)
+        CREATE TABLE IF NOT EXISTS emprunts (
+            isbn TEXT PRIMARY KEY,
+            id_membre TEXT NOT NULL,
+            date_emprunt TEXT,
+            echeance TEXT,
+            renouvellements INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS idx_emprunts_membre ON emprunts (id_membre);
+
+        CREATE TABLE IF NOT EXISTS reservations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            isbn TEXT NOT NULL,
+            id_membre TEXT NOT NULL,
+            UNIQUE (isbn, id_membre)
+        );
+        CREATE INDEX IF NOT EXISTS idx_reservations_membre ON reservations (id_membre);
+
+        CREATE TABLE IF NOT EXISTS historique (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT NOT NULL,
+            isbn TEXT NOT NULL,
+            id_membre TEXT NOT NULL,
+            action TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_historique_date ON historique (date);
+        CREATE INDEX IF NOT EXISTS idx_historique_isbn ON historique (isbn);
+    """
+
+    def __init__(self, chemin):
+        self.chemin = chemin
+        dossier = os.path.dirname(os.path.abspath(chemin))
+        os.makedirs(dossier, exist_ok=True)
+        self.connexion = sqlite3.connect(chemin, check_same_thread=False)
+        self.connexion.executescript(self.SCHEMA)
+        self._mettre_a_jour_schema()
+        self._verrou = VerrouFichier(chemin + ".verrou")
+        self._version = None  # PRAGMA data_version au dernier chargement
+
+    # Bases créées avant les prêts : colonnes de date ajoutées à la table emprunts
+    def _mettre_a_jour_schema(self):
+        colonnes = {ligne[1] for ligne in self.connexion.execute("PRAGMA table_info(emprunts)")}
+        with self.connexion:
+            for colonne, definition in (("date_emprunt", "TEXT"), ("echeance", "TEXT"),
+                                        ("renouvellements", "INTEGER NOT NULL DEFAULT 0")):
+                if colonne not in colonnes:
+                    self.connexion.execute(f"ALTER TABLE emprunts ADD COLUMN {colonne} {definition}")
+            self.connexion.execute("CREATE INDEX IF NOT EXISTS idx_emprunts_echeance ON emprunts (echeance)")
+
+    def charger(self):
+        biblio = self.biblio
+        for isbn, titre, auteur, annee, genre, statut in self.connexion.execute(
+                "SELECT isbn, titre, auteur, annee, genre, statut FROM livres"):
+            biblio.livres[isbn] = biblio.Livre(isbn, titre, auteur, annee, genre, statut)
+        biblio.statistiques.reconstruire_catalogue(biblio.livres.values())
+        for exemplaire in self.connexion.execute(
+                "SELECT code, isbn, localisation, statut FROM exemplaires ORDER BY rowid"):
+            if exemplaire[1] in biblio.livres:
+                biblio._attacher_exemplaire(biblio.Exemplaire(*exemplaire))
+        for id_membre, nom in self.connexion.execute("SELECT id_membre, nom FROM membres"):
+            biblio.membres[id_membre] = biblio.Membre(id_membre, nom)
+        for code, id_membre, date_emprunt, echeance, renouvellements in self.connexion.execute(
+                "SELECT isbn, id_membre, date_emprunt, echeance, renouvellements FROM emprunts"):
+            if id_membre in biblio.membres:
+                biblio.membres[id_membre].livres_empruntes.add(code)
+                if date_emprunt:
+                    biblio.prets.ajouter(Pret(biblio.livre_de(code), id_membre, date_emprunt, echeance, renouvellements,
+                                              code))
+        for isbn, id_membre in self.connexion.execute("SELECT isbn, id_membre FROM reservations ORDER BY id"):
+            biblio.reservations.ajouter(isbn, id_membre)
+        self._version = self._version_donnees()
+
+    # Change chaque fois qu'une autre connexion valide une transaction
+    def _version_donnees(self):
+        return self.connexion.execute("PRAGMA data_version").fetchone()[0]
+
+    def verrou_processus(self):
+        return self._verrou
+
+    def rafraichir(self):
+        if self._version_donnees() != self._version:
+            self.biblio._recharger()
+
+    def ajouter_livre(self, livre):
+        with self.connexion:
+            self.connexion.execute(
+                "INSERT INTO livres (isbn, titre, auteur, annee, genre, statut) VALUES (?, ?, ?, ?, ?, ?)",
+                (livre.isbn, livre.titre, livre.auteur, livre.annee_texte, livre.genre, livre.statut)
+            )
+
+    def supprimer_livre(self, isbn):
+        with self.connexion:
+            self.connexion.execute("DELETE FROM livres WHERE isbn = ?", (isbn,))
+            self.connexion.execute("DELETE FROM reservations WHERE isbn = ?", (isbn,))
+            self.connexion.execute("DELETE FROM exemplaires WHERE isbn = ?", (isbn,))
+
+    def ajouter_livres(self, livres):
+        with self.connexion:
+            self.connexion.executemany(
+                "INSERT INTO livres (isbn, titre, auteur, annee, genre, statut) VALUES (?, ?, ?, ?, ?, ?)",
+                ((l.isbn, l.titre, l.auteur, l.annee_texte, l.genre, l.statut) for l in livres)
+            )
+
+    def enregistrer_membres(self, membres):
+        with self.connexion:
+            self.connexion.executemany(
+                "INSERT INTO membres (id_membre, nom) VALUES (?, ?)",
+                ((m.id_membre, m.nom) for m in membres)
+            )
+
+    def enregistrer_membre(self, membre):
+        with self.connexion:
+            self.connexion.execute("INSERT INTO membres (id_membre, nom) VALUES (?, ?)", (membre.id_membre, membre.nom))
+
+    def supprimer_membre(self, id_membre):
+        with self.connexion:
+            self.connexion.execute("DELETE FROM membres WHERE id_membre = ?", (id_membre,))
+            self.connexion.execute("DELETE FROM reservations WHERE id_membre = ?", (id_membre,))
+
+    def ajouter_exemplaires(self, exemplaires):
+        with self.connexion:
+            self.connexion.executemany(
+                "INSERT INTO exemplaires (code, isbn, localisation, statut) VALUES (?, ?, ?, ?)",
+                ((e.code, e.isbn, e.localisation, e.statut) for e in exemplaires)
+            )
+
+    def supprimer_exemplaire(self, code):
+        with self.connexion:
+            self.connexion.execute("DELETE FROM exemplaires WHERE code = ?", (code,))
+
+    # Statut du livre (disponible tant qu'il lui reste un exemplaire) après l'emprunt ou le retour
+    def _statut_livre(self, isbn):
+        livre = self.biblio.livres.get(isbn)
+        return livre.statut if livre is not None else "disponible"
+
+    def emprunter(self, pret):
+        with self.connexion:
+            self.connexion.execute("UPDATE livres SET statut = ? WHERE isbn = ?",
+                                   (self._statut_livre(pret.isbn), pret.isbn))
+            self.connexion.execute("UPDATE exemplaires SET statut = 'emprunte' WHERE code = ?", (pret.code,))
+            self.connexion.execute(
+                "INSERT INTO emprunts (isbn, id_membre, date_emprunt, echeance, renouvellements) VALUES (?, ?, ?, ?, ?)",
+                (pret.code, pret.id_membre, pret.date_emprunt, pret.echeance, pret.renouvellements)
+            )
+            self.connexion.execute(
+                "INSERT INTO historique (date, isbn, id_membre, action) VALUES (?, ?, ?, 'emprunt')",
+                (pret.date_emprunt, pret.isbn, pret.id_membre)
+            )
+            self.connexion.execute("DELETE FROM reservations WHERE isbn = ? AND id_membre = ?",
+                                   (pret.isbn, pret.id_membre))
+
+    def renouveler(self, pret):
+        with self.connexion:
+            self.connexion.execute("UPDATE emprunts SET echeance = ?, renouvellements = ? WHERE isbn = ?",
+                                   (pret.echeance, pret.renouvellements, pret.code))
+
+    def reserver(self, isbn, id_membre):
+        with self.connexion:
+            self.connexion.execute("INSERT INTO reservations (isbn, id_membre) VALUES (?, ?)", (isbn, id_membre))
+
+    def annuler_reservation(self, isbn, id_membre):
+        with self.connexion:
+            self.connexion.execute("DELETE FROM reservations WHERE isbn = ? AND id_membre = ?", (isbn, id_membre))
+
+    def retourner(self, isbn, id_membre, date, code):
+        with self.connexion:
+            self.connexion.execute("UPDATE livres SET statut = ? WHERE isbn = ?", (self._statut_livre(isbn), isbn))
+            self.connexion.execute("UPDATE exemplaires SET statut = 'disponible' WHERE code = ?", (code,))
+            self.connexion.execute("DELETE FROM emprunts WHERE isbn = ?", (code,))
+            self.connexion.execute(
+                "INSERT INTO historique (date, isbn, id_membre, action) VALUES (?, ?, ?, 'retour')",
+                (date, isbn, id_membre)
+            )
+
+    def historique(self, debut=None, fin=None):
+        conditions, parametres = [], []
+        if debut is not None:
+            conditions.append("date >= ?")
+            parametres.append(_jour(debut))
+        if fin is not None:
+            conditions.append("date <= ?")
+            parametres.append(_jour(fin) + "~")  # Inclut les horodatages du dernier jour
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        yield from self.connexion.execute(
+            f"SELECT date, isbn, id_membre, action FROM historique{where} ORDER BY id", parametres
+        )
+
+    def signature_historique(self):
+        return self.connexion.execute("SELECT COALESCE(MAX(id), 0) FROM historique").fetchone()[0]
+
+    # Les identifiants ne sont jamais réutilisés (AUTOINCREMENT) : une signature dont la ligne
+    # a disparu vient d'un historique remplacé depuis
+    def historique_depuis(self, signature):
+        if not isinstance(signature, int):
+            return None
+        if signature and self.connexion.execute("SELECT 1 FROM historique WHERE id = ?", (signature,)).fetchone() is None:
+            return None
+        return self.connexion.execute(
+            "SELECT date, isbn, id_membre, action FROM historique WHERE id > ? ORDER BY id", (signature,)
+        )
+
+    def remplacer(self, livres, membres, historique, prets=(), reservations=(), exemplaires=()):
+        with self.connexion:
+            for table in ("livres", "exemplaires", "membres", "emprunts", "reservations", "historique"):
+                self.connexion.execute(f"DELETE FROM {table}")
+            self.connexion.executemany(
+                "INSERT INTO livres (isbn, titre, auteur, annee, genre, statut) VALUES (?, ?, ?, ?, ?, ?)",
+                ((l.isbn, l.titre, l.auteur, l.annee_texte, l.genre, l.statut) for l in livres)
+            )
+            self.connexion.executemany(
+                "INSERT INTO exemplaires (code, isbn, localisation, statut) VALUES (?, ?, ?, ?)",
+                ((e.code, e.isbn, e.localisation, e.statut) for e in exemplaires)
+            )
+            membres = list(membres)
+            self.connexion.executemany(
+                "INSERT INTO membres (id_membre, nom) VALUES (?, ?)",
+                ((m.id_membre, m.nom) for m in membres)
+            )
+            prets = {pret.code: pret for pret in prets}
+            self.connexion.executemany(
+                "INSERT INTO emprunts (isbn, id_membre, date_emprunt, echeance, renouvellements) VALUES (?, ?, ?, ?, ?)",
+                ((code, m.id_membre, *((prets[code].date_emprunt, prets[code].echeance, prets[code].renouvellements)
+                                       if code in prets else (None, None, 0)))
+                 for m in membres for code in m.livres_empruntes)
+            )
+            self.connexion.executemany(
+                "INSERT INTO reservations (isbn, id_membre) VALUES (?, ?)",
+                ((isbn, id_membre) for isbn, file in reservations for id_membre in file)
+            )
+            self.connexion.executemany(
+                "INSERT INTO historique (date, isbn, id_membre, action) VALUES (?, ?, ?, ?)",
+                historique
+            )
+
+    def fermer(self):
+        self.connexion.close()
@@ -1,80 +1,166 @@
-import matplotlib.pyplot as plt
-from collections import Counter
-from datetime import datetime, timedelta
+import os
+import sys
+import argparse
+from datetime import date
+from src.analyses import Analyses, exporter_csv
+from src.cli import creer_bibliotheque
+
+# Les graphiques sont dessinés sur une matplotlib.figure.Figure fournie par l'appelant :
+# onglet Statistiques (FigureCanvasTkAgg), fenêtre pyplot ou fichier PNG sans affichage.
+# matplotlib n'est importé que par les fonctions qui créent la figure.
+
+
+def dessiner_genre(figure, compteur):
+    ax = figure.add_subplot()
+    ax.pie(compteur.values(), labels=compteur.keys(), autopct='%1.1f%%', startangle=90)
+    ax.set_title("Répartition des livres par genre")
+    ax.axis('equal')  # Assure un cercle parfait
+
+
+def dessiner_auteurs(figure, top):
+    auteurs, quantites = zip(*top)
+    ax = figure.add_subplot()
+    ax.bar(auteurs, quantites, color='skyblue')
+    ax.set_title("Top 10 des auteurs les plus populaires")
+    ax.set_ylabel("Nombre de livres")
+    ax.tick_params(axis="x", labelrotation=45)
+    for etiquette in ax.get_xticklabels():
+        etiquette.set_horizontalalignment("right")
+
+
+def dessiner_activite(figure, activite):
+    jours, emprunts, _ = activite
+    ax = figure.add_subplot()
+    ax.plot(jours, emprunts, marker='o', linestyle='-', color='tab:blue')
+    if jours and jours[-1] == date.today():
+        ax.set_title(f"Activité des emprunts ({len(jours) - 1} derniers jours)")
+    elif jours:
+        ax.set_title(f"Activité des emprunts du {jours[0]:%d/%m/%Y} au {jours[-1]:%d/%m/%Y}")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Nombre d'emprunts")
+    ax.grid(True)
+    ax.tick_params(axis="x", labelrotation=45)
+
+
+def dessiner_plus_empruntes(figure, classement):
+    ax = figure.add_subplot()
+    ax.barh([titre or isbn for isbn, titre, _ in reversed(classement)],
+            [nombre for _, _, nombre in reversed(classement)], color='tab:orange')
+    ax.set_title("Livres les plus empruntés")
+    ax.set_xlabel("Nombre d'emprunts")
+
+
+# nom -> (données tirées d'Analyses, éventuellement sur une plage de jours [debut, fin], dessin,
+# message si aucune donnée)
+GRAPHIQUES = {
+    "genre": (lambda analyses, debut=None, fin=None: analyses.repartition_genres(), dessiner_genre,
+              "Aucun livre trouvé."),
+    "auteurs": (lambda analyses, debut=None, fin=None: analyses.top_auteurs(10), dessiner_auteurs,
+                "Aucun auteur trouvé."),
+    "emprunts_30j": (lambda analyses, debut=None, fin=None: analyses.activite(debut, fin), dessiner_activite, None),
+    "plus_empruntes": (lambda analyses, debut=None, fin=None: analyses.livres_plus_empruntes(10, debut, fin),
+                       dessiner_plus_empruntes, "Aucun emprunt dans l'historique."),
+}
+
+
+def _afficher(biblio, nom, taille):
+    import matplotlib.pyplot as plt
+    donnees_de, dessiner, message_vide = GRAPHIQUES[nom]
+    donnees = donnees_de(Analyses(biblio))
+    if message_vide and not donnees:
+        print(message_vide)
+        return
+    figure = plt.figure(figsize=taille)
+    dessiner(figure, donnees)
+    figure.tight_layout()
+    plt.show()
+
 
 def diagramme_genre(biblio):
     """
     Affiche un diagramme circulaire représentant la répartition des livres par genre.
-    :param biblio: instance de Bibliotheque avec attribut livres (dict)
+    :param biblio: instance de Bibliotheque (compteurs tenus par biblio.statistiques)
     """
-    genres = [livre.genre for livre in biblio.livres.values()]
-    compteur = Counter(genres)
-    if not compteur:
-        print("Aucun livre dans la bibliothèque.")
-        return
-
-    plt.figure(figsize=(6, 6))
-    plt.pie(
-        compteur.values(),
-        labels=compteur.keys(),
-        autopct='%1.1f%%',
-        startangle=90,
-        shadow=True,
-        textprops={'fontsize': 10}
-    )
-    plt.title("Répartition des livres par genre")
-    plt.axis('equal')  # Assure un cercle parfait
-    plt.show()
+    _afficher(biblio, "genre", (6, 6))
 
 
 def histogramme_auteurs(biblio):
     """
     Affiche un histogramme des 10 auteurs les plus populaires.
-    :param biblio: instance de Bibliotheque avec attribut livres (dict)
+    :param biblio: instance de Bibliotheque (compteurs tenus par biblio.statistiques)
     """
-    auteurs = [livre.auteur for livre in biblio.livres.values()]
-    compteur = Counter(auteurs)
-    top = compteur.most_common(10)
-    if not top:
-        print("Aucun auteur trouvé.")
-        return
-
-    auteurs, quantites = zip(*top)
-    plt.figure(figsize=(8, 5))
-    plt.bar(auteurs, quantites, color='skyblue')
-    plt.xticks(rotation=45, ha='right')
-    plt.title("Top 10 des auteurs les plus populaires")
-    plt.ylabel("Nombre de livres")
-    plt.tight_layout()
-    plt.show()
+    _afficher(biblio, "auteurs", (8, 5))
 
 
 def courbe_activite_emprunts(biblio):
     """
     Affiche la courbe temporelle de l'activité des emprunts sur les 30 derniers jours.
-    :param biblio: instance de Bibliotheque avec attribut historique (list de tuples)
+    :param biblio: instance de Bibliotheque (compteurs journaliers tenus par biblio.statistiques)
     """
-    today = datetime.now().date()
-    date_limite = today - timedelta(days=30)
-
-    # Extraire les dates des emprunts récents
-    dates_emprunts = [
-        datetime.strptime(entry[0], "%Y-%m-%d").date()
-        for entry in biblio.historique
-        if entry[3] == "emprunt" and datetime.strptime(entry[0], "%Y-%m-%d").date() >= date_limite
-    ]
-
-    compteur = Counter(dates_emprunts)
-
-    jours = [date_limite + timedelta(days=i) for i in range(31)]
-    valeurs = [compteur.get(jour, 0) for jour in jours]
-
-    plt.figure(figsize=(10, 5))
-    plt.plot(jours, valeurs, marker='o', linestyle='-', color='tab:blue')
-    plt.xticks(rotation=45)
-    plt.title("Activité des emprunts (30 derniers jours)")
-    plt.xlabel("Date")
-    plt.ylabel("Nombre d'emprunts")
-    plt.grid(True)
-    plt.tight_layout()
-    plt.show()
+    _afficher(biblio, "emprunts_30j", (10, 5))
+
+
+def exporter_png(analyses, nom, chemin, taille=(8, 5), debut=None, fin=None):
+    """
+    Écrit un graphique dans un fichier PNG, sans interface graphique.
+    :param analyses: instance d'Analyses
+    :param nom: clé de GRAPHIQUES
+    :param chemin: fichier PNG à écrire
+    :param debut: premier jour des graphiques tirés de l'historique
+    :param fin: dernier jour
+    :return: False si le graphique n'a aucune donnée (rien n'est écrit)
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    donnees_de, dessiner, message_vide = GRAPHIQUES[nom]
+    donnees = donnees_de(analyses, debut, fin)
+    if message_vide and not donnees:
+        return False
+    figure = Figure(figsize=taille)
+    FigureCanvasAgg(figure)
+    dessiner(figure, donnees)
+    figure.tight_layout()
+    figure.savefig(chemin)
+    return True
+
+
+def rapport(biblio, dossier, debut=None, fin=None):
+    """
+    Écrit dans dossier un PNG par graphique et un CSV par indicateur.
+    :param debut: premier jour des indicateurs tirés de l'historique (par défaut tout l'historique,
+        sauf pour l'activité journalière : les 30 jours précédant fin)
+    :param fin: dernier jour (aujourd'hui par défaut)
+    :return: liste des fichiers écrits
+    """
+    os.makedirs(dossier, exist_ok=True)
+    analyses = Analyses(biblio)
+    ecrits = []
+    for nom in GRAPHIQUES:
+        chemin = os.path.join(dossier, f"{nom}.png")
+        if exporter_png(analyses, nom, chemin, debut=debut, fin=fin):
+            ecrits.append(chemin)
+    for nom in ("genres", "auteurs", "activite", "plus_empruntes", "duree_moyenne"):
+        chemin = os.path.join(dossier, f"{nom}.csv")
+        exporter_csv(analyses, nom, chemin, debut, fin)
+        ecrits.append(chemin)
+    return ecrits
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rapport statistique de la bibliothèque (PNG et CSV, sans interface Tk).")
+    parser.add_argument("dossier", help="dossier où écrire le rapport")
+    parser.add_argument("--data-dir", default=None, help="dossier des données (par défaut data/)")
+    parser.add_argument("--sqlite", default=None, help="utiliser cette base SQLite au lieu des fichiers texte")
+    parser.add_argument("--debut", default=None,
+                        help="premier jour AAAA-MM-JJ des indicateurs d'historique (par défaut tout l'historique, "
+                             "30 jours pour l'activité)")
+    parser.add_argument("--fin", default=None, help="dernier jour AAAA-MM-JJ des indicateurs d'historique")
+    args = parser.parse_args(argv)
+
+    for chemin in rapport(creer_bibliotheque(args), args.dossier, args.debut, args.fin):
+        print(chemin)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())